@@ -0,0 +1,358 @@
+import os
+import copy
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+import weakref
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, AsyncIterator, Iterator, List, Optional
+import groq
+import httpx
+import langchain_groq
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from graph.metrics import registry
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# point at another OpenAI-compatible endpoint, e.g. benchmarks/fake_llm_server.py
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-8b-8192")
+# maximum number of LLM calls in flight at the same time, shared by every agent
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# provider quota; 0 disables a limit. Defaults are the Groq free tier for llama3-8b-8192
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+# requests that may go out at once after an idle period, a minute's quota by default
+LLM_REQUEST_BURST = float(os.getenv("LLM_REQUEST_BURST", "0")) or None
+# retries of rate-limited (429), overloaded (5xx) and failed connections
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "20"))
+# keep-alive connection pool shared by all agents
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+LLM_RETRIES = registry.counter("lms_llm_retries_total", "LLM calls retried by the gateway.", ["reason"])
+LLM_COALESCED = registry.counter("lms_llm_coalesced_total", "LLM calls served by an identical call already in flight.")
+LLM_THROTTLE_SECONDS = registry.histogram(
+    "lms_llm_throttle_seconds", "Time LLM calls waited for the rate limiter.", buckets=(0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+# one semaphore per event loop, so the limiter also works across repeated asyncio.run() calls
+_semaphores = weakref.WeakKeyDictionary()
+
+def _get_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+@asynccontextmanager
+async def llm_slot():
+    """
+    Waits for one of the LLM_MAX_CONCURRENCY slots before an async LLM call.
+    """
+    async with _get_semaphore():
+        yield
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `per_minute` tokens a minute, holding at most
+    `capacity` (one minute's worth by default). reserve() takes the tokens right away, going into debt if
+    needed, and returns how long the caller has to wait for them, so waiting
+    callers are served in arrival order without a background refill task.
+    """
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+
+_request_bucket = TokenBucket(LLM_REQUESTS_PER_MINUTE, LLM_REQUEST_BURST)
+_token_bucket = TokenBucket(LLM_TOKENS_PER_MINUTE)
+
+def _estimated_tokens(messages) -> int:
+    # ~4 characters a token; the completion is paid for after the fact
+    return sum(len(str(message.content)) for message in messages) // 4 + 1
+
+def _throttle_delay(messages) -> float:
+    return max(_request_bucket.reserve(1), _token_bucket.reserve(_estimated_tokens(messages)))
+
+
+def _retry_reason(error):
+    if isinstance(error, groq.RateLimitError):
+        return "rate_limited"
+    if isinstance(error, groq.InternalServerError):
+        return "server_error"
+    if isinstance(error, groq.APIConnectionError):
+        return "connection"
+    return None
+
+def _retry_delay(error, attempt: int) -> float:
+    """Retry-After when the provider sends it, otherwise exponential backoff with full jitter."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), LLM_RETRY_MAX_SECONDS) + random.uniform(0, LLM_RETRY_BASE_SECONDS)
+    except ValueError:
+        pass
+    return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+def _call_key(model, messages, stop, kwargs) -> str:
+    payload = json.dumps(
+        [id(model), [message.model_dump() for message in messages], stop, kwargs],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _AInFlight:
+    def __init__(self, task):
+        self.task = task
+        # callers awaiting the task; it is only cancelled when all of them were
+        self.waiters = 0
+
+# identical sync calls in flight, by call key
+_inflight = {}
+_inflight_lock = threading.Lock()
+# the same for async calls, one table per event loop as the futures belong to it
+_ainflight = weakref.WeakKeyDictionary()
+
+
+class GatewayChatModel(BaseChatModel):
+    """
+    Chat model every agent goes through. It wraps the provider model and adds
+    what a shared quota needs: calls wait for the request and token buckets,
+    rate-limited and failed calls are retried with jittered backoff, and
+    identical prompts already in flight are answered by the running call.
+    With `slot_per_call`, every async provider call waits for an llm_slot
+    itself, instead of the caller holding one around the whole answer.
+    """
+    model: BaseChatModel
+    slot_per_call: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "gateway"
+
+    def bind_tools(self, tools, **kwargs):
+        # let the provider format the tools, then bind them to the gateway
+        bound = self.model.bind_tools(tools, **kwargs)
+        return self.bind(**getattr(bound, "kwargs", {}))
+
+    def _slot(self):
+        return llm_slot() if self.slot_per_call else nullcontext()
+
+    def _call(self, fn, messages):
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            delay = _throttle_delay(messages)
+            if delay:
+                LLM_THROTTLE_SECONDS.observe(delay)
+                time.sleep(delay)
+            try:
+                return fn()
+            except Exception as error:
+                reason = _retry_reason(error)
+                if reason is None or attempt == LLM_MAX_RETRIES:
+                    raise
+                LLM_RETRIES.inc(reason=reason)
+                time.sleep(_retry_delay(error, attempt))
+
+    async def _acall(self, fn, messages):
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            delay = _throttle_delay(messages)
+            if delay:
+                LLM_THROTTLE_SECONDS.observe(delay)
+                await asyncio.sleep(delay)
+            try:
+                return await fn()
+            except Exception as error:
+                reason = _retry_reason(error)
+                if reason is None or attempt == LLM_MAX_RETRIES:
+                    raise
+                LLM_RETRIES.inc(reason=reason)
+                await asyncio.sleep(_retry_delay(error, attempt))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        key = _call_key(self.model, messages, stop, kwargs)
+        with _inflight_lock:
+            call = _inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _inflight[key] = _InFlight()
+        if not leader:
+            LLM_COALESCED.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = self._call(lambda: self.model._generate(messages, stop=stop, **kwargs), messages)
+            return call.result
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with _inflight_lock:
+                del _inflight[key]
+            call.done.set()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        key = _call_key(self.model, messages, stop, kwargs)
+        loop = asyncio.get_running_loop()
+        inflight = _ainflight.setdefault(loop, {})
+        call = inflight.get(key)
+        leader = call is None
+        if leader:
+            # the call runs as its own task, so cancelling the caller that started it
+            # does not cancel the callers that joined it
+            async def provider_call():
+                async with self._slot():
+                    return await self._acall(lambda: self.model._agenerate(messages, stop=stop, **kwargs), messages)
+
+            call = inflight[key] = _AInFlight(loop.create_task(provider_call()))
+            call.task.add_done_callback(lambda _: inflight.pop(key, None) if inflight.get(key) is call else None)
+        else:
+            LLM_COALESCED.inc()
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # every caller was cancelled, nobody needs the answer any more
+                if inflight.get(key) is call:
+                    del inflight[key]
+                call.task.cancel()
+        return result if leader else copy.deepcopy(result)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        if type(self.model)._stream == BaseChatModel._stream:
+            yield self._single_chunk(self._generate(messages, stop=stop, **kwargs))
+            return
+        stream = None
+
+        def first_chunk():
+            nonlocal stream
+            stream = self.model._stream(messages, stop=stop, **kwargs)
+            return next(stream, None)
+
+        # retried only until the first chunk, after that the tokens are already out
+        first = self._call(first_chunk, messages)
+        if first is not None:
+            yield first
+            yield from stream
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        if type(self.model)._astream == BaseChatModel._astream:
+            yield self._single_chunk(await self._agenerate(messages, stop=stop, **kwargs))
+            return
+        stream = None
+
+        async def first_chunk():
+            nonlocal stream
+            stream = self.model._astream(messages, stop=stop, **kwargs)
+            return await anext(stream, None)
+
+        async with self._slot():
+            first = await self._acall(first_chunk, messages)
+            if first is not None:
+                yield first
+                async for chunk in stream:
+                    yield chunk
+
+    @staticmethod
+    def _single_chunk(result: ChatResult) -> ChatGenerationChunk:
+        message = result.generations[0].message
+        return ChatGenerationChunk(message=AIMessageChunk(
+            content=message.content,
+            additional_kwargs=message.additional_kwargs,
+            tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(getattr(message, "tool_calls", []))
+            ],
+            usage_metadata=getattr(message, "usage_metadata", None),
+        ))
+
+
+_http_clients = {}
+_models = {}
+_models_lock = threading.Lock()
+
+def _shared_http_clients():
+    """One keep-alive pool for sync and one for async calls, used by every model."""
+    if not _http_clients:
+        limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+        )
+        _http_clients["sync"] = httpx.Client(limits=limits, timeout=LLM_TIMEOUT_SECONDS)
+        _http_clients["async"] = httpx.AsyncClient(limits=limits, timeout=LLM_TIMEOUT_SECONDS)
+    return _http_clients["sync"], _http_clients["async"]
+
+def _provider(temperature: Optional[float]):
+    sync_client, async_client = _shared_http_clients()
+    options = {} if temperature is None else {"temperature": temperature}
+    return langchain_groq.ChatGroq(
+        model_name=LLM_MODEL,
+        groq_api_key=GROQ_API_KEY,
+        base_url=GROQ_BASE_URL,
+        # retries are done by the gateway, with the limiter in the loop
+        max_retries=0,
+        http_client=sync_client,
+        http_async_client=async_client,
+        **options,
+    )
+
+def get_llm(temperature: Optional[float] = None, slot_per_call: bool = False) -> GatewayChatModel:
+    """
+    The shared chat model for `temperature` (the provider default when None).
+    The agents build their chains on it instead of constructing their own clients.
+    Agents calling the model several times per answer, around tool calls, ask
+    for `slot_per_call` rather than holding an llm_slot while their tools run.
+    """
+    with _models_lock:
+        model = _models.get((temperature, slot_per_call))
+        if model is None:
+            # both variants share the provider model and its clients
+            other = _models.get((temperature, not slot_per_call))
+            provider = other.model if other else _provider(temperature)
+            model = _models[(temperature, slot_per_call)] = GatewayChatModel(model=provider, slot_per_call=slot_per_call)
+        return model
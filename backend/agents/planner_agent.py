@@ -1,25 +1,22 @@
-import os
-from langchain_community.vectorstores import Qdrant
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
-from qdrant_client import QdrantClient
+import asyncio
 from langchain_core.prompts import ChatPromptTemplate
 from graph.state import AgentState
+from agents.retrieval_node import state_documents, astate_documents
+from rag.context import build_context, CONTEXT_BUDGETS
+from rag.summaries import collection_outline, SUMMARIES_ENABLED
+from agents.llm import llm_slot, get_llm
 from dotenv import load_dotenv
 
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-QDRANT_URL = "http://localhost:6333"
-QDRANT_COLLECTION = "lms_collection"
 
 class PlannerAgent:
     """
     This agent creates structured study plans and outlines from the textbook
     """
     def __init__(self):
-        # We need a retriever to get a broad overview of the textbook content
-        self.retriever = self._setup_retriever()
+        # We need many chunks to get a broad overview of the textbook content
+        self.k = 15
         
         system_prompt = (
             "You are an expert academic planner. Your primary task is to create a structured outline or study plan from a collection of text chunks from a textbook. "
@@ -42,17 +39,37 @@ class PlannerAgent:
             ]
         )
         
-        self.llm = ChatGroq(model_name="llama3-8b-8192", groq_api_key=GROQ_API_KEY)
-        self.runnable = self.prompt | self.llm
+        # Used when the summary tree built at ingest is available: the whole
+        # book's structure is known up front, no chunks need to be assembled
+        outline_prompt = (
+            "You are an expert academic planner. Your primary task is to create a structured outline or study plan for a textbook. "
+            "You are given the textbook's outline: a summary of each document, of each chapter and of each page, in reading order."
+
+            "\n\n## Your Process:"
+            "\n1. Use the chapter and page summaries to understand the document's overall structure and flow."
+            "\n2. Identify the main topics, key headings, and important sub-points relevant to the user's request."
+            "\n3. Generate a clear, logical, and well-structured study plan or outline that follows the textbook's order and cites chapters and pages."
+            "\n4. Format your output using markdown headings (#, ##) and bullet points (-) for readability."
+
+            "\n\nHere is the textbook outline:\n{outline}"
+        )
 
-    def _setup_retriever(self):
-        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        qdrant_client = QdrantClient(url=QDRANT_URL)
-        vectorstore = Qdrant(
-            client=qdrant_client, collection_name=QDRANT_COLLECTION, embeddings=embeddings
+        self.outline_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", outline_prompt),
+                ("placeholder", "{history}"),
+                ("human", "User request: {question}"),
+            ]
         )
-        # Fetch more documents to get a better overview of the text
-        return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 15})
+
+        self.llm = get_llm()
+        self.runnable = self.prompt | self.llm
+        self.outline_runnable = self.outline_prompt | self.llm
+
+    def _outline(self, question, course_id=None):
+        if not SUMMARIES_ENABLED:
+            return None
+        return collection_outline(CONTEXT_BUDGETS["planner_agent"], course_id, question)
 
     def planner_node(self, state: AgentState):
         """
@@ -60,9 +77,37 @@ class PlannerAgent:
         """
         print("---PLANNER AGENT---")
         question = state["question"]
+
+        outline = self._outline(question, state.get("course_id"))
+        if outline:
+            result = self.outline_runnable.invoke({"outline": outline, "question": question, "history": state.get("history", [])})
+            return {"answer": result.content}
+
+        # no summaries yet, fall back to the most similar chunks
+        docs = state_documents(state, self.k)
+        context = build_context(docs, "planner_agent")
         
-        docs = self.retriever.invoke(question)
-        context = "\n\n".join([doc.page_content for doc in docs])
-        
-        result = self.runnable.invoke({"context": context, "question": question})
-        return {"answer": result.content}
\ No newline at end of file
+        result = self.runnable.invoke({"context": context, "question": question, "history": state.get("history", [])})
+        return {"answer": result.content}
+
+    async def aplanner_node(self, state: AgentState):
+        """
+        Async version of planner_node, used when the graph runs through ainvoke.
+        """
+        print("---PLANNER AGENT---")
+        question = state["question"]
+
+        # embeds the question and may read Qdrant and the stored trees, keep it off the event loop
+        outline = await asyncio.to_thread(self._outline, question, state.get("course_id"))
+        if outline:
+            async with llm_slot():
+                result = await self.outline_runnable.ainvoke({"outline": outline, "question": question, "history": state.get("history", [])})
+            return {"answer": result.content}
+
+        # no summaries yet, fall back to the most similar chunks
+        docs = await astate_documents(state, self.k)
+        context = build_context(docs, "planner_agent")
+
+        async with llm_slot():
+            result = await self.runnable.ainvoke({"context": context, "question": question, "history": state.get("history", [])})
+        return {"answer": result.content}
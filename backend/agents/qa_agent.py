@@ -1,18 +1,12 @@
-import os
-from langchain_community.vectorstores import Qdrant
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
-from qdrant_client import QdrantClient
 from langchain_core.prompts import ChatPromptTemplate
 from graph.state import AgentState
+from agents.retrieval_node import state_documents, astate_documents
+from rag.context import build_context
+from agents.llm import llm_slot, get_llm
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# --- Configuration ---
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-QDRANT_URL = "http://localhost:6333"
-QDRANT_COLLECTION = "lms_collection"
 
 class QAAgent:
     """
@@ -21,19 +15,10 @@ class QAAgent:
     """
 
     def __init__(self):
-        # the components needed for RAG
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        # number of chunks taken from the shared retrieval stage
+        self.k = 3
         
-        qdrant_client = QdrantClient(url=QDRANT_URL)
-        self.vectorstore = Qdrant(
-            client=qdrant_client,
-            collection_name=QDRANT_COLLECTION,
-            embeddings=self.embeddings
-        )
-        
-        self.retriever = self.vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-        
-        self.llm = ChatGroq(model_name="llama3-8b-8192", groq_api_key=GROQ_API_KEY)
+        self.llm = get_llm()
         
         system_prompt = (
             "You are an expert at answering questions using the provided context. "
@@ -61,10 +46,27 @@ class QAAgent:
         question = state["question"]
         
         # Retrieve
-        docs = self.retriever.invoke(question)
-        context = "\n\n".join([doc.page_content for doc in docs])
+        docs = state_documents(state, self.k)
+        context = build_context(docs, "qa_agent")
         
         # Generate
-        answer = self.runnable.invoke({"context": context, "question": question})
+        answer = self.runnable.invoke({"context": context, "question": question, "history": state.get("history", [])})
         
-        return {"answer": answer.content}
\ No newline at end of file
+        return {"answer": answer.content}
+
+    async def aqa_node(self, state: AgentState):
+        """
+        Async version of qa_node, used when the graph runs through ainvoke.
+        """
+        print("---QA AGENT---")
+        question = state["question"]
+
+        # Retrieve
+        docs = await astate_documents(state, self.k)
+        context = build_context(docs, "qa_agent")
+
+        # Generate
+        async with llm_slot():
+            answer = await self.runnable.ainvoke({"context": context, "question": question, "history": state.get("history", [])})
+
+        return {"answer": answer.content}
@@ -1,12 +1,10 @@
-import os
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from graph.state import AgentState
+from agents.llm import llm_slot, get_llm
 from dotenv import load_dotenv
 
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 class ReasoningAgent:
     """
@@ -18,17 +16,17 @@ class ReasoningAgent:
             "You are an expert at logical reasoning. Given a user's question, "
             "your task is to break it down into a series of step-by-step thoughts. "
             "Think logically and show your work. After your reasoning, clearly state the final answer."
-            "\n\nHere is the user's question:\n{question}"
         )
         
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", system_prompt),
                 ("placeholder", "{history}"),
+                ("human", "{question}"),
             ]
         )
         
-        self.llm = ChatGroq(model_name="llama3-8b-8192", groq_api_key=GROQ_API_KEY)
+        self.llm = get_llm()
         self.runnable = self.prompt | self.llm
 
     def reasoning_node(self, state: AgentState):
@@ -36,5 +34,14 @@ class ReasoningAgent:
         The main node for the reasoning agent.
         """
         print("---REASONING AGENT---")
-        result = self.runnable.invoke({"question": state["question"]})
-        return {"answer": result.content}
\ No newline at end of file
+        result = self.runnable.invoke({"question": state["question"], "history": state.get("history", [])})
+        return {"answer": result.content}
+
+    async def areasoning_node(self, state: AgentState):
+        """
+        Async version of reasoning_node, used when the graph runs through ainvoke.
+        """
+        print("---REASONING AGENT---")
+        async with llm_slot():
+            result = await self.runnable.ainvoke({"question": state["question"], "history": state.get("history", [])})
+        return {"answer": result.content}
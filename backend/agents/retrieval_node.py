@@ -0,0 +1,45 @@
+import asyncio
+from graph.state import AgentState
+from rag.retrieval import retrieval_cache, RETRIEVAL_K
+from rag.rerank import reranker, RERANK_ENABLED, RERANK_FETCH_K
+
+class RetrievalNode:
+    """
+    The shared retrieval stage. It runs once per question before the textbook
+    agents and stores the documents in the state; each agent then slices the
+    number of chunks it needs instead of searching again. With reranking on,
+    it over-fetches RERANK_FETCH_K candidates and keeps the cross-encoder's best k.
+    """
+    def __init__(self, k: int = RETRIEVAL_K, rerank: bool = RERANK_ENABLED):
+        self.k = k
+        self.rerank = rerank
+        self.fetch_k = max(k, RERANK_FETCH_K) if rerank else k
+
+    def retrieve_node(self, state: AgentState):
+        print("---RETRIEVE---")
+        docs = retrieval_cache.retrieve(state["question"], self.fetch_k, state.get("course_id"))
+        if self.rerank:
+            docs = reranker.rerank(state["question"], docs, self.k)
+        return {"documents": docs}
+
+    async def aretrieve_node(self, state: AgentState):
+        print("---RETRIEVE---")
+        docs = await retrieval_cache.aretrieve(state["question"], self.fetch_k, state.get("course_id"))
+        if self.rerank:
+            # the cross-encoder is CPU-bound, keep it off the event loop
+            docs = await asyncio.to_thread(reranker.rerank, state["question"], docs, self.k)
+        return {"documents": docs}
+
+
+def state_documents(state: AgentState, k: int):
+    """The first `k` documents of the shared retrieval, fetching them if the stage did not run."""
+    docs = state.get("documents")
+    if docs is None:
+        docs = retrieval_cache.retrieve(state["question"], course_id=state.get("course_id"))
+    return docs[:k]
+
+async def astate_documents(state: AgentState, k: int):
+    docs = state.get("documents")
+    if docs is None:
+        docs = await retrieval_cache.aretrieve(state["question"], course_id=state.get("course_id"))
+    return docs[:k]
@@ -0,0 +1,154 @@
+import os
+import re
+import numpy as np
+from rag.resources import get_encoder
+from graph.tracing import span
+
+# --- Configuration ---
+# the fast router only decides when its confidence reaches this value, otherwise the LLM router is used
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.6"))
+# softmax temperature applied to the centroid similarities
+ROUTER_TEMPERATURE = float(os.getenv("ROUTER_TEMPERATURE", "0.05"))
+# confidence of a keyword rule hit the embedding tier agrees with
+ROUTER_RULE_CONFIDENCE = float(os.getenv("ROUTER_RULE_CONFIDENCE", "0.9"))
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# labeled example questions, one centroid is built per route
+ROUTE_EXAMPLES = {
+    "planner_agent": [
+        "Create a study plan for this chapter.",
+        "Outline the main ideas in the document.",
+        "What are the key concepts I should learn?",
+        "Give me a week-by-week revision schedule for the textbook.",
+        "Summarize the key topics and modules covered in this book.",
+        "Make a syllabus from the uploaded document.",
+        "List the chapters and their main subtopics.",
+        "How should I organise my preparation for this unit?",
+        "Break the textbook down into a study roadmap.",
+        "What topics does this document cover overall?",
+    ],
+    "tutor_agent": [
+        "Can you explain photosynthesis to me like I'm 10?",
+        "Help me understand the causes of the Cold War.",
+        "I don't get how momentum works, can you walk me through it?",
+        "Explain the concept of entropy in simple terms.",
+        "Why does a satellite stay in orbit? Please help me understand.",
+        "Teach me how electric fields work with an analogy.",
+        "What is the intuition behind the work-energy theorem?",
+        "Can you simplify the idea of resonance for me?",
+        "I'm confused about Newton's third law, explain it step by step.",
+        "Describe how heat engines work in an easy way.",
+    ],
+    "qa_agent": [
+        "What was the date of the signing of the Declaration of Independence according to the text?",
+        "What is the formula for the area of a circle mentioned in chapter 3?",
+        "What does Newton's third law state?",
+        "According to the book, what is the SI unit of power?",
+        "What is the escape speed from the Earth given in the text?",
+        "Which law states that planets move in elliptical orbits?",
+        "What is the definition of impulse in the textbook?",
+        "What is the value of the period of a geostationary satellite?",
+        "Which quantity is conserved in an inelastic collision?",
+        "What does Gauss's law say about electric flux?",
+    ],
+    "reasoning_agent": [
+        "If a train leaves Station A at 3 PM traveling at 60 mph, and a second train leaves Station B at 4 PM traveling at 70 mph, when will they meet?",
+        "If all cats are mammals, and a poodle is not a cat, is a poodle a mammal?",
+        "A farmer has 17 sheep and all but 9 run away. How many are left?",
+        "Solve for x: 3x + 7 = 22.",
+        "If it takes 5 machines 5 minutes to make 5 widgets, how long would 100 machines take to make 100 widgets?",
+        "Three friends split a bill of 90 dollars with a 10 percent tip, how much does each pay?",
+        "Which number comes next in the sequence 2, 6, 12, 20, 30?",
+        "A ball is thrown up at 20 m/s, how long until it returns to the ground?",
+        "If some doctors are teachers and all teachers are readers, must some doctors be readers?",
+        "How many handshakes happen if 10 people each shake hands once with everyone else?",
+    ],
+    "search_agent": [
+        "Who won the 2024 presidential election?",
+        "What is the latest news on the Artemis program?",
+        "What is the weather in Delhi today?",
+        "Who is the current CEO of OpenAI?",
+        "What were the results of yesterday's cricket match?",
+        "What is the current price of bitcoin?",
+        "When is the next SpaceX launch scheduled?",
+        "What happened at the most recent Nobel prize announcement?",
+        "Which movies are trending this week?",
+        "What are today's top headlines?",
+    ],
+}
+
+# cheap keyword rules checked before the embedding model. Words that also occur in
+# coursework ("current", "latest", "how many") are only matched inside longer phrases,
+# and a hit still needs the embedding tier to agree (see FastRouter.classify)
+KEYWORD_RULES = [
+    (re.compile(r"\b(study plan|study schedule|revision (plan|schedule)|outline|syllabus|roadmap)\b", re.I), "planner_agent"),
+    (re.compile(r"\b(latest news|today'?s (news|headlines|weather)|current (events|affairs|price|ceo|president|prime minister)"
+                r"|in the news|this week|yesterday'?s?|right now|live score|weather (in|today|forecast))\b", re.I), "search_agent"),
+    (re.compile(r"\b(explain|help me understand|like i'?m \d+|in simple terms|intuition|walk me through)\b", re.I), "tutor_agent"),
+    (re.compile(r"\b(solve|puzzle|how long would|what comes next)\b|\d+\s*[-+*/=]\s*\d+", re.I), "reasoning_agent"),
+    (re.compile(r"\b(according to the (text|book|textbook)|in chapter \d+|mentioned in|defined in the text)\b", re.I), "qa_agent"),
+]
+
+
+class FastRouter:
+    """
+    Local routing tier in front of the LLM supervisor. It compares the question
+    to the centroid of each route's example questions, using the shared
+    embedding model, and keyword rules raise the confidence of the route they
+    agree with.
+    """
+    def __init__(self, examples=ROUTE_EXAMPLES, threshold: float = ROUTER_CONFIDENCE_THRESHOLD,
+                 temperature: float = ROUTER_TEMPERATURE, rule_confidence: float = ROUTER_RULE_CONFIDENCE):
+        self.examples = examples
+        self.threshold = threshold
+        self.temperature = temperature
+        self.rule_confidence = rule_confidence
+        self.labels = list(examples)
+        self._centroids = None
+
+    def _get_centroids(self):
+        if self._centroids is None:
+            centroids = []
+            for label in self.labels:
+                vectors = get_encoder().encode(self.examples[label], convert_to_numpy=True, normalize_embeddings=True)
+                centroid = vectors.mean(axis=0)
+                centroids.append(centroid / np.linalg.norm(centroid))
+            self._centroids = np.vstack(centroids)
+        return self._centroids
+
+    def match_rules(self, question: str):
+        matched = {label for pattern, label in KEYWORD_RULES if pattern.search(question)}
+        if len(matched) == 1:
+            return matched.pop()
+        return None
+
+    def classify(self, question: str):
+        """
+        Returns (route, confidence, tier). For the embedding tier the confidence is
+        the softmax probability of the best route. A rule match the embedding tier
+        agrees with gets rule_confidence; when they disagree the confidence is the
+        embedding probability of the rule's route, which normally leaves the
+        decision to the LLM router.
+        """
+        query = get_encoder().encode([question], convert_to_numpy=True, normalize_embeddings=True)[0]
+        similarities = self._get_centroids() @ query
+        scores = np.exp((similarities - similarities.max()) / self.temperature)
+        probabilities = scores / scores.sum()
+        best = int(probabilities.argmax())
+
+        label = self.match_rules(question)
+        if label:
+            if label == self.labels[best]:
+                return label, max(self.rule_confidence, float(probabilities[best])), "rules"
+            return label, float(probabilities[self.labels.index(label)]), "rules"
+        return self.labels[best], float(probabilities[best]), "embedding"
+
+    def route(self, question: str):
+        """
+        Returns (route, confidence, tier) when the local tiers are confident enough, otherwise None.
+        """
+        with span("router"):
+            label, confidence, tier = self.classify(question)
+        if confidence >= self.threshold:
+            return label, confidence, tier
+        return None
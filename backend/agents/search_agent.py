@@ -1,22 +1,50 @@
 import os
-from langchain_groq import ChatGroq
+import time
+import asyncio
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from graph.state import AgentState
+from agents.llm import get_llm
 from tools.web_search import web_search_tool
 from dotenv import load_dotenv
 
 load_dotenv()
+
 # --- Configuration ---
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# tool-calling rounds before the agent has to answer
+SEARCH_MAX_ITERATIONS = int(os.getenv("SEARCH_MAX_ITERATIONS", "3"))
+# wall-clock budget of one search answer, in seconds
+SEARCH_TIME_BUDGET = float(os.getenv("SEARCH_TIME_BUDGET", "20"))
+
+SEARCH_UNFINISHED_ANSWER = "I could not finish searching the web for this question in time. Please try again in a moment."
+SEARCH_ITERATION_LIMIT_ANSWER = (
+    "I searched the web several times but could not settle on an answer to this question. "
+    "Try asking it in a more specific way."
+)
+
+def _unfinished_answer(steps, message: str = SEARCH_UNFINISHED_ANSWER):
+    """Fallback answer when the loop was stopped, listing the pages found so far."""
+    urls = []
+    for _, observation in steps or []:
+        if isinstance(observation, list):
+            urls.extend(result["url"] for result in observation if isinstance(result, dict) and result.get("url"))
+    if not urls:
+        return message
+    sources = "\n".join(f"- {url}" for url in dict.fromkeys(urls))
+    return f"{message}\n\nPages found so far:\n{sources}"
 
 class SearchAgent:
     """
     This agent is a specialist in using tools to find information on the web.
+    The tool loop is capped at SEARCH_MAX_ITERATIONS rounds and SEARCH_TIME_BUDGET
+    seconds; several searches asked for in one round run concurrently on the
+    async path. Each model call of the loop takes its own llm_slot, so no slot
+    is held while the searches run.
     """
-    def __init__(self):
+    def __init__(self, max_iterations: int = SEARCH_MAX_ITERATIONS, time_budget: float = SEARCH_TIME_BUDGET):
         # the tools this agent can use
         self.tools = [web_search_tool]
+        self.time_budget = time_budget
 
         # prompt
         prompt = ChatPromptTemplate.from_messages([
@@ -25,19 +53,53 @@ class SearchAgent:
             ("placeholder", "{agent_scratchpad}"),
         ])
 
-        # Set up the LLM
-        llm = ChatGroq(model_name="llama3-8b-8192", groq_api_key=GROQ_API_KEY)
+        # Set up the LLM, it is called once per round
+        llm = get_llm(slot_per_call=True)
 
         # Create agent
         agent = create_tool_calling_agent(llm, self.tools, prompt)
 
-        # Create Agent Executor
-        self.agent_executor = AgentExecutor(agent=agent, tools=self.tools, verbose=True)
+        # Create Agent Executor; it stops starting new rounds once the budget is spent
+        self.agent_executor = AgentExecutor(
+            agent=agent,
+            tools=self.tools,
+            max_iterations=max_iterations,
+            max_execution_time=time_budget,
+            early_stopping_method="force",
+            return_intermediate_steps=True,
+        )
+
+    def _answer(self, result, elapsed: float):
+        steps = result.get("intermediate_steps")
+        # a forced stop leaves the executor's own "Agent stopped ..." message as the output,
+        # the same for both limits; the elapsed time tells which one was hit
+        if steps and result["output"].startswith("Agent stopped"):
+            if elapsed >= self.time_budget:
+                return _unfinished_answer(steps)
+            return _unfinished_answer(steps, SEARCH_ITERATION_LIMIT_ANSWER)
+        return result["output"]
 
     def search_node(self, state: AgentState):
         """
         The main node for the search agent.
         """
         print("---SEARCH AGENT---")
+        started = time.perf_counter()
         result = self.agent_executor.invoke({"question": state["question"]})
-        return {"answer": result["output"]}
\ No newline at end of file
+        return {"answer": self._answer(result, time.perf_counter() - started)}
+
+    async def asearch_node(self, state: AgentState):
+        """
+        Async version of search_node, used when the graph runs through ainvoke.
+        A round still running when the budget is spent is cancelled.
+        """
+        print("---SEARCH AGENT---")
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                self.agent_executor.ainvoke({"question": state["question"]}), self.time_budget
+            )
+        except asyncio.TimeoutError:
+            print(f"Search agent ran out of its {self.time_budget:g}s budget")
+            return {"answer": SEARCH_UNFINISHED_ANSWER}
+        return {"answer": self._answer(result, time.perf_counter() - started)}
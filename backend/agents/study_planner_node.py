@@ -1,12 +1,15 @@
-import os
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from graph.state import AgentState
+from agents.llm import llm_slot, get_llm
+from agents.retrieval_node import state_documents, astate_documents
+from rag.context import build_context
 from dotenv import load_dotenv
 
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+# separates the specialist's answer from the generated study plan
+STUDY_PLAN_HEADER = "\n\n---\n\n### Your Study Plan\n"
 
 class StudyPlannerNode:
     """
@@ -28,8 +31,29 @@ class StudyPlannerNode:
             ]
         )
         
-        self.llm = ChatGroq(model_name="llama3-8b-8192", groq_api_key=GROQ_API_KEY, temperature=0.7)
+        # Used when the plan is generated alongside the answer: the plan is
+        # based on the same textbook context the specialist receives instead
+        context_prompt = (
+            "You are an expert study planning assistant. Your task is to take a user's question and the textbook "
+            "passages relevant to it, and create a concise, actionable study plan to help the student master the topic. "
+            "The plan should include key concepts to review, practice problems to try, and maybe a real-world application."
+            "\n\nFormat the plan clearly with a title and bullet points."
+            "\n\n## User's Question:\n{question}"
+            "\n\n## Relevant Textbook Content:\n{context}"
+        )
+
+        self.context_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", context_prompt),
+            ]
+        )
+
+        # same number of chunks the QA and Tutor agents answer from
+        self.k = 3
+
+        self.llm = get_llm(temperature=0.7)
         self.runnable = self.prompt | self.llm
+        self.context_runnable = self.context_prompt | self.llm
 
     def create_plan_node(self, state: AgentState):
         """
@@ -44,6 +68,60 @@ class StudyPlannerNode:
         }).content
         
         # Combine the original answer with the new study plan for the final output
-        final_combined_answer = f"{state['answer']}\n\n---\n\n### Your Study Plan\n{study_plan}"
+        final_combined_answer = f"{state['answer']}{STUDY_PLAN_HEADER}{study_plan}"
         
-        return {"answer": final_combined_answer}
\ No newline at end of file
+        return {"answer": final_combined_answer}
+
+    async def acreate_plan_node(self, state: AgentState):
+        """
+        Async version of create_plan_node, used when the graph runs through ainvoke.
+        """
+        print("---STUDY PLANNER NODE---")
+
+        # Generate the study plan
+        async with llm_slot():
+            result = await self.runnable.ainvoke({
+                "question": state["question"],
+                "answer": state["answer"]
+            })
+        study_plan = result.content
+
+        final_combined_answer = f"{state['answer']}{STUDY_PLAN_HEADER}{study_plan}"
+
+        return {"answer": final_combined_answer}
+
+    def plan_from_context_node(self, state: AgentState):
+        """
+        Creates the study plan from the question and the retrieved context, so it
+        can run in parallel with the specialist. The plan is joined to the answer
+        by merge_node.
+        """
+        print("---STUDY PLANNER NODE (PARALLEL)---")
+        docs = state_documents(state, self.k)
+        context = build_context(docs, "study_planner")
+
+        study_plan = self.context_runnable.invoke({"question": state["question"], "context": context}).content
+        return {"study_plan": study_plan}
+
+    async def aplan_from_context_node(self, state: AgentState):
+        """
+        Async version of plan_from_context_node, used when the graph runs through ainvoke.
+        """
+        print("---STUDY PLANNER NODE (PARALLEL)---")
+        docs = await astate_documents(state, self.k)
+        context = build_context(docs, "study_planner")
+
+        async with llm_slot():
+            result = await self.context_runnable.ainvoke({"question": state["question"], "context": context})
+        return {"study_plan": result.content}
+
+    def merge_node(self, state: AgentState):
+        """
+        Join point of the parallel branches: appends the study plan, if one was made, to the answer.
+        """
+        if not state.get("study_plan"):
+            return {}
+        return {"answer": f"{state['answer']}{STUDY_PLAN_HEADER}{state['study_plan']}"}
+
+    async def amerge_node(self, state: AgentState):
+        return self.merge_node(state)
@@ -1,12 +1,13 @@
-import os
+import asyncio
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
 from graph.state import AgentState
+from agents.llm import llm_slot, get_llm
+from agents.router import FastRouter, ROUTER_ENABLED
+from graph.tracing import record_route
 from dotenv import load_dotenv
 
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 class SupervisorAgent:
     """
@@ -48,19 +49,48 @@ class SupervisorAgent:
             ]
         )
         
-        # Initialize the Groq LLM
-        llm = ChatGroq(model_name="llama3-8b-8192", groq_api_key=GROQ_API_KEY)
+        # Shared LLM gateway
+        llm = get_llm()
         
         # Create the runnable agent chain
         self.runnable = prompt | llm
 
+        # local rules + embedding router, the LLM is only asked when it is not confident
+        self.router = FastRouter() if ROUTER_ENABLED else None
+
     def supervisor_node(self, state: AgentState):
         """
         The main node for the supervisor. It invokes the agent and updates the state.
         """
         print("---SUPERVISOR---")
+        decision = self.router.route(state["question"]) if self.router else None
+        if decision:
+            return self._fast_route(*decision)
+
         result = self.runnable.invoke({"question": state["question"]})
-        
+        return self._route(result.content)
+
+    async def asupervisor_node(self, state: AgentState):
+        """
+        Async version of supervisor_node, used when the graph runs through ainvoke.
+        """
+        print("---SUPERVISOR---")
+        if self.router:
+            # the embedding model is CPU-bound, keep it off the event loop
+            decision = await asyncio.to_thread(self.router.route, state["question"])
+            if decision:
+                return self._fast_route(*decision)
+
+        async with llm_slot():
+            result = await self.runnable.ainvoke({"question": state["question"]})
+        return self._route(result.content)
+
+    def _fast_route(self, next_node: str, confidence: float, tier: str):
+        print(f"Supervisor decided the next node is: {next_node} (tier: {tier}, confidence: {confidence:.2f})")
+        record_route(next_node, tier)
+        return {"next_node": next_node}
+
+    def _route(self, content: str):
         # The result from the LLM will be the name of the agent
         # We will use this to decide the next node in the graph
         next_node_mapping = {
@@ -68,11 +98,13 @@ class SupervisorAgent:
             "Tutor Agent": "tutor_agent",
             "Reasoning Agent": "reasoning_agent",
             "Planner Agent": "planner_agent",
+            "Web Search Agent": "search_agent",
         }
         
-        next_node_key = result.content.strip()
+        next_node_key = content.strip()
         next_node = next_node_mapping.get(next_node_key, "qa_agent") # Default to qa_agent if not found
         
-        print(f"Supervisor decided the next node is: {next_node}")
-        
+        print(f"Supervisor decided the next node is: {next_node} (tier: llm)")
+        record_route(next_node, "llm")
+
         return {"next_node": next_node}
\ No newline at end of file
@@ -1,15 +1,9 @@
-import os
-from langchain_community.vectorstores import Qdrant
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
-from qdrant_client import QdrantClient
 from langchain_core.prompts import ChatPromptTemplate
 from graph.state import AgentState
+from agents.retrieval_node import state_documents, astate_documents
+from rag.context import build_context
+from agents.llm import llm_slot, get_llm
 
-#  Configuration 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-QDRANT_URL = "http://localhost:6333"
-QDRANT_COLLECTION = "lms_collection"
 
 class TutorAgent:
     """
@@ -17,9 +11,9 @@ class TutorAgent:
     easy-to-understand way, like a friendly teacher.
     """
     def __init__(self):
-        # RAG setup
-        self.retriever = self._setup_retriever()
-        self.llm = ChatGroq(model_name="llama3-8b-8192", groq_api_key=GROQ_API_KEY)
+        # RAG setup, chunks taken from the shared retrieval stage
+        self.k = 3
+        self.llm = get_llm()
 
         system_prompt = (
             "You are a friendly and patient tutor. Your goal is to explain concepts to a student "
@@ -38,16 +32,6 @@ class TutorAgent:
 
         self.runnable = self.prompt | self.llm
 
-    def _setup_retriever(self):
-        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        qdrant_client = QdrantClient(url=QDRANT_URL)
-        vectorstore = Qdrant(
-            client=qdrant_client,
-            collection_name=QDRANT_COLLECTION,
-            embeddings=embeddings
-        )
-        return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-
     def tutor_node(self, state: AgentState):
         """
         The main node for the Tutor agent.
@@ -56,10 +40,27 @@ class TutorAgent:
         question = state["question"]
 
         # Retrieve context
-        docs = self.retriever.invoke(question)
-        context = "\n\n".join([doc.page_content for doc in docs])
+        docs = state_documents(state, self.k)
+        context = build_context(docs, "tutor_agent")
+
+        # generate tutoring answer
+        answer = self.runnable.invoke({"context": context, "question": question, "history": state.get("history", [])})
+
+        return {"answer": answer.content}
+
+    async def atutor_node(self, state: AgentState):
+        """
+        Async version of tutor_node, used when the graph runs through ainvoke.
+        """
+        print("---TUTOR AGENT---")
+        question = state["question"]
+
+        # Retrieve context
+        docs = await astate_documents(state, self.k)
+        context = build_context(docs, "tutor_agent")
 
         # generate tutoring answer
-        answer = self.runnable.invoke({"context": context, "question": question})
+        async with llm_slot():
+            answer = await self.runnable.ainvoke({"context": context, "question": question, "history": state.get("history", [])})
 
-        return {"answer": answer.content}
\ No newline at end of file
+        return {"answer": answer.content}
@@ -0,0 +1,109 @@
+"""
+Query latency of course-scoped vs unscoped vector search as the corpus grows.
+
+A throwaway collection is filled with random 384-dim points spread over
+--courses courses (payload metadata.course_id / document_id / page, with the
+payload indexes ingest creates). At every corpus size it times the same
+queries:
+
+- unscoped: the whole collection, as every question was searched before
+- scoped:   filtered to one course with rag.retrieval.course_filter
+
+so the scoped column should follow the size of one course, not of the corpus.
+
+Run from the backend directory against the Qdrant server of QDRANT_URL (the
+embedded store has no payload indexes and scans payloads, so its figures only
+show the filter overhead):
+
+    python -m benchmarks.course_scope_bench [--sizes 5000,20000,80000] [--courses 20] [--qdrant-path :memory:]
+"""
+import argparse
+import time
+import numpy as np
+from qdrant_client.models import VectorParams, Distance, PointStruct
+from rag import resources
+from rag.ingest import PAYLOAD_INDEXES
+from rag.retrieval import course_filter
+
+BENCH_COLLECTION = "lms_course_scope_bench"
+DIMENSION = 384
+
+
+def random_vectors(rng, n):
+    vectors = rng.standard_normal((n, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def fill(client, rng, start, end, courses, batch_size=1000):
+    for offset in range(start, end, batch_size):
+        count = min(batch_size, end - offset)
+        vectors = random_vectors(rng, count)
+        client.upsert(collection_name=BENCH_COLLECTION, points=[
+            PointStruct(
+                id=offset + i,
+                vector=vectors[i].tolist(),
+                payload={"page_content": "", "metadata": {
+                    "course_id": f"course-{(offset + i) % courses}",
+                    "document_id": f"course-{(offset + i) % courses}__book-{(offset + i) // 1000}",
+                    "page": (offset + i) % 400,
+                }},
+            )
+            for i in range(count)
+        ])
+
+
+def time_queries(client, queries, k, courses, scoped):
+    latencies = []
+    for i, query in enumerate(queries):
+        query_filter = course_filter(f"course-{i % courses}") if scoped else None
+        start = time.perf_counter()
+        client.query_points(collection_name=BENCH_COLLECTION, query=query.tolist(), limit=k, query_filter=query_filter)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="5000,20000,80000", help="comma-separated corpus sizes, in points")
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--qdrant-path", help="use an embedded Qdrant at this path (':memory:' for in-memory) instead of QDRANT_URL")
+    args = parser.parse_args()
+
+    if args.qdrant_path:
+        from qdrant_client import QdrantClient
+        resources.set_resource("qdrant_client", QdrantClient(location=":memory:") if args.qdrant_path == ":memory:"
+                               else QdrantClient(path=args.qdrant_path))
+    client = resources.get_qdrant_client()
+    if client.collection_exists(BENCH_COLLECTION):
+        client.delete_collection(BENCH_COLLECTION)
+    client.create_collection(BENCH_COLLECTION, vectors_config=VectorParams(size=DIMENSION, distance=Distance.COSINE))
+    if not args.qdrant_path:
+        for field, schema in PAYLOAD_INDEXES.items():
+            client.create_payload_index(collection_name=BENCH_COLLECTION, field_name=field, field_schema=schema)
+
+    rng = np.random.default_rng(args.seed)
+    queries = random_vectors(rng, args.queries)
+    print(f"{args.courses} courses, {args.queries} queries, k={args.k}\n")
+    print(f"{'points':>8} {'per course':>11} {'unscoped p50':>13} {'p95':>7} {'scoped p50':>11} {'p95':>7}")
+    size = 0
+    try:
+        for target in sorted(int(s) for s in args.sizes.split(",")):
+            fill(client, rng, size, target, args.courses)
+            size = target
+            # let the server finish indexing the new points before timing
+            while client.get_collection(BENCH_COLLECTION).status != "green":
+                time.sleep(0.5)
+            time_queries(client, queries[:10], args.k, args.courses, scoped=False)
+            unscoped = time_queries(client, queries, args.k, args.courses, scoped=False)
+            scoped = time_queries(client, queries, args.k, args.courses, scoped=True)
+            print(f"{size:>8} {size // args.courses:>11} {unscoped[0]:>10.2f} ms {unscoped[1]:>7.2f} "
+                  f"{scoped[0]:>8.2f} ms {scoped[1]:>7.2f}")
+    finally:
+        client.delete_collection(BENCH_COLLECTION)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compares the embedding backends (EMBEDDING_BACKEND) on CPU:
+
+- torch: the sentence-transformers all-MiniLM-L6-v2 model on PyTorch
+- onnx:  the int8 ONNX export made by `python -m rag.onnx_encoder`
+
+Each backend runs in a fresh interpreter, which reports the time to import
+and load the encoder, the peak RSS, the single-query latency over the labeled
+queries and the batch throughput over the chunks of the sample PDF. The vectors
+of both are then compared: the cosine between the two embeddings of every text
+should stay close to 1 for the int8 model to be usable on the same collection.
+
+Run from the backend directory:
+
+    python -m benchmarks.embedding_backend_bench [--rounds 5] [--min-cosine 0.98]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+BACKENDS = ["torch", "onnx"]
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "data", "sample_textbook.pdf")
+QUERIES = os.path.join(os.path.dirname(__file__), "data", "retrieval_queries.jsonl")
+
+
+def child(backend, vectors_path, rounds):
+    start = time.perf_counter()
+    os.environ["EMBEDDING_BACKEND"] = backend
+    from rag.resources import get_encoder, EMBED_BATCH_SIZE
+    encoder = get_encoder()
+    encoder.encode("warm up")
+    load_seconds = time.perf_counter() - start
+    # ru_maxrss is reported in kilobytes on Linux
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    with open(QUERIES) as f:
+        queries = [json.loads(line)["query"] for line in f if line.strip()]
+    latencies = []
+    for _ in range(rounds):
+        for query in queries:
+            started = time.perf_counter()
+            encoder.encode(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    from rag.ingest import iter_chunks
+    chunks = [chunk.page_content for chunk in iter_chunks(SAMPLE_PDF)]
+    started = time.perf_counter()
+    vectors = encoder.encode(chunks, batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True)
+    batch_seconds = time.perf_counter() - started
+
+    np.save(vectors_path, np.vstack([encoder.encode(queries, normalize_embeddings=True), vectors]))
+    print(json.dumps({
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "rss_mb": rss_mb,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "chunks_per_second": len(chunks) / batch_seconds,
+        "dimension": int(vectors.shape[1]),
+    }))
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the queries for the latency figures")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    vectors = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'backend':<8} {'load (s)':>9} {'peak RSS (MB)':>14} {'p50 ms':>8} {'p95 ms':>8} {'chunks/sec':>11} {'dim':>5}")
+        for backend in BACKENDS:
+            path = os.path.join(tmp, f"{backend}.npy")
+            run = subprocess.run(
+                [sys.executable, "-m", "benchmarks.embedding_backend_bench", "--child", backend, path, str(args.rounds)],
+                capture_output=True, text=True,
+            )
+            if run.returncode != 0:
+                print(f"{backend:<8} unavailable: {run.stderr.strip().splitlines()[-1]}")
+                continue
+            r = json.loads(run.stdout.strip().splitlines()[-1])
+            print(f"{backend:<8} {r['load_seconds']:>9.2f} {r['rss_mb']:>14.0f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                  f"{r['chunks_per_second']:>11.1f} {r['dimension']:>5}")
+            vectors[backend] = np.load(path)
+
+    if len(vectors) == 2:
+        cosines = (vectors["torch"] * vectors["onnx"]).sum(axis=1)
+        print(f"\ncosine torch vs onnx over {len(cosines)} texts: mean {cosines.mean():.4f}  min {cosines.min():.4f}")
+        if cosines.min() < args.min_cosine:
+            print(f"FAIL: vectors disagree below {args.min_cosine}, re-embed the collection before switching backends")
+            sys.exit(1)
+        print("OK: the onnx backend can serve the existing collection")
+
+
+if __name__ == "__main__":
+    main()
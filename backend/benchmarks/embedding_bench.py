@@ -0,0 +1,49 @@
+"""
+Compares embedding throughput of the ingest pipeline on the bundled sample PDF:
+
+- single:   one encode call per chunk (the original behaviour)
+- batched:  EMBED_BATCH_SIZE chunks per encode call, inline
+- parallel: batches handed to EMBED_WORKERS threads while parsing continues
+
+Run from the backend directory:
+
+    python -m benchmarks.embedding_bench [--batch-size 64] [--workers 2]
+"""
+import argparse
+import os
+import time
+from rag.ingest import embed_chunks, iter_chunks, EMBED_BATCH_SIZE, EMBED_WORKERS
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "data", "sample_textbook.pdf")
+
+
+def run(mode, file_path, batch_size, workers):
+    start = time.perf_counter()
+    chunks, vectors = embed_chunks(iter_chunks(file_path), batch_size=batch_size, workers=workers)
+    elapsed = time.perf_counter() - start
+    print(f"{mode:<10} {len(chunks):>7} {elapsed:>9.2f}s {len(chunks) / elapsed:>11.1f}  shape={vectors.shape}")
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=SAMPLE_PDF)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=max(EMBED_WORKERS, 1))
+    args = parser.parse_args()
+
+    # warm up the model so the first mode does not pay for lazy initialisation
+    embed_chunks(iter_chunks(args.file), batch_size=args.batch_size, workers=0)
+
+    print(f"{'mode':<10} {'chunks':>7} {'time':>10} {'chunks/sec':>11}")
+    single = run("single", args.file, batch_size=1, workers=0)
+    run("batched", args.file, batch_size=args.batch_size, workers=0)
+    parallel = run("parallel", args.file, batch_size=args.batch_size, workers=args.workers)
+
+    # batching must not change the vectors
+    max_diff = float(abs(single - parallel).max()) if len(single) else 0.0
+    print(f"\nmax abs difference single vs parallel: {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Local stand-in for the Groq chat completions API (the OpenAI-compatible
+/openai/v1/chat/completions endpoint), with a configurable latency and a
+request quota enforced like the provider's: requests over the quota get a
+429 with a Retry-After header. Point the backend at it with
+
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=fake uvicorn main:app
+
+Run from the backend directory:
+
+    python -m benchmarks.fake_llm_server [--port 8765] [--latency 0.3] [--requests-per-second 5]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class FakeLLMServer:
+    """
+    The fake API and its counters: requests received, requests rejected with
+    429 and the distinct client connections they came over.
+    """
+    def __init__(self, latency: float = 0.3, requests_per_second: float = 0.0, burst: int = None):
+        self.latency = latency
+        self.rate = requests_per_second
+        self.capacity = burst or max(1, int(requests_per_second))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.requests = 0
+        self.rate_limited = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        self.app = self._build_app()
+
+    def _admit(self):
+        """Returns 0 when the request is within the quota, otherwise seconds until it would be."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "rate_limited": self.rate_limited, "connections": len(self.connections)}
+
+    def reset(self):
+        with self._lock:
+            self.requests = self.rate_limited = 0
+            self.connections.clear()
+            self.tokens = float(self.capacity)
+
+    def _build_app(self):
+        app = FastAPI()
+
+        @app.post("/openai/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            with self._lock:
+                self.requests += 1
+                self.connections.add((request.client.host, request.client.port))
+            wait = self._admit()
+            if wait:
+                with self._lock:
+                    self.rate_limited += 1
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    status_code=429,
+                    headers={"retry-after": f"{wait:.2f}"},
+                )
+
+            question = str(body["messages"][-1].get("content", ""))
+            text = f"Fake answer to: {question[:80]}"
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            usage = {"prompt_tokens": sum(len(str(m.get("content", ""))) for m in body["messages"]) // 4,
+                     "completion_tokens": len(text) // 4}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+            if not body.get("stream"):
+                await asyncio.sleep(self.latency)
+                return {
+                    "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": usage,
+                }
+
+            async def events():
+                words = text.split(" ")
+                for i, word in enumerate(words):
+                    await asyncio.sleep(self.latency / len(words))
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": body["model"],
+                        "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                done = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": body["model"],
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage},
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return app
+
+    def start(self, port: int = 8765):
+        """Serves the API from a background thread and returns its base URL once it accepts requests."""
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        threading.Thread(target=self.server.run, daemon=True).start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return f"http://127.0.0.1:{port}"
+
+    def stop(self):
+        self.server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--requests-per-second", type=float, default=0.0, help="0 disables the quota")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(latency=args.latency, requests_per_second=args.requests_per_second)
+    uvicorn.run(server.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
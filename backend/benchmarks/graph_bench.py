@@ -0,0 +1,241 @@
+"""
+Offline end-to-end benchmark of /ask: the real app and agent graph
+(graph/builder.py) with the stand-ins of benchmarks/stubs.py for Groq, the
+encoder, reranker, Qdrant and web search, each with a configurable latency.
+
+It replays the fixed question mix of data/graph_questions.jsonl, which covers
+every route, through /ask in-process and reports:
+
+- latency per route and per graph node (p50/p95, from the request traces)
+- throughput with --concurrency requests in flight
+- memory: peak traced allocation during a pass over the mix, and what stays
+  allocated per request afterwards
+
+The results are compared with the stored baseline in baselines/graph_bench.json:
+a latency or memory figure above the baseline by more than --tolerance, or a
+throughput below it, is reported as a regression and the script exits with
+status 1. Routing is decided by the (fake) LLM tier from the labels of the mix,
+so the route of every question is fixed; the answer cache is off, so every
+request runs the graph.
+
+Run from the backend directory:
+
+    python -m benchmarks.graph_bench [--rounds 5] [--concurrency 8] [--llm-latency 0.05]
+    python -m benchmarks.graph_bench --save-baseline   # after an intended change
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+import numpy as np
+
+QUESTIONS = os.path.join(os.path.dirname(__file__), "data", "graph_questions.jsonl")
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "graph_bench.json")
+
+# supervisor answers by route, see SupervisorAgent._route
+ROUTE_NAMES = {
+    "qa_agent": "QA Agent",
+    "tutor_agent": "Tutor Agent",
+    "planner_agent": "Planner Agent",
+    "reasoning_agent": "Reasoning Agent",
+    "search_agent": "Web Search Agent",
+}
+
+
+def load_questions(path=QUESTIONS):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_responder(questions):
+    from benchmarks.search_bench import search_responder
+    routes = {q["question"]: ROUTE_NAMES[q["route"]] for q in questions}
+
+    def responder(messages):
+        if "expert router" in str(messages[0].content):
+            return routes[str(messages[-1].content).removeprefix("User Question: ")]
+        # the search agent asks for one round of searches, everything else gets a canned answer
+        return search_responder(messages)
+    return responder
+
+
+def setup(args, questions):
+    """Installs the stand-ins and returns the /ask app; must run before anything imports the graph."""
+    os.environ["LMS_DATA_DIR"] = tempfile.mkdtemp(prefix="graph-bench-")
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("ROUTER_ENABLED", "false")
+    from benchmarks.stubs import install_stubs, FakeChatModel, FakeSearchBackend
+    install_stubs(llm_latency=args.llm_latency, retrieval_latency=args.retrieval_latency)
+
+    import langchain_groq
+    responder = make_responder(questions)
+    langchain_groq.ChatGroq = lambda *a, **kw: FakeChatModel(latency=args.llm_latency, responder=responder)
+    from rag import resources
+    resources.set_resource("search_backend", FakeSearchBackend(latency=args.search_latency))
+
+    import main
+    return main.app
+
+
+async def replay(client, questions, concurrency):
+    """Asks every question once, `concurrency` at a time; returns (timings, wall seconds)."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ask(q):
+        async with semaphore:
+            response = await client.post("/ask", json={
+                "question": q["question"],
+                "include_study_plan": q.get("include_study_plan", True),
+                "include_timings": True,
+            })
+            response.raise_for_status()
+            timings = response.json()["timings"]
+            if timings["route"] != q["route"]:
+                raise RuntimeError(f"'{q['question']}' went to {timings['route']}, expected {q['route']}")
+            return timings
+
+    start = time.perf_counter()
+    timings = await asyncio.gather(*(ask(q) for q in questions))
+    return timings, time.perf_counter() - start
+
+
+def summarize(timings, throughput, memory):
+    by_route, by_node = defaultdict(list), defaultdict(list)
+    for t in timings:
+        by_route[t["route"]].append(t["total_ms"])
+        for node, ms in t["nodes"].items():
+            by_node[node].append(ms)
+
+    def stats(values):
+        return {"count": len(values), "p50_ms": float(np.percentile(values, 50)), "p95_ms": float(np.percentile(values, 95))}
+    return {
+        "routes": {route: stats(values) for route, values in sorted(by_route.items())},
+        "nodes": {node: stats(values) for node, values in sorted(by_node.items())},
+        "throughput_rps": throughput,
+        "memory": memory,
+    }
+
+
+async def run(app, questions, args):
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        # warm-up pass: imports, lazily built resources, first-call costs
+        await replay(client, questions, 1)
+
+        # latency: one request at a time, so nodes are timed without queueing
+        timings = []
+        for _ in range(args.rounds):
+            pass_timings, _ = await replay(client, questions, 1)
+            timings.extend(pass_timings)
+
+        # throughput: the mix repeated with --concurrency requests in flight
+        _, wall = await replay(client, questions * args.rounds, args.concurrency)
+        throughput = len(questions) * args.rounds / wall
+
+        # memory: peak allocation over one pass, and what is still allocated afterwards
+        gc.collect()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        await replay(client, questions, 1)
+        gc.collect()
+        after, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {"peak_mb": (peak - before) / 2**20, "retained_kb_per_request": (after - before) / 1024 / len(questions)}
+
+    return summarize(timings, throughput, memory)
+
+
+def print_results(results):
+    print(f"\n{'route':<18} {'count':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for route, s in results["routes"].items():
+        print(f"{route:<18} {s['count']:>6} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f}")
+    print(f"\n{'node':<18} {'count':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for node, s in results["nodes"].items():
+        print(f"{node:<18} {s['count']:>6} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f}")
+    memory = results["memory"]
+    print(f"\nthroughput {results['throughput_rps']:.1f} requests/sec")
+    print(f"memory     peak {memory['peak_mb']:.2f} MB over one pass, {memory['retained_kb_per_request']:.1f} KB retained per request")
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    """Returns the regressions of `results` against `baseline`, as printable lines."""
+    regressions = []
+
+    def check(name, value, reference, higher_is_worse=True, slack=0.0):
+        if higher_is_worse and value > reference * (1 + tolerance) + slack:
+            regressions.append(f"{name}: {value:.2f} vs baseline {reference:.2f}")
+        if not higher_is_worse and value < reference * (1 - tolerance):
+            regressions.append(f"{name}: {value:.2f} vs baseline {reference:.2f}")
+
+    for group in ("routes", "nodes"):
+        for name, reference in baseline[group].items():
+            current = results[group].get(name)
+            if current is None:
+                continue
+            for metric in ("p50_ms", "p95_ms"):
+                check(f"{group[:-1]} {name} {metric}", current[metric], reference[metric], slack=slack_ms)
+    check("throughput_rps", results["throughput_rps"], baseline["throughput_rps"], higher_is_worse=False)
+    check("memory peak_mb", results["memory"]["peak_mb"], baseline["memory"]["peak_mb"], slack=1.0)
+    check("memory retained_kb_per_request", results["memory"]["retained_kb_per_request"],
+          baseline["memory"]["retained_kb_per_request"], slack=16.0)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the question mix")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight for the throughput figure")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--retrieval-latency", type=float, default=0.01)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before failing")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="allowed absolute slowdown, for very short nodes")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    questions = load_questions()
+    app = setup(args, questions)
+    config = {key: getattr(args, key) for key in ("rounds", "concurrency", "llm_latency", "retrieval_latency", "search_latency")}
+    config["router_enabled"] = os.environ["ROUTER_ENABLED"]
+
+    # the agents log every step to stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(run(app, questions, args))
+    print_results(results)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"config": config, **results}, f, indent=2)
+        print(f"\nbaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}, run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["config"] != config:
+        print(f"\nbaseline was recorded with {baseline['config']}, not comparable with {config}")
+        sys.exit(2)
+    regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+    if regressions:
+        print(f"\nREGRESSION against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nOK: within {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
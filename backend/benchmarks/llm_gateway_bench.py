@@ -0,0 +1,93 @@
+"""
+LLM calls against the fake Groq server (benchmarks/fake_llm_server.py), which
+enforces a request quota with 429s, comparing:
+
+- direct:  one ChatGroq per agent as before, each with its own HTTP client and
+           the SDK's default retries
+- gateway: the shared gateway of agents/llm.py, with its limiter set to the
+           server's quota, jittered retries and in-flight coalescing
+
+The workload is bursts of concurrent calls spread over the agents, where a
+share of the prompts repeat (the same question asked by several students).
+
+Run from the backend directory:
+
+    python -m benchmarks.llm_gateway_bench [--calls 60] [--distinct 20] [--quota 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from benchmarks.fake_llm_server import FakeLLMServer
+
+AGENTS = 7
+
+
+async def burst(models, prompts):
+    async def call(i, prompt):
+        start = time.perf_counter()
+        try:
+            await models[i % len(models)].ainvoke(prompt)
+            return time.perf_counter() - start, None
+        except Exception as error:
+            return time.perf_counter() - start, type(error).__name__
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(call(i, prompt) for i, prompt in enumerate(prompts)))
+    return time.perf_counter() - started, results
+
+
+def report(name, wall, results, server_stats):
+    latencies = sorted(latency for latency, error in results if error is None)
+    errors = [error for _, error in results if error is not None]
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else float("nan")
+    print(
+        f"{name:<8} {wall:>8.2f} {len(latencies):>5}/{len(results):<5} {len(errors):>6} "
+        f"{server_stats['requests']:>9} {server_stats['rate_limited']:>5} {server_stats['connections']:>6} "
+        f"{statistics.median(latencies) if latencies else float('nan'):>8.2f} {p95:>8.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=60, help="concurrent calls in the burst")
+    parser.add_argument("--distinct", type=int, default=20, help="distinct prompts among them")
+    parser.add_argument("--quota", type=float, default=10.0, help="server quota in requests per second")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(latency=args.latency, requests_per_second=args.quota)
+    base_url = server.start(args.port)
+
+    # the gateway reads its settings at import
+    os.environ.update({
+        "GROQ_BASE_URL": base_url,
+        "GROQ_API_KEY": "fake",
+        "LLM_REQUESTS_PER_MINUTE": str(args.quota * 60),
+        "LLM_REQUEST_BURST": str(server.capacity),
+        "LLM_TOKENS_PER_MINUTE": "0",
+    })
+    from langchain_groq import ChatGroq
+    from agents.llm import get_llm
+
+    prompts = [f"Question number {i % args.distinct}: explain topic {i % args.distinct}." for i in range(args.calls)]
+
+    print(f"\ncalls={args.calls} distinct={args.distinct} quota={args.quota}/s latency={args.latency}s")
+    print(f"{'client':<8} {'wall (s)':>8} {'ok':>11} {'errors':>6} {'upstream':>9} {'429s':>5} {'conns':>6} {'p50 (s)':>8} {'p95 (s)':>8}")
+
+    direct = [ChatGroq(model_name="llama3-8b-8192", groq_api_key="fake", base_url=base_url) for _ in range(AGENTS)]
+    wall, results = asyncio.run(burst(direct, prompts))
+    report("direct", wall, results, server.stats())
+
+    server.reset()
+    gateway = [get_llm() for _ in range(AGENTS)]
+    wall, results = asyncio.run(burst(gateway, prompts))
+    report("gateway", wall, results, server.stats())
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Load test for the /ask execution path against stubbed Groq and Qdrant clients.
+
+For each concurrency level it fires `--requests` questions through the agent
+graph with that many simulated users and reports p50/p99 latency and
+requests/sec. `--mode blocking` reproduces the old endpoint, which called the
+sync graph.invoke from inside the event loop.
+
+Run from the backend directory:
+
+    python -m benchmarks.load_test [--users 1 10 100] [--llm-latency 0.2]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from benchmarks.stubs import install_stubs
+
+QUESTIONS = [
+    "What does Newton's third law say?",
+    "Explain the work-energy theorem like I'm 10.",
+    "Create a study plan for the gravitation chapter.",
+    "If a train leaves at 3 PM at 60 mph, when does it cover 150 miles?",
+    "What is the formula for the time period of a pendulum?",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_level(graph, users, total, mode):
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(QUESTIONS[i % len(QUESTIONS)])
+
+    async def user():
+        while not queue.empty():
+            question = queue.get_nowait()
+            start = time.perf_counter()
+            inputs = {"question": question, "history": []}
+            if mode == "async":
+                await graph.ainvoke(inputs)
+            else:
+                graph.invoke(inputs)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--retrieval-latency", type=float, default=0.02)
+    parser.add_argument("--mode", choices=["async", "blocking"], default="async")
+    args = parser.parse_args()
+
+    install_stubs(llm_latency=args.llm_latency, retrieval_latency=args.retrieval_latency)
+    from graph.builder import graph
+
+    print(f"\nmode={args.mode} llm_latency={args.llm_latency}s requests/level={args.requests}")
+    print(f"{'users':>6} {'p50 (s)':>9} {'p99 (s)':>9} {'req/sec':>9}")
+    for users in args.users:
+        latencies, elapsed = asyncio.run(run_level(graph, users, args.requests, args.mode))
+        print(f"{users:>6} {statistics.median(latencies):>9.3f} {percentile(latencies, 99):>9.3f} "
+              f"{len(latencies) / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
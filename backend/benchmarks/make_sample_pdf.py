@@ -0,0 +1,159 @@
+"""
+Generates benchmarks/data/sample_textbook.pdf, the small synthetic textbook
+used by the benchmark scripts. Written with plain PDF syntax so it needs no
+extra dependencies. Run from the backend directory:
+
+    python -m benchmarks.make_sample_pdf
+"""
+import os
+import random
+import textwrap
+
+OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "data", "sample_textbook.pdf")
+
+CHAPTERS = {
+    "Laws of Motion": [
+        "Newton's first law states that a body remains at rest or in uniform motion unless acted upon by a net external force.",
+        "Newton's second law relates the net force on a body to the rate of change of its momentum, F = ma for constant mass.",
+        "Newton's third law states that to every action there is an equal and opposite reaction acting on a different body.",
+        "Inertia is the tendency of a body to resist any change in its state of rest or uniform motion.",
+        "The impulse of a force equals the change in momentum it produces, which explains why a cricketer pulls the hands back while catching.",
+        "Static friction adjusts itself up to a limiting value, while kinetic friction is nearly independent of the speed of sliding.",
+    ],
+    "Work, Energy and Power": [
+        "The work done by a constant force is the product of the force and the displacement along the direction of the force.",
+        "The work-energy theorem states that the change in kinetic energy of a particle equals the work done by the net force on it.",
+        "Potential energy is defined only for conservative forces such as gravity and the spring force.",
+        "The potential energy of a spring stretched by x is one half k x squared, where k is the spring constant.",
+        "Power is the rate at which work is done, and its SI unit is the watt, equal to one joule per second.",
+        "In an elastic collision both momentum and kinetic energy are conserved, whereas in an inelastic collision only momentum is conserved.",
+    ],
+    "Gravitation": [
+        "Kepler's law of orbits states that all planets move in elliptical orbits with the Sun at one of the foci.",
+        "The universal law of gravitation states that every body attracts every other body with a force proportional to the product of their masses.",
+        "The acceleration due to gravity decreases with altitude and also with depth below the surface of the Earth.",
+        "Escape speed from the surface of the Earth is about 11.2 kilometres per second and does not depend on the mass of the body.",
+        "A geostationary satellite revolves in the equatorial plane with a period of twenty four hours.",
+        "Weightlessness in an orbiting satellite arises because the satellite and everything inside it are in free fall.",
+    ],
+    "Thermodynamics": [
+        "The zeroth law of thermodynamics states that two systems in thermal equilibrium with a third are in equilibrium with each other.",
+        "The first law of thermodynamics is the law of conservation of energy, Delta Q = Delta U + Delta W.",
+        "An isothermal process takes place at constant temperature, while an adiabatic process allows no heat exchange.",
+        "The second law of thermodynamics forbids a perfect heat engine that converts all heat into work.",
+        "The efficiency of a Carnot engine depends only on the temperatures of the hot and cold reservoirs.",
+        "A refrigerator is a heat engine run in reverse, and its coefficient of performance can exceed one.",
+    ],
+    "Oscillations": [
+        "Simple harmonic motion is periodic motion in which the restoring force is proportional to the displacement.",
+        "The time period of a simple pendulum is two pi times the square root of its length divided by g.",
+        "In simple harmonic motion the total mechanical energy stays constant while kinetic and potential energy interchange.",
+        "Damped oscillations lose energy gradually, so the amplitude decreases exponentially with time.",
+        "Resonance occurs when the driving frequency is close to the natural frequency of the oscillator.",
+        "The phase of a particle in simple harmonic motion describes its position and direction of motion at a given instant.",
+    ],
+    "Waves": [
+        "A mechanical wave transfers energy through a medium without any net transport of the medium itself.",
+        "In a transverse wave the particles oscillate perpendicular to the direction of propagation of the wave.",
+        "The speed of sound in a gas depends on its temperature and is given by Laplace's corrected formula.",
+        "The principle of superposition states that the resultant displacement is the algebraic sum of individual displacements.",
+        "Standing waves on a string fixed at both ends have nodes at the ends and support only certain harmonics.",
+        "Beats are produced when two sound waves of slightly different frequencies interfere with each other.",
+    ],
+    "Electric Charges and Fields": [
+        "Coulomb's law states that the force between two point charges varies inversely as the square of the distance between them.",
+        "Electric charge is quantised, and every charge is an integral multiple of the elementary charge e.",
+        "Electric field lines start on positive charges and end on negative charges and never cross each other.",
+        "Gauss's law states that the electric flux through a closed surface equals the enclosed charge divided by epsilon zero.",
+        "An electric dipole placed in a uniform field experiences a torque but no net force.",
+        "Charging by induction leaves a conductor with a charge opposite to that of the inducing body.",
+    ],
+    "Current Electricity": [
+        "Ohm's law states that the current through a conductor is proportional to the potential difference across it.",
+        "The resistivity of a metallic conductor increases with temperature.",
+        "Kirchhoff's junction rule follows from conservation of charge, and the loop rule from conservation of energy.",
+        "A Wheatstone bridge is balanced when the ratio of resistances in its two arms are equal.",
+        "The internal resistance of a cell reduces the terminal voltage when current is drawn from it.",
+        "Drift velocity of electrons is very small even though the electric signal travels close to the speed of light.",
+    ],
+}
+
+PAGES_PER_CHAPTER = 5
+SENTENCES_PER_PAGE = 30
+LINE_WIDTH = 95
+LINES_PER_PAGE = 58
+
+
+def _page_lines(rng, chapter_no, title, facts, page_no):
+    lines = [f"Chapter {chapter_no}: {title}", f"Section {chapter_no}.{page_no}", ""]
+    sentences = [rng.choice(facts) for _ in range(SENTENCES_PER_PAGE)]
+    for paragraph_start in range(0, len(sentences), 6):
+        paragraph = " ".join(sentences[paragraph_start:paragraph_start + 6])
+        lines.extend(textwrap.wrap(paragraph, LINE_WIDTH))
+        lines.append("")
+    return lines[:LINES_PER_PAGE]
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages):
+    """Serialise a list of pages (each a list of text lines) to PDF bytes."""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for lines in pages:
+        stream = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"]
+        stream.extend(f"({_escape(line)}) '" for line in lines)
+        stream.append("ET")
+        content = "\n".join(stream).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font_id, content_id)
+        ))
+
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(out)
+
+
+def main():
+    rng = random.Random(42)
+    pages = []
+    for chapter_no, (title, facts) in enumerate(CHAPTERS.items(), 1):
+        for page_no in range(1, PAGES_PER_CHAPTER + 1):
+            pages.append(_page_lines(rng, chapter_no, title, facts, page_no))
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, "wb") as f:
+        f.write(build_pdf(pages))
+    print(f"Wrote {len(pages)} pages to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Parsing throughput of the ingest (PDF -> pages -> chunks) by number of parse
+worker processes, on a large PDF made by repeating the pages of the sample
+textbook. Every run must produce the same chunks, in the same order and with
+the same page numbers, as the serial run.
+
+Run from the backend directory:
+
+    python -m benchmarks.parse_bench [--pages 1000] [--workers 1,2,4,8]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pypdf import PdfReader, PdfWriter
+from rag.ingest import iter_chunks
+from rag.parsing import PARSE_PAGES_PER_TASK, page_count
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "data", "sample_textbook.pdf")
+
+
+def make_large_pdf(path, pages):
+    source = PdfReader(SAMPLE_PDF)
+    writer = PdfWriter()
+    for i in range(pages):
+        writer.add_page(source.pages[i % len(source.pages)])
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def parse(file_path, workers):
+    start = time.perf_counter()
+    chunks = [(chunk.metadata.get("page"), chunk.page_content) for chunk in iter_chunks(file_path, workers=workers)]
+    return time.perf_counter() - start, chunks
+
+
+def main():
+    default_workers = sorted({1, 2, 4, os.cpu_count() or 1})
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)), help="comma-separated worker counts")
+    parser.add_argument("--file", help="parse this PDF instead of a generated one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = args.file
+        if not file_path:
+            file_path = os.path.join(tmp, "large_textbook.pdf")
+            make_large_pdf(file_path, args.pages)
+
+        pages = page_count(file_path)
+        print(f"{os.path.basename(file_path)}: {pages} pages, {os.cpu_count()} cores, {PARSE_PAGES_PER_TASK} pages per task\n")
+        print(f"{'workers':>7} {'seconds':>8} {'pages/sec':>10} {'speedup':>8} {'chunks':>7} {'same as serial':>15}")
+        serial = None
+        for workers in sorted(int(w) for w in args.workers.split(",")):
+            seconds, chunks = parse(file_path, workers)
+            if serial is None:
+                serial = (seconds, chunks)
+            print(f"{workers:>7} {seconds:>8.2f} {pages / seconds:>10.1f} {serial[0] / seconds:>7.2f}x "
+                  f"{len(chunks):>7} {str(chunks == serial[1]):>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Memory, query latency and recall@k of the QDRANT_QUANTIZATION modes against
+the unquantized collection.
+
+The same vectors go into one throwaway collection per mode, created with the
+vector and quantization settings ingest uses (rag.resources). Recall@k is
+measured against an exact (brute-force) search of the float32 collection, for
+the quantized modes both with and without rescoring on the original vectors.
+The vectors are clustered synthetic 384-dim embeddings, or with --file the
+chunk embeddings of a PDF, queried with perturbed copies of stored vectors.
+
+Memory is the vector storage the server keeps in RAM vs on disk for each mode
+(float32 originals: 4 bytes per dimension, int8: 1, binary: 1 bit), as the
+server does not report per-collection memory.
+
+Run from the backend directory against the Qdrant server of QDRANT_URL (the
+embedded store ignores quantization, every mode then searches float32):
+
+    python -m benchmarks.quantization_bench [--points 100000] [--k 10] [--modes none,scalar,binary]
+"""
+import argparse
+import time
+import numpy as np
+from qdrant_client import models
+from rag import resources
+from rag.resources import quantization_config, vector_params, search_params
+
+BENCH_COLLECTION = "lms_quantization_bench"
+DIMENSION = 384
+BYTES_PER_DIMENSION = {"none": 4, "scalar": 1, "binary": 1 / 8}
+
+
+def normalize(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def synthetic_vectors(rng, n, clusters=200):
+    # sentence embeddings are far from uniform on the sphere, clusters are closer to them
+    centers = rng.standard_normal((clusters, DIMENSION))
+    return normalize(centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, DIMENSION)))
+
+
+def file_vectors(file_path):
+    from rag.ingest import iter_chunks
+    texts = [chunk.page_content for chunk in iter_chunks(file_path)]
+    return normalize(resources.get_encoder().encode(texts, batch_size=resources.EMBED_BATCH_SIZE, convert_to_numpy=True))
+
+
+def fill(client, name, mode, vectors, batch_size=1000):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(name, vectors_config=vector_params(DIMENSION, mode), quantization_config=quantization_config(mode))
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        client.upsert(name, points=models.Batch(ids=list(range(start, start + len(batch))), vectors=batch.tolist()))
+    # let the server finish indexing and quantizing before timing
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def search(client, name, queries, k, params):
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        points = client.query_points(name, query=query.tolist(), limit=k, search_params=params).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append({point.id for point in points})
+    return ids, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--modes", default="none,scalar,binary")
+    parser.add_argument("--file", help="use the chunk embeddings of this PDF instead of synthetic vectors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--qdrant-path", help="use an embedded Qdrant at this path (':memory:' for in-memory) instead of QDRANT_URL")
+    args = parser.parse_args()
+
+    if args.qdrant_path:
+        from qdrant_client import QdrantClient
+        resources.set_resource("qdrant_client", QdrantClient(location=":memory:") if args.qdrant_path == ":memory:"
+                               else QdrantClient(path=args.qdrant_path))
+        print("embedded Qdrant: quantization is ignored, every mode searches float32 vectors")
+    client = resources.get_qdrant_client()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = file_vectors(args.file) if args.file else synthetic_vectors(rng, args.points)
+    queries = normalize(vectors[rng.integers(0, len(vectors), args.queries)]
+                        + 0.3 * rng.standard_normal((args.queries, DIMENSION)) / np.sqrt(DIMENSION))
+
+    modes = args.modes.split(",")
+    names = {mode: f"{BENCH_COLLECTION}_{mode}" for mode in set(modes) | {"none"}}
+    try:
+        for mode, name in names.items():
+            fill(client, name, mode, vectors)
+        exact, _ = search(client, names["none"], queries, args.k, models.SearchParams(exact=True))
+        # warm up the caches of every collection before timing
+        for name in names.values():
+            search(client, name, queries[:20], args.k, None)
+
+        full_mb = len(vectors) * DIMENSION * 4 / 2**20
+        print(f"\n{len(vectors)} vectors, {len(queries)} queries, k={args.k}\n")
+        print(f"{'mode':<16} {'RAM (MB)':>9} {'disk (MB)':>10} {'p50 ms':>7} {'p95 ms':>7} {'recall@' + str(args.k):>10}")
+        for mode in modes:
+            ram_mb = len(vectors) * DIMENSION * BYTES_PER_DIMENSION[mode] / 2**20
+            disk_mb = full_mb if mode != "none" else 0.0
+            for rescore in ([None] if mode == "none" else [True, False]):
+                params = search_params(mode, rescore=rescore) if rescore is not None else None
+                ids, latencies = search(client, names[mode], queries, args.k, params)
+                recall = np.mean([len(found & truth) / len(truth) for found, truth in zip(ids, exact) if truth])
+                label = mode if rescore is None else f"{mode} {'rescored' if rescore else 'raw'}"
+                print(f"{label:<16} {ram_mb:>9.1f} {disk_mb:>10.1f} {np.percentile(latencies, 50):>7.2f} "
+                      f"{np.percentile(latencies, 95):>7.2f} {recall:>10.3f}")
+    finally:
+        for name in names.values():
+            client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
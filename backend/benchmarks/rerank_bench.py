@@ -0,0 +1,94 @@
+"""
+Cost and gain of the cross-encoder rerank stage on the bundled sample PDF.
+
+For each labeled query in data/retrieval_queries.jsonl (a phrase; every chunk
+containing it is relevant) it compares the top-k chunks the agents receive:
+
+- retrieval: the top k of the configured retriever (RETRIEVAL_MODE)
+- reranked:  RERANK_FETCH_K candidates rescored by the cross-encoder, best k kept
+
+and reports recall@k, precision@1, MRR, the QA context the chunks produce, and
+the CPU rerank latency, cold and with the (query, chunk) score cache warm.
+
+Run from the backend directory (ingests the sample PDF first):
+
+    python -m benchmarks.rerank_bench [--k 3] [--fetch-k 30] [--qdrant-path :memory:]
+"""
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+from rag import resources
+from rag.context import build_context, count_tokens
+from rag.ingest import ingest_file
+from rag.rerank import Reranker, RERANK_FETCH_K
+from rag.retrieval import get_retriever
+from benchmarks.retrieval_bench import SAMPLE_PDF, QUERIES, load_queries, relevant_ids
+
+
+def quality(results, relevant, k):
+    recalls, precisions, reciprocal_ranks, tokens = [], [], [], []
+    for query, docs in results.items():
+        expected = relevant[query]
+        if not expected:
+            continue
+        ids = [str(doc.metadata.get("_id")) for doc in docs[:k]]
+        recalls.append(len(set(ids) & expected) / min(k, len(expected)))
+        precisions.append(float(bool(ids) and ids[0] in expected))
+        rank = next((i + 1 for i, point_id in enumerate(ids) if point_id in expected), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tokens.append(count_tokens(build_context(docs[:k], "qa_agent")))
+    return np.mean(recalls), np.mean(precisions), np.mean(reciprocal_ranks), np.mean(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=SAMPLE_PDF)
+    parser.add_argument("--queries", default=QUERIES)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=RERANK_FETCH_K)
+    parser.add_argument("--qdrant-path", help="use an embedded Qdrant at this path (':memory:' for in-memory) instead of QDRANT_URL")
+    args = parser.parse_args()
+
+    if args.qdrant_path:
+        from qdrant_client import QdrantClient
+        resources.set_resource("qdrant_client", QdrantClient(location=":memory:") if args.qdrant_path == ":memory:"
+                               else QdrantClient(path=args.qdrant_path))
+
+    print(ingest_file(args.file))
+    queries = load_queries(args.queries)
+    relevant = relevant_ids(queries)
+
+    top_k = get_retriever(args.k)
+    candidates = get_retriever(args.fetch_k)
+    reranker = Reranker()
+    # load the models and warm up the index before timing
+    candidates.invoke("warm up")
+    resources.get_reranker().predict([("warm up", "warm up")])
+
+    baseline, reranked, cold, warm = {}, {}, [], []
+    for q in queries:
+        baseline[q["query"]] = top_k.invoke(q["query"])
+        docs = candidates.invoke(q["query"])
+        start = time.perf_counter()
+        reranked[q["query"]] = reranker.rerank(q["query"], docs, args.k)
+        cold.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        reranker.rerank(q["query"], docs, args.k)
+        warm.append((time.perf_counter() - start) * 1000)
+
+    print(f"\n{len(queries)} queries, k={args.k}, {args.fetch_k} candidates reranked, model {resources.RERANK_MODEL}\n")
+    print(f"{'stage':<10} {'recall@' + str(args.k):>9} {'P@1':>6} {'MRR':>6} {'ctx tokens':>11}")
+    for name, results in [("retrieval", baseline), ("reranked", reranked)]:
+        recall, precision, mrr, tokens = quality(results, relevant, args.k)
+        print(f"{name:<10} {recall:>9.3f} {precision:>6.3f} {mrr:>6.3f} {tokens:>11.0f}")
+
+    print(f"\nrerank latency on CPU ({args.fetch_k} pairs per query)")
+    for name, latencies in [("cold", cold), ("cached", warm)]:
+        print(f"{name:<10} p50 {np.percentile(latencies, 50):>7.1f} ms   p95 {np.percentile(latencies, 95):>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compares dense-only and hybrid (dense + BM25 with reciprocal-rank fusion)
+retrieval on the bundled sample PDF.
+
+Each query in data/retrieval_queries.jsonl names a phrase; every chunk that
+contains it counts as relevant. Reports recall@k and per-query latency:
+
+    recall@k = |relevant in top k| / min(k, |relevant|)
+
+Run from the backend directory (ingests the sample PDF first):
+
+    python -m benchmarks.retrieval_bench [--k 3] [--qdrant-path :memory:]
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+from rag import resources
+from rag.ingest import ingest_file
+from rag.retrieval import HybridRetriever
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "data", "sample_textbook.pdf")
+QUERIES = os.path.join(os.path.dirname(__file__), "data", "retrieval_queries.jsonl")
+
+
+def load_queries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def relevant_ids(queries):
+    """Point IDs of the chunks containing each query's phrase."""
+    client = resources.get_qdrant_client()
+    relevant = {q["query"]: set() for q in queries}
+    offset = None
+    while True:
+        points, offset = client.scroll(resources.QDRANT_COLLECTION, limit=256, offset=offset, with_payload=True)
+        for point in points:
+            text = (point.payload or {}).get("page_content", "").lower()
+            for q in queries:
+                if q["relevant"].lower() in text:
+                    relevant[q["query"]].add(str(point.id))
+        if offset is None:
+            return relevant
+
+
+def run(mode, retriever, queries, relevant, k):
+    recalls, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        docs = retriever.invoke(q["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        expected = relevant[q["query"]]
+        if expected:
+            found = {str(doc.metadata.get("_id")) for doc in docs[:k]}
+            recalls.append(len(found & expected) / min(k, len(expected)))
+    latencies = np.asarray(latencies)
+    print(f"{mode:<8} {np.mean(recalls):>10.3f} {np.percentile(latencies, 50):>9.1f} {np.percentile(latencies, 99):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=SAMPLE_PDF)
+    parser.add_argument("--queries", default=QUERIES)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--qdrant-path", help="use an embedded Qdrant at this path (':memory:' for in-memory) instead of QDRANT_URL")
+    args = parser.parse_args()
+
+    if args.qdrant_path:
+        from qdrant_client import QdrantClient
+        resources.set_resource("qdrant_client", QdrantClient(location=":memory:") if args.qdrant_path == ":memory:"
+                               else QdrantClient(path=args.qdrant_path))
+
+    print(ingest_file(args.file))
+    queries = load_queries(args.queries)
+    relevant = relevant_ids(queries)
+    print(f"{len(queries)} queries, {sum(map(len, relevant.values()))} relevant chunks, k={args.k}\n")
+
+    dense = resources.get_vectorstore().as_retriever(search_type="similarity", search_kwargs={"k": args.k})
+    hybrid = HybridRetriever(k=args.k)
+    # warm up the encoder and the memory-mapped index
+    dense.invoke("warm up")
+    hybrid.invoke("warm up")
+
+    print(f"{'mode':<8} {'recall@' + str(args.k):>10} {'p50 ms':>9} {'p99 ms':>9}")
+    run("dense", dense, queries, relevant, args.k)
+    run("hybrid", hybrid, queries, relevant, args.k)
+
+
+if __name__ == "__main__":
+    main()
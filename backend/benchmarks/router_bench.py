@@ -0,0 +1,83 @@
+"""
+Offline accuracy and latency of the fast router on a labeled question set
+(benchmarks/data/routing_questions.jsonl).
+
+Reports, per tier, how many questions the tier decided, its accuracy on them,
+and p50/p99 routing latency. Questions below the confidence threshold would
+fall back to the LLM router; pass --llm to also route them through Groq
+(needs GROQ_API_KEY).
+
+Run from the backend directory:
+
+    python -m benchmarks.router_bench [--threshold 0.6] [--llm]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+from agents.router import FastRouter, ROUTER_CONFIDENCE_THRESHOLD
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), "data", "routing_questions.jsonl")
+
+
+def load_questions(path=QUESTIONS_PATH):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def p99(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=ROUTER_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--llm", action="store_true", help="route low-confidence questions through the LLM supervisor")
+    args = parser.parse_args()
+
+    questions = load_questions()
+    router = FastRouter(threshold=args.threshold)
+    router.classify("warm up")  # loads the encoder and builds the centroids
+
+    supervisor = None
+    if args.llm:
+        from agents.supervisor import SupervisorAgent
+        supervisor = SupervisorAgent()
+
+    stats = defaultdict(lambda: {"total": 0, "correct": 0, "latencies": []})
+    local_correct = 0
+    for item in questions:
+        start = time.perf_counter()
+        label, confidence, tier = router.classify(item["question"])
+        elapsed = time.perf_counter() - start
+        local_correct += label == item["route"]
+
+        if confidence < args.threshold:
+            tier = "llm" if supervisor else "fallback"
+            if supervisor:
+                start = time.perf_counter()
+                label = supervisor._route(supervisor.runnable.invoke({"question": item["question"]}).content)["next_node"]
+                elapsed += time.perf_counter() - start
+
+        stats[tier]["total"] += 1
+        stats[tier]["correct"] += label == item["route"]
+        stats[tier]["latencies"].append(elapsed)
+
+    print(f"threshold={args.threshold}  questions={len(questions)}")
+    print(f"{'tier':<10} {'decided':>8} {'accuracy':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for tier in ("rules", "embedding", "fallback", "llm"):
+        if tier not in stats:
+            continue
+        s = stats[tier]
+        print(f"{tier:<10} {s['total']:>8} {s['correct'] / s['total']:>9.0%} "
+              f"{statistics.median(s['latencies']) * 1000:>9.1f} {p99(s['latencies']) * 1000:>9.1f}")
+    print(f"\nlocal-only accuracy (no fallback): {local_correct / len(questions):.0%}")
+    if "fallback" in stats:
+        print("'fallback' rows would go to the LLM router; rerun with --llm to include it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+SearchAgent against the fake search backend of benchmarks/stubs.py, with a
+fake model that asks for --fanout searches per round. Scenarios:
+
+- fan-out:  one question; the async path runs the searches of a round
+            concurrently, the sync path one after the other
+- cached:   the same question again, served from the search cache
+- popular:  --requests concurrent questions drawn from --distinct ones; identical
+            searches in flight share one backend call, so the bench fails unless
+            the backend saw exactly one call per distinct query
+- popular-sync: the same through the sync path, on threads
+- slow:     a backend that hangs, cut off by the per-search timeout
+- looping:  a model that never stops searching, stopped by the iteration cap
+- budget:   a looping model on a slow backend, stopped by the time budget
+
+Run from the backend directory:
+
+    python -m benchmarks.search_bench [--latency 0.5] [--fanout 3] [--requests 40] [--distinct 8]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessage, ToolMessage
+from benchmarks.stubs import install_stubs, default_responder, FakeChatModel, FakeSearchBackend
+
+LLM_LATENCY = 0.05
+# how the fake model behaves in the SearchAgent's tool loop: "answer" after one round, or "loop"
+behaviour = {"mode": "answer", "fanout": 3}
+
+
+def search_responder(messages):
+    if "research assistant" not in str(messages[0].content):
+        return default_responder(messages)
+    rounds = sum(isinstance(m, ToolMessage) for m in messages) // behaviour["fanout"]
+    if rounds and behaviour["mode"] == "answer":
+        return f"Answer built from {rounds * behaviour['fanout']} search results."
+    question = str(messages[1].content)
+    return AIMessage(content="", tool_calls=[
+        {"name": "web_search", "args": {"query": f"{question} (aspect {rounds}.{i})"}, "id": f"call-{rounds}-{i}"}
+        for i in range(behaviour["fanout"])
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per search of the fake backend")
+    parser.add_argument("--fanout", type=int, default=3, help="searches the model asks for per round")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--distinct", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=1.0, help="per-search timeout for the slow scenario")
+    parser.add_argument("--budget", type=float, default=3.0, help="time budget for the budget scenario")
+    args = parser.parse_args()
+    behaviour["fanout"] = args.fanout
+
+    install_stubs(llm_latency=LLM_LATENCY)
+    import langchain_groq
+    langchain_groq.ChatGroq = lambda *a, **kw: FakeChatModel(latency=LLM_LATENCY, responder=search_responder)
+    from rag import resources
+    from agents.search_agent import SearchAgent, SEARCH_MAX_ITERATIONS
+    from tools.web_search import search_cache, web_search_tool
+
+    backend = FakeSearchBackend(latency=args.latency)
+    resources.set_resource("search_backend", backend)
+    agent = SearchAgent()
+
+    def run(name, fn, requests=1):
+        calls = backend.calls
+        start = time.perf_counter()
+        answers = fn()
+        wall = time.perf_counter() - start
+        print(f"{name:<12} {wall:>8.2f} {requests:>9} {backend.calls - calls:>15}   {answers[0][:60]}")
+        return backend.calls - calls
+
+    def ask(question):
+        return asyncio.run(agent.asearch_node({"question": question}))["answer"]
+
+    async def ask_many(questions):
+        results = await asyncio.gather(*(agent.asearch_node({"question": q}) for q in questions))
+        return [result["answer"] for result in results]
+
+    print(f"\nbackend latency {args.latency}s, {args.fanout} searches per round, model latency {LLM_LATENCY}s\n")
+    print(f"{'scenario':<12} {'wall (s)':>8} {'questions':>9} {'backend calls':>15}   answer")
+    run("fan-out", lambda: [ask("What is the latest Mars mission?")])
+    run("cached", lambda: [ask("what is the latest  Mars mission?")])
+    search_cache.clear()
+    run("sync", lambda: [agent.search_node({"question": "What is the latest Mars mission?"})["answer"]])
+
+    search_cache.clear()
+    questions = [f"Popular question number {i % args.distinct}?" for i in range(args.requests)]
+    expected = min(args.distinct, args.requests) * args.fanout
+    popular_calls = {"popular": run("popular", lambda: asyncio.run(ask_many(questions)), args.requests)}
+    search_cache.clear()
+    with ThreadPoolExecutor(max_workers=args.requests) as pool:
+        popular_calls["popular-sync"] = run("popular-sync", lambda: list(pool.map(
+            lambda q: agent.search_node({"question": q})["answer"], questions)), args.requests)
+
+    backend.latency = 30.0
+    web_search_tool.timeout = args.timeout
+    run("slow", lambda: [ask("Who won the match today?")])
+
+    backend.latency = 0.01
+    web_search_tool.timeout = args.latency * 10
+    behaviour["mode"] = "loop"
+    run("looping", lambda: [ask(f"Loop until stopped ({SEARCH_MAX_ITERATIONS} rounds max)")])
+
+    backend.latency = args.budget
+    budgeted = SearchAgent(time_budget=args.budget)
+    start = time.perf_counter()
+    calls = backend.calls
+    answer = asyncio.run(budgeted.asearch_node({"question": "Loop on a slow backend"}))["answer"]
+    print(f"{'budget':<12} {time.perf_counter() - start:>8.2f} {1:>9} {backend.calls - calls:>15}   {answer[:60]}")
+    print(f"\nsearch cache: {search_cache.stats()}")
+    for name, made in popular_calls.items():
+        if made != expected:
+            print(f"FAIL: {name} made {made} backend calls for {expected} distinct searches")
+            sys.exit(1)
+    print(f"OK: one backend call per distinct search ({expected})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Startup time and memory of the embedding model and Qdrant client wiring.
+
+- per-agent: what the agents and rag/ingest.py used to do, one
+  all-MiniLM-L6-v2 copy and one QdrantClient for each of the four consumers
+- shared:    the rag.resources registry, where all four consumers get the same
+  lazily loaded encoder and the same client
+
+Each mode runs in a fresh interpreter so import costs and peak RSS are not
+shared. Run from the backend directory:
+
+    python -m benchmarks.startup_bench
+"""
+import json
+import resource
+import subprocess
+import sys
+import time
+
+CONSUMERS = ["qa_agent", "tutor_agent", "planner_agent", "ingest"]
+
+
+def per_agent():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from qdrant_client import QdrantClient
+    from sentence_transformers import SentenceTransformer
+    from rag.resources import EMBEDDING_MODEL, QDRANT_URL
+
+    models, clients = [], []
+    for consumer in CONSUMERS:
+        if consumer == "ingest":
+            models.append(SentenceTransformer("all-MiniLM-L6-v2"))
+        else:
+            models.append(HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL))
+        clients.append(QdrantClient(url=QDRANT_URL))
+    models[0].embed_query("warm up")
+    return len({id(m) for m in models})
+
+
+def shared():
+    from rag.resources import get_embeddings, get_encoder, get_qdrant_client
+
+    models, clients = [], []
+    for consumer in CONSUMERS:
+        models.append(get_encoder() if consumer == "ingest" else get_embeddings())
+        clients.append(get_qdrant_client())
+    get_embeddings().embed_query("warm up")
+    return len({id(get_encoder())})
+
+
+def child(mode):
+    start = time.perf_counter()
+    copies = {"per-agent": per_agent, "shared": shared}[mode]()
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is reported in kilobytes on Linux
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"mode": mode, "seconds": elapsed, "rss_mb": rss_mb, "model_copies": copies}))
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        child(sys.argv[2])
+        return
+
+    print(f"{'mode':<10} {'startup (s)':>12} {'peak RSS (MB)':>14} {'model copies':>13}")
+    for mode in ("per-agent", "shared"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup_bench", "--child", mode],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<10} {result['seconds']:>12.2f} {result['rss_mb']:>14.0f} {result['model_copies']:>13}")
+
+
+if __name__ == "__main__":
+    main()
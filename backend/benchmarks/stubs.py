@@ -0,0 +1,199 @@
+"""
+Deterministic local stand-ins for Groq, the embedding and rerank models,
+Qdrant and the web search backend, so the agent graph can be exercised offline. Call install_stubs()
+before importing graph.builder; it registers the fakes as the shared resources
+and swaps the provider chat model class the LLM gateway wraps.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.retrievers import BaseRetriever
+import numpy as np
+
+ROUTES = ["QA Agent", "Tutor Agent", "Planner Agent", "Reasoning Agent"]
+
+SAMPLE_CHUNKS = [
+    "Newton's third law states that to every action there is an equal and opposite reaction.",
+    "The work-energy theorem states that the change in kinetic energy equals the work done by the net force.",
+    "Kepler's law of orbits states that all planets move in elliptical orbits with the Sun at one focus.",
+    "The first law of thermodynamics is the law of conservation of energy.",
+    "The time period of a simple pendulum depends on its length and on g.",
+]
+
+
+def default_responder(messages: List[BaseMessage]) -> str:
+    """Picks a route for the supervisor prompt and returns a canned answer otherwise."""
+    system = str(messages[0].content) if messages else ""
+    question = str(messages[-1].content) if messages else ""
+    if "expert router" in system:
+        return ROUTES[zlib.crc32(question.encode()) % len(ROUTES)]
+    return f"Stub answer to: {question[:80]}"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that sleeps for `latency` seconds and answers from `responder`,
+    which returns the text of the answer or a whole AIMessage (e.g. with tool calls).
+    """
+
+    latency: float = 0.05
+    responder: Any = default_responder
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages) -> AIMessage:
+        reply = self.responder(messages)
+        return reply if isinstance(reply, AIMessage) else AIMessage(content=reply)
+
+    def _result(self, messages):
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        if reply.tool_calls:
+            await asyncio.sleep(self.latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=reply.content, tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(reply.tool_calls)
+            ]))
+            return
+        # spread the latency over the words, so time-to-first-token can be measured
+        words = reply.content.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            yield chunk
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class FakeRetriever(BaseRetriever):
+    """Retriever returning the first `k` sample chunks after `latency` seconds."""
+
+    k: int = 3
+    latency: float = 0.01
+
+    def _docs(self):
+        return [Document(page_content=SAMPLE_CHUNKS[i % len(SAMPLE_CHUNKS)], metadata={"_id": f"sample-{i}"})
+                for i in range(self.k)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        time.sleep(self.latency)
+        return self._docs()
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return self._docs()
+
+
+class FakeSearchBackend:
+    """Web search stand-in answering every query with canned results after `latency` seconds."""
+
+    def __init__(self, latency: float = 0.2, results: int = 3):
+        self.latency = latency
+        self.results = results
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _results(self, query):
+        with self._lock:
+            self.calls += 1
+        slug = "-".join(query.lower().split())
+        return [{"url": f"https://example.org/{slug}/{i}", "content": f"Result {i} about {query}."}
+                for i in range(self.results)]
+
+    def invoke(self, input, config=None, **kwargs):
+        time.sleep(self.latency)
+        return self._results(input["query"])
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._results(input["query"])
+
+
+class FakeEncoder:
+    """SentenceTransformer stand-in producing deterministic unit vectors from a text hash."""
+
+    dimension = 384
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False,
+               normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        rows = []
+        for text in [texts] if single else texts:
+            rng = np.random.default_rng(zlib.crc32(text.encode()))
+            vector = rng.standard_normal(self.dimension).astype(np.float32)
+            rows.append(vector / np.linalg.norm(vector))
+        matrix = np.vstack(rows) if rows else np.empty((0, self.dimension), dtype=np.float32)
+        return matrix[0] if single else matrix
+
+
+class FakeCrossEncoder:
+    """CrossEncoder stand-in scoring a pair by the share of query words found in the text."""
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False, **kwargs):
+        scores = []
+        for query, text in pairs:
+            words = set(query.lower().split())
+            scores.append(len(words & set(text.lower().split())) / max(len(words), 1))
+        return np.asarray(scores, dtype=np.float32)
+
+
+class FakeVectorStore:
+    def __init__(self, *args, retrieval_latency: float = 0.01, **kwargs):
+        self.retrieval_latency = retrieval_latency
+
+    def as_retriever(self, search_type="similarity", search_kwargs=None):
+        k = (search_kwargs or {}).get("k", 4)
+        return FakeRetriever(k=k, latency=self.retrieval_latency)
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        docs = FakeRetriever(k=k, latency=self.retrieval_latency).invoke(query)
+        return [(doc, 1.0 - 0.01 * i) for i, doc in enumerate(docs)]
+
+
+def install_stubs(llm_latency: float = 0.05, retrieval_latency: float = 0.01):
+    """Replaces the external clients used by the agents with the fakes above."""
+    import langchain_groq
+    from rag import resources
+
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ.setdefault("TAVILY_API_KEY", "stub")
+    # the fake store has no real points for BM25 hits to resolve against
+    os.environ.setdefault("RETRIEVAL_MODE", "dense")
+    # the fake model has no provider quota to respect
+    os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+    os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "0")
+
+    langchain_groq.ChatGroq = lambda *args, **kwargs: FakeChatModel(latency=llm_latency)
+    resources.set_resource("encoder", FakeEncoder())
+    resources.set_resource("reranker", FakeCrossEncoder())
+    resources.set_resource("vectorstore", FakeVectorStore(retrieval_latency=retrieval_latency))
+    resources.set_resource("search_backend", FakeSearchBackend())
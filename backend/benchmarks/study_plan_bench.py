@@ -0,0 +1,67 @@
+"""
+Wall-clock cost of the study plan on QA and Tutor questions, against stubbed
+Groq and Qdrant clients:
+
+- sequential: the plan is generated from the finished answer (two LLM calls in a row)
+- parallel:   the plan is generated from the question and context next to the answer
+- no plan:    include_study_plan=False
+
+Run from the backend directory:
+
+    python -m benchmarks.study_plan_bench [--llm-latency 0.5] [--requests 20]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from benchmarks.stubs import install_stubs
+
+# questions the keyword rules send to the QA and Tutor agents
+QUESTIONS = [
+    "Explain Newton's third law in simple terms.",
+    "What is the definition of escape speed?",
+    "Explain the work-energy theorem like I'm 10.",
+    "What is the formula for the time period of a pendulum?",
+]
+
+
+async def run(graph, total, include_study_plan):
+    latencies = []
+    for i in range(total):
+        start = time.perf_counter()
+        await graph.ainvoke({
+            "question": QUESTIONS[i % len(QUESTIONS)], "history": [], "include_study_plan": include_study_plan,
+        })
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--retrieval-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    install_stubs(llm_latency=args.llm_latency, retrieval_latency=args.retrieval_latency)
+    from graph.builder import build_graph
+
+    results = {}
+    for name, mode, include_study_plan in [
+        ("sequential", "sequential", True),
+        ("parallel", "parallel", True),
+        ("no plan", "parallel", False),
+    ]:
+        results[name] = asyncio.run(run(build_graph(mode), args.requests, include_study_plan))
+
+    baseline = statistics.mean(results["sequential"])
+    print(f"\nllm_latency={args.llm_latency}s requests={args.requests}")
+    print(f"{'mode':<11} {'mean (s)':>9} {'p50 (s)':>9} {'max (s)':>9} {'saved':>7}")
+    for name, latencies in results.items():
+        mean = statistics.mean(latencies)
+        print(f"{name:<11} {mean:>9.3f} {statistics.median(latencies):>9.3f} {max(latencies):>9.3f} "
+              f"{(baseline - mean) / baseline:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Query latency and memory of the two vector store modes (VECTOR_STORE_MODE):
+
+- server: the Qdrant server at QDRANT_URL
+- local:  Qdrant embedded in the process, storage on disk under QDRANT_PATH
+
+Each mode runs in a fresh interpreter with its own temporary data directory.
+The sample PDF is ingested, then every query in data/retrieval_queries.jsonl is
+searched `--rounds` times. Peak RSS growth is measured after the encoder has
+been loaded, so it covers the client and the index it keeps in memory; the
+server's own memory is not included. Run from the backend directory:
+
+    python -m benchmarks.vector_store_bench [--modes server local] [--rounds 20]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "data", "sample_textbook.pdf")
+QUERIES = os.path.join(os.path.dirname(__file__), "data", "retrieval_queries.jsonl")
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(rounds):
+    import numpy as np
+    from rag.resources import get_encoder, get_qdrant_client, get_vectorstore
+
+    get_encoder().encode(["warm up"])
+    baseline_mb = _peak_rss_mb()
+
+    start = time.perf_counter()
+    get_qdrant_client()
+    open_seconds = time.perf_counter() - start
+
+    from rag.ingest import ingest_file
+    start = time.perf_counter()
+    ingest_file(SAMPLE_PDF)
+    ingest_seconds = time.perf_counter() - start
+
+    with open(QUERIES) as f:
+        queries = [json.loads(line)["query"] for line in f if line.strip()]
+    store = get_vectorstore()
+    store.similarity_search("warm up", k=5)
+    latencies = []
+    for _ in range(rounds):
+        for query in queries:
+            start = time.perf_counter()
+            store.similarity_search(query, k=15)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        "open_seconds": open_seconds,
+        "ingest_seconds": ingest_seconds,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "rss_growth_mb": _peak_rss_mb() - baseline_mb,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["server", "local"], choices=["server", "local"])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.rounds)
+        return
+
+    print(f"{'mode':<8} {'open (s)':>9} {'ingest (s)':>11} {'p50 ms':>8} {'p99 ms':>8} {'RSS +MB':>8}")
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as workdir:
+            env = dict(os.environ, VECTOR_STORE_MODE=mode,
+                       QDRANT_PATH=os.path.join(workdir, "qdrant"), LMS_DATA_DIR=os.path.join(workdir, "data"))
+            process = subprocess.run(
+                [sys.executable, "-m", "benchmarks.vector_store_bench", "--child", "--rounds", str(args.rounds)],
+                env=env, capture_output=True, text=True,
+            )
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"
+            print(f"{mode:<8} unavailable: {error}")
+            continue
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        print(f"{mode:<8} {result['open_seconds']:>9.2f} {result['ingest_seconds']:>11.2f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['rss_growth_mb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
-from qdrant_client import QdrantClient
 from qdrant_client.http.exceptions import UnexpectedResponse
+from rag.resources import QDRANT_COLLECTION, get_qdrant_client
+from rag.ingest import clear_collection_state
 
-QDRANT_URL = "http://localhost:6333"
-QDRANT_COLLECTION = "lms_collection"
-
-client = QdrantClient(url=QDRANT_URL)
+# server or embedded store, as configured by VECTOR_STORE_MODE
+client = get_qdrant_client()
 
 print(f"Attempting to delete collection: '{QDRANT_COLLECTION}'...")
 
@@ -16,6 +15,10 @@ try:
     else:
         print(f"Collection '{QDRANT_COLLECTION}' could not be deleted or did not exist.")
 
+    # manifests, BM25 index and summaries describe the deleted points, drop them too
+    version = clear_collection_state()
+    print(f"Ingest state cleared, collection version is now {version}.")
+
 except UnexpectedResponse as e:
     print(f"Could not delete collection. It likely did not exist. Error: {e}")
 except Exception as e:
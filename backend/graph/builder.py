@@ -1,12 +1,21 @@
+import os
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from .state import AgentState
+from .tracing import traced_node, atraced_node, tracing_handler
 from agents.supervisor import SupervisorAgent
 from agents.qa_agent import QAAgent
 from agents.tutor_agent import TutorAgent
 from agents.search_agent import SearchAgent
-from agents.reasoning_agent import ReasoningAgent 
+from agents.reasoning_agent import ReasoningAgent
 from agents.planner_agent import PlannerAgent
 from agents.study_planner_node import StudyPlannerNode
+from agents.retrieval_node import RetrievalNode
+
+# --- Configuration ---
+# "parallel" generates the study plan alongside the QA/Tutor answer and joins them,
+# "sequential" generates it from the finished answer afterwards
+STUDY_PLAN_MODE = os.getenv("STUDY_PLAN_MODE", "parallel")
 
 # Initialize agent classes
 supervisor = SupervisorAgent()
@@ -15,23 +24,18 @@ tutor_agent = TutorAgent()
 search_agent = SearchAgent()
 reasoning_agent = ReasoningAgent()
 planner_agent = PlannerAgent()
-study_planner = StudyPlannerNode() 
-
-# Create new state graph
-graph_builder = StateGraph(AgentState)
-
-# Define nodes 
-# Add the supervisor node which is the entry point
-graph_builder.add_node("supervisor", supervisor.supervisor_node)
-graph_builder.add_node("qa_agent", qa_agent.qa_node)
-graph_builder.add_node("tutor_agent", tutor_agent.tutor_node)
-graph_builder.add_node("search_agent", search_agent.search_node)
-graph_builder.add_node("reasoning_agent", reasoning_agent.reasoning_node)
-graph_builder.add_node("planner_agent", planner_agent.planner_node)
-graph_builder.add_node("study_planner", study_planner.create_plan_node) 
-# Define the edges 
-# The supervisor is the starting point of the graph
-graph_builder.set_entry_point("supervisor")
+study_planner = StudyPlannerNode()
+retrieval = RetrievalNode()
+
+# specialists whose answers get a study plan
+PLANNED_NODES = ("qa_agent", "tutor_agent")
+
+def node(sync_fn, async_fn):
+    """
+    Wraps a node so graph.invoke runs the sync version and graph.ainvoke the async one.
+    Both are timed under the node's name for /metrics and the request traces.
+    """
+    return RunnableLambda(traced_node(sync_fn), afunc=atraced_node(async_fn))
 
 def route_to_specialist(state: AgentState):
     """
@@ -40,27 +44,90 @@ def route_to_specialist(state: AgentState):
     """
     return state["next_node"]
 
-# Add the conditional edge from the supervisor
-# This edge will use the output of the supervisor to decide which node to run next
-graph_builder.add_conditional_edges(
-    "supervisor",
-    route_to_specialist,
-    {
-        "qa_agent": "qa_agent",
-        "tutor_agent": "tutor_agent",
-        "search_agent": "search_agent",
-        "reasoning_agent": "reasoning_agent",
-        "planner_agent": "planner_agent",      
-    },
-)
-
-graph_builder.add_edge("search_agent", END)
-graph_builder.add_edge("qa_agent", "study_planner")
-graph_builder.add_edge("tutor_agent", "study_planner")
-graph_builder.add_edge("study_planner", END)
-graph_builder.add_edge("reasoning_agent", END) 
-graph_builder.add_edge("planner_agent", END)
-
-
-# Compile the graph into a runnable app
-graph = graph_builder.compile()
\ No newline at end of file
+def wants_study_plan(state: AgentState):
+    return state.get("include_study_plan", True) and state["next_node"] in PLANNED_NODES
+
+def route_with_study_plan(state: AgentState):
+    """
+    Parallel mode: QA and Tutor questions start the study planner next to the
+    specialist, both branches run in the same step and meet at 'merge'.
+    """
+    if wants_study_plan(state):
+        return [state["next_node"], "study_planner"]
+    return [state["next_node"]]
+
+def route_after_answer(state: AgentState):
+    # Sequential mode: the plan is made from the finished answer
+    return "study_planner" if wants_study_plan(state) else END
+
+def build_graph(study_plan_mode: str = STUDY_PLAN_MODE):
+    # Create new state graph
+    graph_builder = StateGraph(AgentState)
+
+    # Define nodes
+    # Add the supervisor node which is the entry point
+    graph_builder.add_node("supervisor", node(supervisor.supervisor_node, supervisor.asupervisor_node))
+    graph_builder.add_node("retrieve", node(retrieval.retrieve_node, retrieval.aretrieve_node))
+    graph_builder.add_node("qa_agent", node(qa_agent.qa_node, qa_agent.aqa_node))
+    graph_builder.add_node("tutor_agent", node(tutor_agent.tutor_node, tutor_agent.atutor_node))
+    graph_builder.add_node("search_agent", node(search_agent.search_node, search_agent.asearch_node))
+    graph_builder.add_node("reasoning_agent", node(reasoning_agent.reasoning_node, reasoning_agent.areasoning_node))
+    graph_builder.add_node("planner_agent", node(planner_agent.planner_node, planner_agent.aplanner_node))
+    if study_plan_mode == "parallel":
+        graph_builder.add_node("study_planner", node(study_planner.plan_from_context_node, study_planner.aplan_from_context_node))
+        graph_builder.add_node("merge", node(study_planner.merge_node, study_planner.amerge_node))
+    else:
+        graph_builder.add_node("study_planner", node(study_planner.create_plan_node, study_planner.acreate_plan_node))
+    # Define the edges
+    # The supervisor is the starting point of the graph
+    graph_builder.set_entry_point("supervisor")
+
+    # Add the conditional edge from the supervisor
+    # This edge will use the output of the supervisor to decide which node to run next.
+    # QA and Tutor go through the shared retrieval stage first; the planner works
+    # from the summary tree built at ingest and retrieves only without one.
+    graph_builder.add_conditional_edges(
+        "supervisor",
+        route_to_specialist,
+        {
+            "qa_agent": "retrieve",
+            "tutor_agent": "retrieve",
+            "search_agent": "search_agent",
+            "reasoning_agent": "reasoning_agent",
+            "planner_agent": "planner_agent",
+        },
+    )
+
+    graph_builder.add_edge("search_agent", END)
+    graph_builder.add_edge("reasoning_agent", END)
+    graph_builder.add_edge("planner_agent", END)
+
+    if study_plan_mode == "parallel":
+        graph_builder.add_conditional_edges(
+            "retrieve",
+            route_with_study_plan,
+            ["qa_agent", "tutor_agent", "study_planner"],
+        )
+        graph_builder.add_edge("qa_agent", "merge")
+        graph_builder.add_edge("tutor_agent", "merge")
+        graph_builder.add_edge("study_planner", "merge")
+        graph_builder.add_edge("merge", END)
+    else:
+        graph_builder.add_conditional_edges(
+            "retrieve",
+            route_to_specialist,
+            {
+                "qa_agent": "qa_agent",
+                "tutor_agent": "tutor_agent",
+            },
+        )
+        graph_builder.add_conditional_edges("qa_agent", route_after_answer, ["study_planner", END])
+        graph_builder.add_conditional_edges("tutor_agent", route_after_answer, ["study_planner", END])
+        graph_builder.add_edge("study_planner", END)
+
+    # Compile the graph into a runnable app; the handler records the LLM and
+    # retriever calls made inside the nodes
+    return graph_builder.compile().with_config(callbacks=[tracing_handler])
+
+
+graph = build_graph()
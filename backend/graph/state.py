@@ -1,6 +1,6 @@
-from typing import TypedDict, List, Annotated
+from typing import TypedDict, List, Optional
+from langchain_core.documents import Document
 from langchain_core.messages import BaseMessage
-import operator
 
 class AgentState(TypedDict):
     """
@@ -8,5 +8,9 @@ class AgentState(TypedDict):
     """
     question: str # user original question
     answer: str   # final answer to be returned
-    history: Annotated[List[BaseMessage], operator.add] # conversation history allows appending
-    next_node: str # next node to call in the graph decided by the supervisor
\ No newline at end of file
+    history: List[BaseMessage] # session summary and recent turns, bounded by rag.sessions
+    next_node: str # next node to call in the graph decided by the supervisor
+    documents: List[Document] # textbook chunks from the shared retrieval stage
+    course_id: Optional[str] # course the retrievers are scoped to, None searches every course
+    include_study_plan: bool # whether QA and Tutor answers get a study plan, defaults to True
+    study_plan: str # plan generated in parallel with the answer, merged into it at the end
\ No newline at end of file
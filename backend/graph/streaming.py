@@ -0,0 +1,85 @@
+from agents.study_planner_node import STUDY_PLAN_HEADER
+
+# nodes whose LLM tokens are part of the answer shown to the user
+ANSWER_NODES = {"qa_agent", "tutor_agent", "planner_agent", "reasoning_agent", "search_agent"}
+# answer nodes whose model calls are not all answer text: the SearchAgent's tool loop
+# may talk before calling a tool, and its fallback answer comes from no model at all.
+# Their answer is sent as one token event when the node finishes
+WHOLE_ANSWER_NODES = {"search_agent"}
+STUDY_PLAN_NODE = "study_planner"
+
+async def stream_answer(graph, inputs):
+    """
+    Runs the graph through astream_events and yields the answer as it is produced:
+
+    - {"type": "token", "node": ..., "content": ...} for every specialist token
+      (one event with the whole answer for WHOLE_ANSWER_NODES)
+    - {"type": "section", "name": "study_plan", "content": STUDY_PLAN_HEADER} before the plan
+    - {"type": "done", "answer": ...} with the same final answer /ask returns
+
+    Concatenating the `content` of token and section events gives the final answer.
+    When the plan is generated in parallel with the answer, its tokens are held
+    back until the specialist has finished, so the two never interleave.
+    """
+    streamed_runs = set()
+    running_answers = set()
+    held_plan = []
+    plan_started = False
+    final_state = {}
+
+    async for event in graph.astream_events(inputs, version="v2"):
+        kind = event["event"]
+        node = event.get("metadata", {}).get("langgraph_node")
+
+        if kind == "on_chain_end" and not event.get("parent_ids"):
+            # the outermost run is the graph itself, its output is the final state
+            final_state = event["data"].get("output") or {}
+            continue
+
+        if node not in ANSWER_NODES and node != STUDY_PLAN_NODE:
+            # e.g. the supervisor's routing label
+            continue
+
+        if node in ANSWER_NODES and event["name"] == node:
+            if kind == "on_chain_start":
+                running_answers.add(node)
+            elif kind == "on_chain_end":
+                running_answers.discard(node)
+                answer = (event["data"].get("output") or {}).get("answer")
+                if node in WHOLE_ANSWER_NODES and answer:
+                    yield {"type": "token", "node": node, "content": answer}
+                # the answer is complete, release the plan produced meanwhile
+                if held_plan and not running_answers:
+                    plan_started = True
+                    yield {"type": "section", "name": "study_plan", "content": STUDY_PLAN_HEADER}
+                    for content in held_plan:
+                        yield {"type": "token", "node": STUDY_PLAN_NODE, "content": content}
+                    held_plan.clear()
+            continue
+
+        if node in WHOLE_ANSWER_NODES:
+            continue
+
+        if kind == "on_chat_model_stream":
+            content = event["data"]["chunk"].content
+            streamed_runs.add(event["run_id"])
+        elif kind == "on_chat_model_end" and event["run_id"] not in streamed_runs:
+            # models that cannot stream still deliver their text in one piece
+            content = event["data"]["output"].content
+        else:
+            continue
+
+        if not content or not isinstance(content, str):
+            continue
+
+        if node == STUDY_PLAN_NODE and running_answers:
+            held_plan.append(content)
+            continue
+
+        if node == STUDY_PLAN_NODE and not plan_started:
+            plan_started = True
+            yield {"type": "section", "name": "study_plan", "content": STUDY_PLAN_HEADER}
+
+        yield {"type": "token", "node": node, "content": content}
+
+    yield {"type": "done", "answer": final_state.get("answer", "No answer could be generated.")}
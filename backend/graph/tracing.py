@@ -0,0 +1,200 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain_core.callbacks import BaseCallbackHandler
+from graph.metrics import registry
+
+# --- Metrics ---
+NODE_SECONDS = registry.histogram("lms_node_duration_seconds", "Time spent in each graph node.", ["node"])
+LLM_SECONDS = registry.histogram("lms_llm_duration_seconds", "Duration of LLM calls, by the node that made them.", ["node"])
+LLM_TOKENS = registry.counter("lms_llm_tokens_total", "Tokens used by LLM calls.", ["node", "type"])
+RETRIEVER_SECONDS = registry.histogram("lms_retriever_duration_seconds", "Duration of retriever calls.", ["node"])
+RETRIEVED_CHUNKS = registry.counter("lms_retrieved_chunks_total", "Chunks returned by retriever calls.", ["node"])
+SPAN_SECONDS = registry.histogram(
+    "lms_span_duration_seconds", "Duration of steps inside nodes: routing, embedding, vector and BM25 search.", ["span"]
+)
+ROUTES = registry.counter("lms_routes_total", "Questions routed by the supervisor.", ["route", "tier"])
+REQUEST_SECONDS = registry.histogram("lms_request_duration_seconds", "End-to-end duration of API requests.", ["endpoint"])
+
+
+class RequestTrace:
+    """
+    Timing breakdown of one request: every node, LLM call, retriever call and
+    instrumented step that ran while the trace was active, plus the route taken.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.route = None
+        self.tier = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, name: str, start: float, end: float, **fields):
+        with self._lock:
+            self.spans.append({
+                "kind": kind,
+                "name": name,
+                "start_ms": round((start - self.started) * 1000, 2),
+                "duration_ms": round((end - start) * 1000, 2),
+                **fields,
+            })
+
+    def summary(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+        nodes = {}
+        for span in spans:
+            if span["kind"] == "node":
+                nodes[span["name"]] = round(nodes.get(span["name"], 0.0) + span["duration_ms"], 2)
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "route": self.route,
+            "route_tier": self.tier,
+            "nodes": nodes,
+            "spans": spans,
+        }
+
+
+_current_trace: ContextVar = ContextVar("lms_request_trace", default=None)
+
+@contextmanager
+def request_trace(endpoint: str):
+    """Collects a RequestTrace for everything the current task does inside the block."""
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        REQUEST_SECONDS.observe(time.perf_counter() - trace.started, endpoint=endpoint)
+
+@contextmanager
+def span(name: str, **fields):
+    """Times a step inside a node, e.g. `with span("embedding"): ...`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        SPAN_SECONDS.observe(end - start, span=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add("span", name, start, end, **fields)
+
+def record_route(route: str, tier: str):
+    ROUTES.inc(route=route, tier=tier)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.route, trace.tier = route, tier
+
+
+def _node_name(fn, config):
+    return ((config or {}).get("metadata") or {}).get("langgraph_node") or fn.__name__
+
+def _record_node(node: str, start: float, result):
+    end = time.perf_counter()
+    NODE_SECONDS.observe(end - start, node=node)
+    trace = _current_trace.get()
+    if trace is not None:
+        fields = {}
+        if isinstance(result, dict) and result.get("documents") is not None:
+            fields["chunks"] = len(result["documents"])
+        trace.add("node", node, start, end, **fields)
+
+# The wrappers take `config` so LangGraph passes the node metadata in. They keep
+# the wrapped function's name but not its signature (no functools.wraps), which
+# would hide the config parameter.
+
+def traced_node(fn):
+    """Wraps a sync graph node so its duration is recorded under the node's graph name."""
+    def wrapper(state, config=None):
+        start = time.perf_counter()
+        result = fn(state)
+        _record_node(_node_name(fn, config), start, result)
+        return result
+    wrapper.__name__ = fn.__name__
+    return wrapper
+
+def atraced_node(fn):
+    """Async counterpart of traced_node."""
+    async def wrapper(state, config=None):
+        start = time.perf_counter()
+        result = await fn(state)
+        _record_node(_node_name(fn, config), start, result)
+        return result
+    wrapper.__name__ = fn.__name__
+    return wrapper
+
+
+def _token_usage(response):
+    prompt_tokens = completion_tokens = 0
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += metadata.get("input_tokens", 0)
+            completion_tokens += metadata.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Records the LLM and retriever calls made inside the agents: duration, token
+    usage and number of retrieved chunks, labelled with the graph node.
+    """
+    # run in the caller's context, so the current request trace is visible
+    run_inline = True
+
+    def __init__(self):
+        # run_id -> (node, start)
+        self._runs = {}
+
+    def _start(self, run_id, metadata):
+        self._runs[run_id] = ((metadata or {}).get("langgraph_node", "none"), time.perf_counter())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return
+        node, start = entry
+        end = time.perf_counter()
+        prompt_tokens, completion_tokens = _token_usage(response)
+        LLM_SECONDS.observe(end - start, node=node)
+        LLM_TOKENS.inc(prompt_tokens, node=node, type="prompt")
+        LLM_TOKENS.inc(completion_tokens, node=node, type="completion")
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add("llm", node, start, end, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+
+    def on_retriever_start(self, serialized, query, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return
+        node, start = entry
+        end = time.perf_counter()
+        RETRIEVER_SECONDS.observe(end - start, node=node)
+        RETRIEVED_CHUNKS.inc(len(documents), node=node)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add("retriever", node, start, end, chunks=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+
+
+tracing_handler = TracingCallbackHandler()
@@ -1,13 +1,27 @@
-import os
+import json
+import time
+import asyncio
 import shutil
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from graph.builder import graph
 from graph.state import AgentState
-from rag.ingest import ingest_file
+from graph.streaming import stream_answer
+from graph.metrics import registry
+from graph.tracing import request_trace, REQUEST_SECONDS
+from rag.jobs import ingest_jobs
+from rag.answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from rag.retrieval import retrieval_cache
+from rag.manifest import collection_version
+from rag.rerank import reranker
+from rag.sessions import session_store, messages_from_client
+from tools.web_search import search_cache
+from rag.resources import DEFAULT_COURSE
+from agents.study_planner_node import STUDY_PLAN_HEADER
 
 # environment variables
 load_dotenv()
@@ -27,42 +41,198 @@ app.add_middleware(
 # API Data Models 
 class IngestResponse(BaseModel):
     message: str
+    job_id: Optional[str] = None
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    status: str
+    document_name: str
+    course_id: Optional[str] = None
+    pages_parsed: int
+    chunks_embedded: int
+    points_upserted: int
+    elapsed_seconds: float
+    pages_per_second: float
+    chunks_per_second: float
+    message: Optional[str] = None
+    error: Optional[str] = None
 
 class QuestionRequest(BaseModel):
     question: str
+    # retrieval only searches this course's documents; omit it to search every course
+    course_id: Optional[str] = None
+    # the conversation is kept server-side under this ID; omit it to start a new session
+    session_id: Optional[str] = None
+    # full transcript from clients that do not use sessions, bounded like a session
     history: List[Dict[str, Any]] = []
+    # QA and Tutor answers come with a study plan unless this is False
+    include_study_plan: bool = True
+    # return the per-node timing breakdown of this request with the answer
+    include_timings: bool = False
 
 class AnswerResponse(BaseModel):
     answer: str
+    session_id: Optional[str] = None
+    timings: Optional[Dict[str, Any]] = None
+
+def _use_cache(req: QuestionRequest, history):
+    # follow-up questions depend on the conversation, so only standalone questions are cached,
+    # and only answers in the default shape (with a study plan where one applies)
+    return ANSWER_CACHE_ENABLED and not history and req.include_study_plan
+
+def _session(req: QuestionRequest):
+    """
+    Returns (session_id, history) for the request: the session's summary and
+    recent turns, or the client-sent transcript bounded the same way.
+    """
+    if req.session_id:
+        return req.session_id, session_store.history(req.session_id)
+    # a transcript sent by the client continues as a server-side session
+    session_id = session_store.start(messages_from_client(req.history))
+    return session_id, session_store.history(session_id)
+
+def _remember(session_id: str, question: str, answer: str):
+    # the study plan is left out, the next question is about the answer
+    session_store.append(session_id, question, answer.split(STUDY_PLAN_HEADER)[0].strip())
 
 # API Endpoints
 @app.get("/")
 def root():
     return {"message": "LMS Agentic RAG Backend is running"}
 
+@app.on_event("shutdown")
+def shutdown():
+    ingest_jobs.shutdown()
+
 @app.post("/ingest", response_model=IngestResponse)
-async def ingest_endpoint(file: UploadFile = File(...)):
+async def ingest_endpoint(file: UploadFile = File(...), course_id: str = Form(DEFAULT_COURSE)):
     """
-    Endpoint to ingest a PDF or TXT file into the vector database.
+    Endpoint to ingest a PDF or TXT file into the vector database, under `course_id`.
+    The file is queued for a background worker; poll /ingest/{job_id} for progress.
     """
-    temp_path = f"temp_{file.filename}"
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    if not file.filename.lower().endswith((".pdf", ".txt")):
+        raise HTTPException(status_code=400, detail="Unsupported file type. Use PDF or TXT.")
+
+    upload_path = ingest_jobs.new_upload_path(file.filename)
+    with open(upload_path, "wb") as buffer:
+        await asyncio.to_thread(shutil.copyfileobj, file.file, buffer)
 
-    result = ingest_file(temp_path)
-    os.remove(temp_path)
-    return {"message": result}
+    # cached answers may not reflect the new content once the job is done
+    job_id = ingest_jobs.submit(upload_path, file.filename, course_id, on_done=lambda _: answer_cache.invalidate())
+    return {"message": f"Ingestion of '{file.filename}' started (job {job_id})", "job_id": job_id}
+
+@app.get("/ingest/{job_id}", response_model=IngestJobStatus)
+def ingest_status(job_id: str):
+    """
+    Progress of an ingest job: pages parsed, chunks embedded, points upserted and throughput.
+    """
+    status = ingest_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job '{job_id}'")
+    return status
 
 @app.post("/ask", response_model=AnswerResponse)
 async def ask_question(req: QuestionRequest):
     """
     Endpoint to ask a question. This now invokes our agentic graph.
     """
-    # Define the input for the graph
-    inputs = AgentState(question=req.question, history=req.history)
+    with request_trace("/ask") as trace:
+        session_id, history = await asyncio.to_thread(_session, req)
+        vector = None
+        cached = None
+        if _use_cache(req, history):
+            cached, vector = await asyncio.to_thread(answer_cache.lookup, req.question, req.course_id)
+
+        if cached is not None:
+            answer = cached
+        else:
+            # Define the input for the graph
+            inputs = AgentState(question=req.question, history=history, include_study_plan=req.include_study_plan,
+                                course_id=req.course_id)
 
-    # Invoke the graph with the inputs
-    result = graph.invoke(inputs)
+            # an ingest finishing while the graph runs must not get this answer cached as current
+            version = collection_version()
+            # Run the graph through its async API so slow LLM calls do not block the event loop
+            result = await graph.ainvoke(inputs)
+            answer = result.get("answer", "No answer could be generated.")
+
+            if _use_cache(req, history) and "answer" in result:
+                answer_cache.store(req.question, answer, vector, req.course_id, version)
+
+        await asyncio.to_thread(_remember, session_id, req.question, answer)
 
     # Return the answer from the final state
-    return {"answer": result.get("answer", "No answer could be generated.")}
\ No newline at end of file
+    if req.include_timings:
+        return {"answer": answer, "session_id": session_id, "timings": {**trace.summary(), "cache_hit": cached is not None}}
+    return {"answer": answer, "session_id": session_id}
+
+@app.post("/ask/stream")
+async def ask_question_stream(req: QuestionRequest):
+    """
+    Same as /ask, but streams the answer as server-sent events while it is generated.
+    Each event is a JSON object; the last one has type "done" and carries the full answer
+    and the session ID.
+    """
+    session_id, history = await asyncio.to_thread(_session, req)
+    inputs = AgentState(question=req.question, history=history, include_study_plan=req.include_study_plan,
+                        course_id=req.course_id)
+
+    async def event_stream():
+        started = time.perf_counter()
+        vector = None
+        if _use_cache(req, history):
+            cached, vector = await asyncio.to_thread(answer_cache.lookup, req.question, req.course_id)
+            if cached is not None:
+                await asyncio.to_thread(_remember, session_id, req.question, cached)
+                yield f"data: {json.dumps({'type': 'token', 'node': 'cache', 'content': cached})}\n\n"
+                yield f"data: {json.dumps({'type': 'done', 'answer': cached, 'session_id': session_id})}\n\n"
+                REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="/ask/stream")
+                return
+
+        version = collection_version()
+        async for event in stream_answer(graph, inputs):
+            if event["type"] == "done":
+                if _use_cache(req, history):
+                    answer_cache.store(req.question, event["answer"], vector, req.course_id, version)
+                await asyncio.to_thread(_remember, session_id, req.question, event["answer"])
+                event["session_id"] = session_id
+            yield f"data: {json.dumps(event)}\n\n"
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="/ask/stream")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Hit-rate counters of the semantic answer cache, the retrieval cache, the rerank score cache
+    and the web search cache.
+    """
+    return {
+        **answer_cache.stats(),
+        "retrieval": retrieval_cache.stats(),
+        "rerank": reranker.stats(),
+        "sessions": session_store.stats(),
+        "web_search": search_cache.stats(),
+    }
+
+
+@app.delete("/sessions/{session_id}")
+def clear_session(session_id: str):
+    """
+    Forgets the conversation of a session.
+    """
+    if not session_store.clear(session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown session '{session_id}'")
+    return {"message": f"Session '{session_id}' cleared"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Node, LLM, retriever and request latencies, token counts and routes in the Prometheus text format.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,138 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from rag.resources import get_encoder
+from rag.manifest import collection_version
+
+# --- Configuration ---
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# minimum cosine similarity between two questions for the cached answer to be reused
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+# seconds an answer stays valid
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+# least recently used answers are evicted beyond this size
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().lower()
+
+
+class SemanticAnswerCache:
+    """
+    Caches graph answers by question meaning. A question is embedded with the
+    shared encoder and compared against the recently answered ones; above
+    `threshold` cosine similarity the stored answer is returned instead of
+    running the graph again. Entries expire after `ttl` seconds and the least
+    recently used ones are evicted beyond `max_entries`. Answers only match
+    questions asked in the same `scope` (the course), and only while the
+    collection version they were answered at is current, so an ingest, reset
+    or delete from any process retires them.
+    """
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, ttl: float = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (scope, normalized question) -> (vector, answer, stored_at, collection version), oldest first
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def embed(self, question: str):
+        return get_encoder().encode([question], convert_to_numpy=True, normalize_embeddings=True)[0]
+
+    def _expire(self, now: float, version: int):
+        expired = [
+            key for key, (_, _, stored_at, stored_version) in self._entries.items()
+            if now - stored_at > self.ttl or stored_version != version
+        ]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, question: str, scope=None):
+        """
+        Returns (answer, vector). `answer` is None on a miss; `vector` can be
+        passed back to store() so the question is not embedded twice.
+        """
+        key = (scope, normalize_question(question))
+        version = collection_version()
+        with self._lock:
+            self._expire(time.monotonic(), version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                # identical question, no need to embed it
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.exact_hits += 1
+                return entry[1], entry[0]
+
+        vector = self.embed(question)
+
+        with self._lock:
+            if self._entries:
+                if self._matrix is None:
+                    self._matrix = (list(self._entries), np.vstack([e[0] for e in self._entries.values()]))
+                keys, matrix = self._matrix
+                similarities = matrix @ vector
+                similarities[[k[0] != scope for k in keys]] = -np.inf
+                best = int(similarities.argmax())
+                entry = self._entries.get(keys[best])
+                # the collection may have changed while the question was embedded
+                if similarities[best] >= self.threshold and entry is not None and entry[3] == version:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return entry[1], vector
+            self.misses += 1
+        return None, vector
+
+    def store(self, question: str, answer: str, vector=None, scope=None, version: int = None):
+        """
+        `version` is the collection version the answer was built from, the
+        current one when None.
+        """
+        if vector is None:
+            vector = self.embed(question)
+        if version is None:
+            version = collection_version()
+        key = (scope, normalize_question(question))
+        with self._lock:
+            self._entries[key] = (vector, answer, time.monotonic(), version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def invalidate(self):
+        """Drops every cached answer, e.g. after the collection changed."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "exact_hits": self.exact_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+answer_cache = SemanticAnswerCache()
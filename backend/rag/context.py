@@ -0,0 +1,131 @@
+import os
+import math
+from graph.metrics import registry
+from rag.resources import CHUNK_OVERLAP, get_encoder
+from rag.retrieval import RRF_K
+
+# --- Configuration ---
+# prompt tokens each agent may spend on textbook context
+CONTEXT_BUDGETS = {
+    "qa_agent": int(os.getenv("QA_CONTEXT_TOKENS", "800")),
+    "tutor_agent": int(os.getenv("TUTOR_CONTEXT_TOKENS", "800")),
+    "planner_agent": int(os.getenv("PLANNER_CONTEXT_TOKENS", "2000")),
+    "study_planner": int(os.getenv("STUDY_PLAN_CONTEXT_TOKENS", "500")),
+}
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("DEFAULT_CONTEXT_TOKENS", "1000"))
+# which chunks below the best one are dropped depends on the score they carry (see _relevant):
+# cross-encoder chunks whose sigmoid(logit) relevance probability is below this
+CONTEXT_MIN_RERANK_PROBABILITY = float(os.getenv("CONTEXT_MIN_RERANK_PROBABILITY", "0.05"))
+# fused (RRF) chunks scoring below a chunk found at this rank by one retriever alone
+CONTEXT_MAX_RRF_RANK = int(os.getenv("CONTEXT_MAX_RRF_RANK", "10"))
+# dense-only chunks whose cosine similarity is below this fraction of the best chunk's
+CONTEXT_MIN_RELATIVE_SCORE = float(os.getenv("CONTEXT_MIN_RELATIVE_SCORE", "0.3"))
+# shortest shared text treated as splitter overlap rather than coincidence
+MIN_OVERLAP_CHARS = 40
+
+CONTEXT_TOKENS = registry.counter("lms_context_tokens_total", "Context tokens sent to the LLM.", ["agent"])
+CONTEXT_TOKENS_SAVED = registry.counter(
+    "lms_context_tokens_saved_total", "Context tokens removed by overlap trimming, score filtering and the budget.", ["agent"]
+)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count from the shared encoder's tokenizer. It is not the LLM's own
+    tokenizer but close enough for budgeting; without one, ~4 characters a token.
+    """
+    tokenizer = getattr(get_encoder(), "tokenizer", None)
+    if tokenizer is None:
+        return math.ceil(len(text) / 4)
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+def _score(doc):
+    """(kind, value) of the most specific score the retrieval stages left on the chunk."""
+    for key in ("rerank_score", "rrf_score", "score"):
+        if doc.metadata.get(key) is not None:
+            return key, doc.metadata[key]
+    return None, None
+
+def _relevant(kind, score, best_similarity):
+    """
+    Whether a chunk is worth its tokens, by the kind of score it carries. The
+    scores are not on a common scale, so each kind gets its own test:
+
+    - rerank_score: a cross-encoder logit, turned into a probability with the
+      sigmoid and held to the absolute CONTEXT_MIN_RERANK_PROBABILITY
+    - rrf_score: the fused sum of 1 / (RRF_K + rank) over the lists that found
+      the chunk, held to 1 / (RRF_K + CONTEXT_MAX_RRF_RANK), the score of a
+      chunk ranked CONTEXT_MAX_RRF_RANK by one retriever alone. A chunk only
+      one retriever found must rank within CONTEXT_MAX_RRF_RANK there; one
+      both found adds two terms and passes down to rank
+      2 * CONTEXT_MAX_RRF_RANK + RRF_K in each list (80 with the defaults),
+      so agreement between dense and BM25 search is rarely cut
+    - score: a cosine similarity, held to CONTEXT_MIN_RELATIVE_SCORE of the
+      best similarity among the chunks
+    """
+    if score is None:
+        return True
+    if kind == "rerank_score":
+        return 1 / (1 + math.exp(-score)) >= CONTEXT_MIN_RERANK_PROBABILITY
+    if kind == "rrf_score":
+        return score >= 1 / (RRF_K + CONTEXT_MAX_RRF_RANK)
+    return best_similarity is None or best_similarity <= 0 or score >= best_similarity * CONTEXT_MIN_RELATIVE_SCORE
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest end of `left` that is also the start of `right`."""
+    for n in range(min(len(left), len(right), CHUNK_OVERLAP), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:n]):
+            return n
+    return 0
+
+def _trim_overlap(text: str, selected):
+    """Removes the text a chunk shares with already selected neighbours, or None if nothing new is left."""
+    for other in selected:
+        if text in other:
+            return None
+        n = _overlap(other, text)
+        if n:
+            text = text[n:].lstrip()
+        n = _overlap(text, other)
+        if n:
+            text = text[:-n].rstrip()
+    return text or None
+
+def build_context(docs, agent: str, budget: int = None) -> str:
+    """
+    Assembles the prompt context for `agent` from retrieved chunks, best first:
+    chunks that are not relevant enough for their kind of score are dropped, text repeated by the splitter overlap is
+    removed, and chunks are packed until the agent's token budget is spent.
+    """
+    budget = budget or CONTEXT_BUDGETS.get(agent, DEFAULT_CONTEXT_TOKENS)
+    texts = [doc.page_content for doc in docs]
+    original_tokens = sum(count_tokens(text) for text in texts)
+
+    scores = [_score(doc) for doc in docs]
+    best_similarity = max((value for kind, value in scores if kind == "score"), default=None)
+
+    selected, originals, used = [], [], 0
+    for original, (kind, score) in zip(texts, scores):
+        # the best chunk is always kept, so an answer never starts from nothing
+        if selected and not _relevant(kind, score, best_similarity):
+            continue
+        text = _trim_overlap(original, originals)
+        if text is None:
+            continue
+        tokens = count_tokens(text)
+        if used + tokens > budget:
+            if selected:
+                # a smaller chunk further down may still fit
+                continue
+            # the best chunk alone is over budget, keep its beginning
+            text = text[:max(1, len(text) * budget // tokens)]
+            tokens = count_tokens(text)
+        selected.append(text)
+        originals.append(original)
+        used += tokens
+
+    saved = max(original_tokens - used, 0)
+    CONTEXT_TOKENS.inc(used, agent=agent)
+    CONTEXT_TOKENS_SAVED.inc(saved, agent=agent)
+    print(f"Context for {agent}: {used} tokens from {len(selected)}/{len(docs)} chunks ({saved} tokens saved)")
+    return "\n\n".join(selected)
@@ -1,72 +1,355 @@
 import os
-from qdrant_client import QdrantClient
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
-from qdrant_client.models import VectorParams, Distance, PointStruct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import numpy as np
+from qdrant_client.models import (
+    VectorParamsDiff, Disabled, PointStruct, PointIdsList, Filter, FieldCondition, MatchValue,
+    KeywordIndexParams, PayloadSchemaType,
+)
+from rag.resources import (
+    QDRANT_COLLECTION, QDRANT_QUANTIZATION, DEFAULT_COURSE, VECTOR_STORE_MODE, EMBED_BATCH_SIZE,
+    get_encoder, get_qdrant_client, quantization_config, vector_params, search_params,
+)
+from rag.parsing import iter_pages, PARSE_WORKERS
+from rag.manifest import (
+    document_id_for, file_sha256, chunk_sha256, point_id, load_manifest, save_manifest, clear_manifests,
+    bump_collection_version,
+)
+from rag.lexical import DocumentTermStats, clear_index
+from rag.summaries import SUMMARIES_ENABLED, build_summary_tree, load_summary_tree, clear_summary_trees
 
-# Qdrant Configuration
-QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
-QDRANT_COLLECTION = "lms_collection"
+# Embedding Configuration
+# number of threads encoding batches while later pages are still being parsed (0 = encode inline)
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))
 
-# Connect to local Qdrant
-client = QdrantClient(url=QDRANT_URL, prefer_grpc=False)
+# Streaming Configuration
+# stream pages through split -> embed -> upsert instead of holding the whole document in memory
+INGEST_STREAMING = os.getenv("INGEST_STREAMING", "true").lower() in ("1", "true", "yes")
+# number of points sent in one upsert request
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+# maximum number of batches being embedded or upserted at the same time
+UPSERT_MAX_IN_FLIGHT = int(os.getenv("UPSERT_MAX_IN_FLIGHT", "2"))
 
-# Embedding Model
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+# payload fields the retrievers filter on; course_id is the tenant key, so Qdrant
+# keeps each course's points together and scoped searches only visit those
+PAYLOAD_INDEXES = {
+    "metadata.course_id": KeywordIndexParams(type="keyword", is_tenant=True),
+    "metadata.document_id": PayloadSchemaType.KEYWORD,
+    "metadata.page": PayloadSchemaType.INTEGER,
+}
 
-# Ingest Function
-def ingest_file(file_path: str):
-    """Ingest PDF or TXT file into Qdrant."""
-    # Load document
-    if file_path.lower().endswith(".pdf"):
-        loader = PyPDFLoader(file_path)
-    elif file_path.lower().endswith(".txt"):
-        loader = TextLoader(file_path)
-    else:
-        raise ValueError("Unsupported file type. Use PDF or TXT.")
+class _Progress:
+    """
+    Thread-safe counters ("pages_parsed", "chunks_embedded", "points_upserted")
+    written into an optional dict-like object, e.g. an ingest job's status.
+    """
+    def __init__(self, target=None):
+        self.target = target
+        self._lock = threading.Lock()
 
-    documents = loader.load()
+    def add(self, key: str, n: int):
+        if self.target is None or not n:
+            return
+        with self._lock:
+            self.target[key] = self.target.get(key, 0) + n
 
-    #  Split into chunks
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = splitter.split_documents(documents)
+def iter_chunks(file_path: str, progress: _Progress = None, workers: int = PARSE_WORKERS):
+    """
+    Lazily parse the document page by page and yield its chunks, in page order
+    (large PDFs are parsed by `workers` processes, see rag.parsing).
+    """
+    progress = progress or _Progress()
+    for _, chunks in iter_pages(file_path, workers):
+        progress.add("pages_parsed", 1)
+        yield from chunks
 
-    # Generate embeddings
-    vectors = [embedder.encode(chunk.page_content).tolist() for chunk in chunks]
+def _encode_batch(texts):
+    return get_encoder().encode(
+        texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False
+    )
 
-    # Create collection if not exists
-    existing_collections = [col.name for col in client.get_collections().collections]
-    if QDRANT_COLLECTION not in existing_collections:
-        client.recreate_collection(
-            collection_name=QDRANT_COLLECTION,
-            vectors_config=VectorParams(
-                size=len(vectors[0]),
-                distance=Distance.COSINE
-            )
+def embed_chunks(chunks, batch_size: int = EMBED_BATCH_SIZE, workers: int = EMBED_WORKERS):
+    """
+    Embed an iterable of chunks in batches of `batch_size`.
+    With workers > 0 every full batch is handed to a thread pool, so encoding
+    overlaps with the parsing and splitting of the following pages.
+    Returns the list of chunks and a (n_chunks, dim) float32 matrix.
+    """
+    collected = []
+    pending = []
+    results = []
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 0 else None
+
+    def flush():
+        texts = [chunk.page_content for chunk in pending]
+        if pool:
+            results.append(pool.submit(_encode_batch, texts))
+        else:
+            results.append(_encode_batch(texts))
+        pending.clear()
+
+    try:
+        for chunk in chunks:
+            collected.append(chunk)
+            pending.append(chunk)
+            if len(pending) >= batch_size:
+                flush()
+        if pending:
+            flush()
+        # futures are kept in submission order, so rows line up with the chunks
+        matrices = [r.result() if pool else r for r in results]
+    finally:
+        if pool:
+            pool.shutdown(wait=True)
+
+    if not matrices:
+        dim = get_encoder().get_sentence_embedding_dimension()
+        return collected, np.empty((0, dim), dtype=np.float32)
+    return collected, np.vstack(matrices).astype(np.float32, copy=False)
+
+def ensure_payload_indexes(collection_name: str = QDRANT_COLLECTION):
+    """Creates the PAYLOAD_INDEXES the collection is missing."""
+    if VECTOR_STORE_MODE == "local":
+        # the embedded store has no payload indexes, it scans the payloads
+        return
+    client = get_qdrant_client()
+    existing = client.get_collection(collection_name).payload_schema or {}
+    for field, schema in PAYLOAD_INDEXES.items():
+        if field not in existing:
+            client.create_payload_index(collection_name=collection_name, field_name=field, field_schema=schema)
+
+def ensure_collection(vector_size: int, collection_name: str = QDRANT_COLLECTION):
+    """
+    Creates the collection with the vectors and quantization of QDRANT_QUANTIZATION,
+    or moves an existing one to them; the server re-quantizes the stored vectors
+    in the background, so switching modes needs no re-ingest.
+    """
+    client = get_qdrant_client()
+    quantization = quantization_config()
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vector_params(vector_size),
+            quantization_config=quantization,
         )
+    elif VECTOR_STORE_MODE != "local":
+        # the embedded store keeps every vector in RAM and ignores quantization
+        config = client.get_collection(collection_name).config
+        on_disk = QDRANT_QUANTIZATION != "none"
+        if config.quantization_config != quantization or bool(config.params.vectors.on_disk) != on_disk:
+            client.update_collection(
+                collection_name=collection_name,
+                vectors_config={"": VectorParamsDiff(on_disk=on_disk)},
+                quantization_config=quantization or Disabled.DISABLED,
+            )
+    ensure_payload_indexes(collection_name)
+
+def clear_collection_state():
+    """
+    Removes what DATA_DIR holds about the collection's documents (manifests,
+    BM25 index, summary trees) after the collection was deleted or reset, and
+    bumps the collection version so no cache keeps serving its old content.
+    """
+    clear_manifests()
+    clear_index()
+    clear_summary_trees()
+    return bump_collection_version()
+
+def _batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+class _ChunkDiff:
+    """
+    Filters a document's chunk stream down to the chunks that still need to be
+    embedded: duplicates within the document and chunks already stored by a
+    previous ingest are skipped. Every distinct chunk hash is recorded in order,
+    while its term frequencies are streamed to the BM25 index's staging files.
+    """
+    def __init__(self, document_id: str, known_hashes, course_id: str = DEFAULT_COURSE):
+        self.document_id = document_id
+        self.course_id = course_id
+        self.known_hashes = set(known_hashes)
+        self.chunk_hashes = []
+        self.term_stats = DocumentTermStats(document_id)
+        self._seen = set()
+
+    def filter(self, chunks):
+        for chunk in chunks:
+            chunk_hash = chunk_sha256(chunk.page_content)
+            if chunk_hash in self._seen:
+                continue
+            self._seen.add(chunk_hash)
+            self.chunk_hashes.append(chunk_hash)
+            self.term_stats.add(point_id(self.document_id, chunk_hash), chunk.page_content)
+            if chunk_hash not in self.known_hashes:
+                chunk.metadata["chunk_hash"] = chunk_hash
+                chunk.metadata["course_id"] = self.course_id
+                yield chunk
 
-    # Upload to Qdrant
-    payloads = [{"page_content": chunk.page_content} for chunk in chunks]
-    points = [
-        PointStruct(id=i, vector=vectors[i], payload=payloads[i])
-        for i in range(len(vectors))
+    def stale_hashes(self):
+        return self.known_hashes - self._seen
+
+def _build_points(chunks, vectors, document_id: str):
+    return [
+        PointStruct(
+            id=point_id(document_id, chunk.metadata["chunk_hash"]),
+            vector=vectors[i].tolist(),
+            payload={
+                "page_content": chunk.page_content,
+                "metadata": {
+                    "course_id": chunk.metadata["course_id"],
+                    "document_id": document_id,
+                    "chunk_hash": chunk.metadata["chunk_hash"],
+                    "page": chunk.metadata.get("page"),
+                },
+            },
+        )
+        for i, chunk in enumerate(chunks)
     ]
 
-    client.upsert(collection_name=QDRANT_COLLECTION, points=points)
+def _embed_and_upsert(chunks, document_id: str, batch_size: int, progress: _Progress):
+    vectors = get_encoder().encode(
+        [chunk.page_content for chunk in chunks],
+        batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False
+    )
+    progress.add("chunks_embedded", len(chunks))
+    points = _build_points(chunks, vectors, document_id)
+    get_qdrant_client().upsert(collection_name=QDRANT_COLLECTION, points=points)
+    progress.add("points_upserted", len(points))
+    return len(points)
+
+def _stream_upserts(chunks, document_id: str, batch_size: int, upsert_batch_size: int, max_in_flight: int,
+                    progress: _Progress):
+    """
+    Groups the chunks into upsert batches and embeds and upserts each batch on a
+    worker thread. At most `max_in_flight` batches are alive at once, so peak
+    memory depends on the batch size and not on the size of the document.
+    """
+    total = 0
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for batch in _batched(chunks, upsert_batch_size):
+            if len(in_flight) >= max_in_flight:
+                # back-pressure: stop parsing until the oldest batch is stored
+                in_flight.popleft().result()
+            in_flight.append(pool.submit(_embed_and_upsert, batch, document_id, batch_size, progress))
+            total += len(batch)
+        while in_flight:
+            in_flight.popleft().result()
+    return total
 
-    return f"Ingested {len(chunks)} chunks into Qdrant"
+def _stored_manifest(document_id: str):
+    """
+    The manifest of the previous ingest, if the collection still holds exactly
+    the points it describes (it may have been reset since).
+    """
+    manifest = load_manifest(document_id)
+    if manifest is None:
+        return None
+    stored = get_qdrant_client().count(
+        collection_name=QDRANT_COLLECTION,
+        count_filter=Filter(must=[FieldCondition(key="metadata.document_id", match=MatchValue(value=document_id))]),
+        exact=True,
+    ).count
+    return manifest if stored == manifest["chunk_count"] else None
+
+def _delete_stale(document_id: str, stale_hashes):
+    if stale_hashes:
+        get_qdrant_client().delete(
+            collection_name=QDRANT_COLLECTION,
+            points_selector=PointIdsList(points=[point_id(document_id, h) for h in stale_hashes]),
+        )
+
+# Ingest Function
+def ingest_file(
+    file_path: str,
+    document_name: str = None,
+    course_id: str = DEFAULT_COURSE,
+    batch_size: int = EMBED_BATCH_SIZE,
+    workers: int = EMBED_WORKERS,
+    stream: bool = INGEST_STREAMING,
+    upsert_batch_size: int = UPSERT_BATCH_SIZE,
+    max_in_flight: int = UPSERT_MAX_IN_FLIGHT,
+    progress=None,
+):
+    """
+    Ingest PDF or TXT file into Qdrant.
+
+    Point IDs are derived from the document and the chunk text, and a manifest of
+    chunk hashes is kept per document. Re-ingesting the same file is a no-op, an
+    edited file only embeds its new chunks and deletes the ones that disappeared,
+    and different documents coexist in the collection.
+
+    Chunks are tagged with `course_id`, so questions scoped to a course only
+    search that course's documents.
+
+    `progress` is an optional dict that receives the pages_parsed,
+    chunks_embedded and points_upserted counters while the ingest runs.
+    """
+    progress = _Progress(progress)
+    document_name = document_name or os.path.basename(file_path)
+    document_id = document_id_for(document_name, course_id)
+    document_hash = file_sha256(file_path)
+
+    ensure_collection(get_encoder().get_sentence_embedding_dimension())
+    manifest = _stored_manifest(document_id)
+    if manifest and manifest["document_hash"] == document_hash:
+        if SUMMARIES_ENABLED and load_summary_tree(document_id) is None:
+            # ingested before summaries existed, only the tree needs building
+            build_summary_tree(document_id, document_name, document_hash, manifest["chunk_hashes"])
+            bump_collection_version()
+        return f"'{document_name}' is unchanged, {manifest['chunk_count']} chunks already in Qdrant"
+
+    diff = _ChunkDiff(document_id, manifest["chunk_hashes"] if manifest else [], course_id)
+    new_chunks = diff.filter(iter_chunks(file_path, progress))
+
+    if stream:
+        embedded = _stream_upserts(new_chunks, document_id, batch_size, upsert_batch_size, max_in_flight, progress)
+    else:
+        # Load, split and embed the whole document, then upload it at once
+        chunks, vectors = embed_chunks(new_chunks, batch_size=batch_size, workers=workers)
+        progress.add("chunks_embedded", len(chunks))
+        if chunks:
+            get_qdrant_client().upsert(collection_name=QDRANT_COLLECTION, points=_build_points(chunks, vectors, document_id))
+            progress.add("points_upserted", len(chunks))
+        embedded = len(chunks)
+
+    if not diff.chunk_hashes:
+        diff.term_stats.discard()
+        return "No text could be extracted from the document"
+
+    stale = diff.stale_hashes()
+    _delete_stale(document_id, stale)
+    save_manifest(document_id, document_name, document_hash, diff.chunk_hashes, course_id)
+
+    # lexical side of hybrid retrieval
+    diff.term_stats.save()
+    # section -> chapter -> document summaries for the planner, from the stored chunks
+    if SUMMARIES_ENABLED:
+        build_summary_tree(document_id, document_name, document_hash, diff.chunk_hashes)
+    # cached retrieval results for the old content are no longer valid
+    bump_collection_version()
+
+    return (
+        f"Ingested {len(diff.chunk_hashes)} chunks into Qdrant "
+        f"({embedded} embedded, {len(diff.chunk_hashes) - embedded} unchanged, {len(stale)} removed)"
+    )
 
 # Query Function
 def query_textbook(query: str, top_k: int = 3):
     """Search Qdrant and return most relevant chunks."""
-    query_vector = embedder.encode(query).tolist()
-    results = client.search(
+    query_vector = get_encoder().encode(query).tolist()
+    results = get_qdrant_client().search(
         collection_name=QDRANT_COLLECTION,
         query_vector=query_vector,
-        limit=top_k
+        limit=top_k,
+        search_params=search_params(),
     )
-    return [hit.payload["text"] for hit in results]
+    return [hit.payload["page_content"] for hit in results]
 
 # Test Script
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+import os
+import time
+import uuid
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from rag.resources import DATA_DIR, VECTOR_STORE_MODE, DEFAULT_COURSE
+
+# --- Configuration ---
+# number of worker processes running ingest jobs; each loads its own copy of the encoder
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# finished jobs kept around for /ingest/{job_id}
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "200"))
+UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
+
+def _run_job(file_path: str, document_name: str, course_id: str, progress):
+    """Runs in a worker process; `progress` is a Manager dict shared with the API process."""
+    from rag.ingest import ingest_file
+
+    progress["status"] = "running"
+    progress["started_at"] = time.time()
+    try:
+        progress["message"] = ingest_file(file_path, document_name=document_name, course_id=course_id, progress=progress)
+        progress["status"] = "completed"
+    except Exception as e:
+        progress["status"] = "failed"
+        progress["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        progress["finished_at"] = time.time()
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+class IngestJobManager:
+    """
+    Runs ingestion in a bounded pool of worker processes so uploads return
+    immediately. Progress counters live in Manager dicts the workers update.
+
+    With the embedded vector store only this process may open the storage, so
+    jobs run in a thread pool instead and progress is kept in plain dicts.
+    """
+    def __init__(self, workers: int = INGEST_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._manager = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._executor is None and VECTOR_STORE_MODE == "local":
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest-job")
+        if self._executor is None:
+            # spawn, so workers do not inherit the API process's threads and clients
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def new_upload_path(self, filename: str) -> str:
+        """A unique path for an upload, so concurrent uploads of the same file never clash."""
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{extension}")
+
+    def submit(self, file_path: str, document_name: str, course_id: str = DEFAULT_COURSE, on_done=None) -> str:
+        with self._lock:
+            self._start()
+            job_id = uuid.uuid4().hex
+            progress = (self._manager.dict if self._manager else dict)(
+                status="queued", document_name=document_name, course_id=course_id, submitted_at=time.time(),
+                pages_parsed=0, chunks_embedded=0, points_upserted=0,
+            )
+            self._jobs[job_id] = progress
+            self._prune()
+            future = self._executor.submit(_run_job, file_path, document_name, course_id, progress)
+
+        def finished(f):
+            if f.cancelled():
+                return
+            if f.exception() is not None:
+                # the worker process itself died, _run_job could not record it
+                progress["status"] = "failed"
+                progress["error"] = repr(f.exception())
+            if on_done:
+                on_done(job_id)
+        future.add_done_callback(finished)
+        return job_id
+
+    def _prune(self):
+        finished = [job_id for job_id, p in self._jobs.items() if p.get("status") in ("completed", "failed")]
+        while len(self._jobs) > INGEST_JOB_HISTORY and finished:
+            del self._jobs[finished.pop(0)]
+
+    def status(self, job_id: str):
+        """A snapshot of the job's progress with throughput, or None for an unknown job."""
+        progress = self._jobs.get(job_id)
+        if progress is None:
+            return None
+        snapshot = dict(progress)
+        started = snapshot.get("started_at")
+        elapsed = (snapshot.get("finished_at") or time.time()) - started if started else 0.0
+        snapshot["job_id"] = job_id
+        snapshot["elapsed_seconds"] = elapsed
+        snapshot["pages_per_second"] = snapshot["pages_parsed"] / elapsed if elapsed else 0.0
+        snapshot["chunks_per_second"] = snapshot["chunks_embedded"] / elapsed if elapsed else 0.0
+        return snapshot
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            if self._manager:
+                self._manager.shutdown()
+
+
+ingest_jobs = IngestJobManager()
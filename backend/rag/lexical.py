@@ -0,0 +1,313 @@
+import os
+import re
+import json
+import time
+import shutil
+import tempfile
+import threading
+from array import array
+from collections import Counter
+import numpy as np
+from rag.resources import DATA_DIR, QDRANT_COLLECTION
+from rag.manifest import file_lock
+
+# --- Configuration ---
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# staging directories of ingests that died before saving are removed after this long
+BM25_STAGING_MAX_AGE = int(os.getenv("BM25_STAGING_MAX_AGE", "86400"))
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "what which who whom how why when where does do did can could should would i me my you your".split()
+)
+
+def tokenize(text: str):
+    """Lowercased word and number tokens; numbers are kept so 'chapter 3' or '11.2' still match."""
+    return [t for t in re.findall(r"\d+(?:\.\d+)?|\w+", text.lower()) if t not in STOPWORDS]
+
+def _index_root():
+    return os.path.join(DATA_DIR, "bm25", QDRANT_COLLECTION)
+
+class DocumentTermStats:
+    """
+    Collects the term frequencies of one document's chunks while it is ingested.
+
+    Postings are appended to files in a staging directory as the chunks stream
+    by, so only the document's vocabulary is held in memory. `save()` turns
+    them into the document's index segment and publishes it.
+    """
+    def __init__(self, document_id: str):
+        self.document_id = document_id
+        self.terms = {}
+        self.chunks = 0
+        self._staging = None
+
+    def _open(self):
+        staging_root = os.path.join(_index_root(), "staging")
+        os.makedirs(staging_root, exist_ok=True)
+        self._staging = tempfile.mkdtemp(dir=staging_root)
+        self._postings = open(os.path.join(self._staging, "postings.bin"), "wb")
+        self._lengths = open(os.path.join(self._staging, "lengths.bin"), "wb")
+        self._ids = open(os.path.join(self._staging, "ids.txt"), "w")
+
+    def add(self, point_id: str, text: str):
+        if self._staging is None:
+            self._open()
+        tokens = tokenize(text)
+        # (term, chunk, tf) triples, term being the position in the document's vocabulary
+        postings = array("i")
+        for term, tf in Counter(tokens).items():
+            postings.extend((self.terms.setdefault(term, len(self.terms)), self.chunks, tf))
+        postings.tofile(self._postings)
+        array("f", [len(tokens)]).tofile(self._lengths)
+        self._ids.write(f"{point_id}\n")
+        self.chunks += 1
+
+    def discard(self):
+        if self._staging is not None:
+            for f in (self._postings, self._lengths, self._ids):
+                f.close()
+            shutil.rmtree(self._staging, ignore_errors=True)
+            self._staging = None
+
+    def save(self):
+        """Writes the document's segment and swaps it into the published index."""
+        if self._staging is None:
+            self._open()
+        for f in (self._postings, self._lengths, self._ids):
+            f.close()
+        root = _index_root()
+        segment = f"{self.document_id}-{time.time_ns()}"
+        try:
+            _write_segment(self._staging, os.path.join(root, "segments", segment), self.document_id, self.terms)
+        finally:
+            self.discard()
+        return _publish_segment(self.document_id, segment)
+
+def _write_segment(staging: str, segment_dir: str, document_id: str, terms: dict):
+    postings = np.fromfile(os.path.join(staging, "postings.bin"), dtype=np.int32).reshape(-1, 3)
+    postings = postings[np.lexsort((postings[:, 1], postings[:, 0]))]
+    df = np.bincount(postings[:, 0], minlength=len(terms))
+    ends = np.cumsum(df)
+    with open(os.path.join(staging, "ids.txt")) as f:
+        chunk_ids = f.read().splitlines()
+
+    tmp_dir = f"{segment_dir}.tmp"
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "postings_chunk.npy"), np.ascontiguousarray(postings[:, 1]))
+    np.save(os.path.join(tmp_dir, "postings_tf.npy"), postings[:, 2].astype(np.float32))
+    lengths = np.fromfile(os.path.join(staging, "lengths.bin"), dtype=np.float32)
+    np.save(os.path.join(tmp_dir, "lengths.npy"), lengths)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({
+            "document_id": document_id,
+            "vocabulary": {term: [int(ends[i] - df[i]), int(ends[i])] for term, i in terms.items()},
+            "chunk_ids": chunk_ids,
+            "length": float(lengths.sum()),
+        }, f)
+    os.replace(tmp_dir, segment_dir)
+
+
+def _publish_segment(document_id: str, segment: str):
+    """
+    Replaces a document's segment in the published index.
+
+    The collection-wide part of the index is one small JSON file with the
+    segment of every document, the document frequency of every term and the
+    chunk and token totals. Publishing subtracts the old segment's counts and
+    adds the new one's, so an ingest costs O(document + vocabulary) rather
+    than a rebuild of the whole corpus. Scores are computed from these totals
+    at query time, so the other documents' segments never need rewriting.
+    Each publish writes a fresh meta file and switches CURRENT to it, so
+    readers never see a half-updated index.
+    """
+    root = _index_root()
+    with file_lock(os.path.join(root, "build.lock")):
+        previous_name = _read_current(root)
+        previous = _read_meta(root, previous_name)
+        meta = {
+            "segments": dict(previous["segments"]),
+            "df": previous["df"],
+            "chunks": previous["chunks"],
+            "length": previous["length"],
+            "retired": [],
+        }
+        old = meta["segments"].pop(document_id, None)
+        if old:
+            _merge_counts(meta, _read_segment_meta(root, old), -1)
+            meta["retired"].append(old)
+        _merge_counts(meta, _read_segment_meta(root, segment), 1)
+        meta["segments"][document_id] = segment
+
+        name = f"index-{time.time_ns()}.json"
+        with open(os.path.join(root, name), "w") as f:
+            json.dump(meta, f)
+        current_path = os.path.join(root, "CURRENT")
+        with open(f"{current_path}.tmp", "w") as f:
+            f.write(name)
+        os.replace(f"{current_path}.tmp", current_path)
+
+        # segments retired by the previous publish are kept until now for readers that still have them mapped
+        for retired in previous["retired"]:
+            if retired not in meta["segments"].values():
+                shutil.rmtree(os.path.join(root, "segments", retired), ignore_errors=True)
+        for entry in os.listdir(root):
+            if entry.startswith("index-") and entry not in (name, previous_name):
+                path = os.path.join(root, entry)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+        _remove_stale_staging(root)
+        return meta["chunks"]
+
+def _merge_counts(meta: dict, segment_meta: dict, sign: int):
+    df = meta["df"]
+    for term, (start, end) in segment_meta["vocabulary"].items():
+        count = df.get(term, 0) + sign * (end - start)
+        if count > 0:
+            df[term] = count
+        else:
+            df.pop(term, None)
+    meta["chunks"] += sign * len(segment_meta["chunk_ids"])
+    meta["length"] += sign * segment_meta["length"]
+
+def _read_meta(root: str, name):
+    # an index from before segments (a directory) is treated as empty, its documents are re-added on their next ingest
+    if name and name.endswith(".json"):
+        with open(os.path.join(root, name)) as f:
+            return json.load(f)
+    return {"segments": {}, "df": {}, "chunks": 0, "length": 0.0, "retired": []}
+
+def _read_segment_meta(root: str, segment: str):
+    with open(os.path.join(root, "segments", segment, "meta.json")) as f:
+        return json.load(f)
+
+def _remove_stale_staging(root: str):
+    staging_root = os.path.join(root, "staging")
+    cutoff = time.time() - BM25_STAGING_MAX_AGE
+    for entry in os.listdir(staging_root) if os.path.isdir(staging_root) else []:
+        path = os.path.join(staging_root, entry)
+        if os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+def clear_index():
+    """
+    Removes every document's segment and the published index, for a
+    collection that was reset or deleted.
+    """
+    root = _index_root()
+    with file_lock(os.path.join(root, "build.lock")):
+        # unpublish first, so readers stop opening the index being removed
+        if os.path.exists(os.path.join(root, "CURRENT")):
+            os.remove(os.path.join(root, "CURRENT"))
+        for name in os.listdir(root):
+            if name == "build.lock":
+                continue
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+def _read_current(root: str):
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+class _Segment:
+    """One document's postings: chunk index and raw term frequency per posting, grouped by term."""
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.vocabulary = meta["vocabulary"]
+        self.chunk_ids = meta["chunk_ids"]
+        self.postings_chunk = np.load(os.path.join(path, "postings_chunk.npy"), mmap_mode="r")
+        self.postings_tf = np.load(os.path.join(path, "postings_tf.npy"), mmap_mode="r")
+        self.lengths = np.load(os.path.join(path, "lengths.npy"), mmap_mode="r")
+
+    def search(self, terms, avg_len: float, k: int):
+        if not self.chunk_ids:
+            return []
+        scores = np.zeros(len(self.chunk_ids), dtype=np.float32)
+        for term, idf in terms:
+            span = self.vocabulary.get(term)
+            if span:
+                start, end = span
+                chunks = self.postings_chunk[start:end]
+                tf = self.postings_tf[start:end]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunks] / avg_len)
+                # a term has at most one posting per chunk, so plain fancy-index addition is safe
+                scores[chunks] += (idf * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+        matched = np.flatnonzero(scores)
+        top = matched[np.argsort(-scores[matched])[:k]]
+        return [(self.chunk_ids[i], float(scores[i])) for i in top]
+
+
+class BM25Index:
+    """
+    Read side of the BM25 index. The segments' posting arrays are
+    memory-mapped, so only the pages touched by a query's terms are read. The
+    index is reopened automatically when a newer version is published; the
+    segments are immutable, so only the ones that changed are opened again.
+    """
+    def __init__(self):
+        self._loaded = None
+        self._version = None
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        root = _index_root()
+        version = _read_current(root)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._loaded = None
+                    meta = _read_meta(root, version)
+                    segments = {
+                        document_id: self._segments.get(name) or _Segment(os.path.join(root, "segments", name))
+                        for document_id, name in meta["segments"].items()
+                    }
+                    self._segments = {meta["segments"][document_id]: s for document_id, s in segments.items()}
+                    self._loaded = (meta, segments)
+                    self._version = version
+        return self._loaded
+
+    def search(self, query: str, k: int, documents=None):
+        """
+        Returns up to k (point_id, score) pairs, best first. `documents`
+        restricts the results to chunks of those document IDs.
+        """
+        meta, segments = self._load()
+        n_chunks = meta["chunks"]
+        if not n_chunks:
+            return []
+        avg_len = (meta["length"] / n_chunks) or 1.0
+        terms = []
+        for term in set(tokenize(query)):
+            df = meta["df"].get(term)
+            if df:
+                terms.append((term, np.log(1 + (n_chunks - df + 0.5) / (df + 0.5))))
+        if not terms:
+            return []
+
+        if documents is not None:
+            selected = [segments[d] for d in documents if d in segments]
+        else:
+            selected = segments.values()
+        results = []
+        for segment in selected:
+            results.extend(segment.search(terms, avg_len, k))
+        results.sort(key=lambda result: -result[1])
+        return results[:k]
+
+
+_index = BM25Index()
+
+def get_bm25_index() -> BM25Index:
+    return _index
@@ -0,0 +1,148 @@
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+from contextlib import contextmanager
+from rag.resources import DATA_DIR, QDRANT_COLLECTION, DEFAULT_COURSE
+
+# namespace for the content-derived point IDs
+POINT_NAMESPACE = uuid.UUID("6f1c2a52-4a8e-4c1b-9a63-2f0f6f3c7d10")
+
+def _manifest_dir():
+    return os.path.join(DATA_DIR, "manifests", QDRANT_COLLECTION)
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock across processes, ingest jobs may finish at the same time."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+") as f:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+def document_id_for(name: str, course_id: str = DEFAULT_COURSE) -> str:
+    """
+    Stable identifier for a document, derived from its file name and, outside
+    the default course, its course, so two courses may use the same file name.
+    """
+    document_id = _safe_name(os.path.basename(name))
+    if course_id != DEFAULT_COURSE:
+        document_id = f"{_safe_name(course_id)}__{document_id}"
+    return document_id
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def point_id(document_id: str, chunk_hash: str) -> str:
+    """Point IDs depend only on the document and the chunk text, so re-ingesting reuses them."""
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{document_id}:{chunk_hash}"))
+
+def load_manifest(document_id: str):
+    """
+    Returns the manifest written by the last ingest of the document, or None:
+    {"document_id", "document_name", "course_id", "document_hash", "chunk_hashes", "chunk_count", "ingested_at"}
+    """
+    path = os.path.join(_manifest_dir(), f"{document_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(document_id: str, document_name: str, document_hash: str, chunk_hashes, course_id: str = DEFAULT_COURSE):
+    manifest = {
+        "document_id": document_id,
+        "document_name": document_name,
+        "course_id": course_id,
+        "document_hash": document_hash,
+        "chunk_hashes": list(chunk_hashes),
+        "chunk_count": len(chunk_hashes),
+        "ingested_at": time.time(),
+    }
+    os.makedirs(_manifest_dir(), exist_ok=True)
+    path = os.path.join(_manifest_dir(), f"{document_id}.json")
+    # write to a temp file first so a crash never leaves a half-written manifest
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+    return manifest
+
+def list_manifests():
+    if not os.path.isdir(_manifest_dir()):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(_manifest_dir())):
+        if name.endswith(".json"):
+            manifests.append(load_manifest(name[:-len(".json")]))
+    return manifests
+
+def clear_manifests():
+    """Removes the manifest of every document, the collection version is kept."""
+    if not os.path.isdir(_manifest_dir()):
+        return
+    for name in os.listdir(_manifest_dir()):
+        if name.endswith((".json", ".json.tmp")):
+            os.remove(os.path.join(_manifest_dir(), name))
+
+_course_cache = {}
+_course_lock = threading.Lock()
+
+def course_documents(course_id: str):
+    """IDs of the documents ingested into `course_id`, cached per collection version."""
+    version = collection_version()
+    with _course_lock:
+        if _course_cache.get("version") == version:
+            return _course_cache["courses"].get(course_id, set())
+
+    courses = {}
+    for manifest in list_manifests():
+        # manifests written before courses existed belong to the default course
+        courses.setdefault(manifest.get("course_id", DEFAULT_COURSE), set()).add(manifest["document_id"])
+    with _course_lock:
+        _course_cache.update(version=version, courses=courses)
+    return courses.get(course_id, set())
+
+def _version_path():
+    return os.path.join(_manifest_dir(), "VERSION")
+
+def collection_version() -> int:
+    """Counter bumped whenever an ingest changes the collection, readable from any process."""
+    try:
+        with open(_version_path()) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+def bump_collection_version() -> int:
+    # read and write under a lock, two ingests finishing together must not both write the same version
+    with file_lock(f"{_version_path()}.lock"):
+        version = collection_version() + 1
+        tmp_path = f"{_version_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_path, _version_path())
+    return version
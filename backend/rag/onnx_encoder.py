@@ -0,0 +1,113 @@
+"""
+CPU embedding backend running an int8-quantized ONNX export of
+all-MiniLM-L6-v2 with onnxruntime and the `tokenizers` library, so serving
+does not import PyTorch. It produces the same 384-dim, L2-normalized vectors
+as the sentence-transformers model (mean pooling over the token embeddings),
+so points already in the collection stay comparable.
+
+Export once (needs torch and transformers, on any machine):
+
+    python -m rag.onnx_encoder [--output models/all-MiniLM-L6-v2-onnx-int8]
+
+then run the backend with EMBEDDING_BACKEND=onnx.
+"""
+import os
+import argparse
+import numpy as np
+
+# sentence-transformers truncates all-MiniLM-L6-v2 inputs at this many tokens
+MAX_SEQ_LENGTH = 256
+MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxEncoder:
+    """
+    Drop-in for the SentenceTransformer methods the backend uses: encode(),
+    get_sentence_embedding_dimension() and `tokenizer` (for token counting).
+    """
+    def __init__(self, model_dir: str, threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        # `tokenizer` counts tokens for rag.context, so only the copy used to embed truncates and pads
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self._batch_tokenizer = Tokenizer.from_str(self.tokenizer.to_str())
+        self._batch_tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self._batch_tokenizer.enable_padding()
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def _embed(self, texts):
+        encodings = self._batch_tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: value for name, value in inputs.items() if name in self.input_names})[0]
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        # the sentence-transformers pipeline of this model ends with a Normalize layer
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False,
+               normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        # sorting by length keeps the padding inside a batch small
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = order[start:start + batch_size]
+            vectors[batch] = self._embed([texts[i] for i in batch])
+        return vectors[0] if single else vectors
+
+
+def export_onnx(output_dir: str, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    """Exports the transformer of `model_name` to ONNX and quantizes its weights to int8."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    fp32_path = os.path.join(output_dir, "model_fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in names),
+            fp32_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in names},
+                          "last_hidden_state": {0: "batch", 1: "sequence"}},
+            opset_version=14,
+        )
+    quantize_dynamic(fp32_path, os.path.join(output_dir, MODEL_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    print(f"Exported int8 ONNX model and tokenizer to {output_dir}")
+
+
+if __name__ == "__main__":
+    from rag.resources import EMBEDDING_MODEL, ONNX_MODEL_DIR
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    args = parser.parse_args()
+    export_onnx(args.output, args.model)
@@ -0,0 +1,88 @@
+"""
+Parsing stage of the ingest: PDF/TXT -> pages -> chunks.
+
+Text extraction is the slow, single-core part of ingesting a large PDF, so
+PDFs with at least PARSE_PARALLEL_MIN_PAGES pages are cut into page ranges
+that a pool of worker processes parses and splits. Results are consumed in
+page order, so chunks, their page metadata and therefore their point IDs are
+the same as with serial parsing.
+"""
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from langchain_core.documents import Document
+from langchain_community.document_loaders import TextLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from rag.resources import CHUNK_SIZE, CHUNK_OVERLAP
+
+# --- Configuration ---
+# worker processes parsing page ranges of large PDFs (0 = one per core, 1 = parse inline)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or os.cpu_count() or 1
+# pages a worker parses and splits per task
+PARSE_PAGES_PER_TASK = int(os.getenv("PARSE_PAGES_PER_TASK", "16"))
+# smaller PDFs are parsed inline, starting the workers (about a second each) would cost more than it saves
+PARSE_PARALLEL_MIN_PAGES = int(os.getenv("PARSE_PARALLEL_MIN_PAGES", "200"))
+
+splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+def _is_pdf(file_path: str) -> bool:
+    return file_path.lower().endswith(".pdf")
+
+def page_count(file_path: str) -> int:
+    """Number of pages of a PDF, 1 for a text file."""
+    if not _is_pdf(file_path):
+        return 1
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+def _read_pages(file_path: str, start: int = 0, end: int = None):
+    """
+    Yields the pages [start, end) of the document as Documents, with the text
+    and "page" (0-based) metadata PyPDFLoader produces.
+    """
+    if not _is_pdf(file_path):
+        if not file_path.lower().endswith(".txt"):
+            raise ValueError("Unsupported file type. Use PDF or TXT.")
+        yield from TextLoader(file_path).lazy_load()
+        return
+
+    from pypdf import PdfReader
+    reader = PdfReader(file_path)
+    total = len(reader.pages)
+    labels = reader.page_labels
+    for number in range(start, total if end is None else min(end, total)):
+        yield Document(
+            page_content=reader.pages[number].extract_text(extraction_mode="plain").strip(),
+            metadata={"source": file_path, "total_pages": total, "page": number, "page_label": labels[number]},
+        )
+
+def _parse_range(file_path: str, start: int, end: int):
+    """Runs in a worker process: (page, chunks) for every page of the range."""
+    return [(page, splitter.split_documents([page])) for page in _read_pages(file_path, start, end)]
+
+def iter_pages(file_path: str, workers: int = PARSE_WORKERS, pages_per_task: int = PARSE_PAGES_PER_TASK):
+    """
+    Yields (page, chunks) for every page of the document, in page order.
+    Large PDFs are parsed by `workers` processes, a bounded number of page
+    ranges ahead of the consumer so memory stays flat on long books.
+    """
+    total = page_count(file_path)
+    # workers of a daemonic pool may not start processes of their own
+    if workers <= 1 or total < PARSE_PARALLEL_MIN_PAGES or multiprocessing.current_process().daemon:
+        for page in _read_pages(file_path):
+            yield page, splitter.split_documents([page])
+        return
+
+    starts = deque(range(0, total, pages_per_task))
+    # spawn, so workers do not inherit the threads and clients of the ingesting process
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(starts)), mp_context=multiprocessing.get_context("spawn"))
+    pending = deque()
+    try:
+        while starts or pending:
+            while starts and len(pending) < 2 * workers:
+                start = starts.popleft()
+                pending.append(pool.submit(_parse_range, file_path, start, start + pages_per_task))
+            yield from pending.popleft().result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,84 @@
+import os
+import threading
+from collections import OrderedDict
+from langchain_core.documents import Document
+from graph.metrics import registry
+from graph.tracing import span
+from rag.answer_cache import normalize_question
+from rag.resources import get_reranker
+
+# --- Configuration ---
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() in ("1", "true", "yes")
+# candidates fetched by the retrieve stage and rescored by the cross-encoder
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "30"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# (query, chunk id) scores kept by the score cache
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "8192"))
+
+RERANK_PAIRS = registry.counter("lms_rerank_pairs_total", "Query-chunk pairs reranked, by whether the score was cached.", ["cached"])
+
+
+class Reranker:
+    """
+    Reorders retrieved chunks by cross-encoder relevance to the query. Only
+    pairs without a cached score are sent to the model, in batches; scores are
+    cached by (normalized query, chunk id) since chunk IDs change with content.
+    """
+    def __init__(self, batch_size: int = RERANK_BATCH_SIZE, max_entries: int = RERANK_CACHE_SIZE):
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def score(self, query: str, docs):
+        normalized = normalize_question(query)
+        keys = [(normalized, str(doc.metadata.get("_id", doc.page_content))) for doc in docs]
+        unique = dict(zip(keys, docs))
+        with self._lock:
+            scores = {key: self._scores[key] for key in unique if key in self._scores}
+            for key in scores:
+                self._scores.move_to_end(key)
+            self.hits += len(scores)
+            self.misses += len(unique) - len(scores)
+        missing = [key for key in unique if key not in scores]
+        RERANK_PAIRS.inc(len(scores), cached="true")
+        RERANK_PAIRS.inc(len(missing), cached="false")
+
+        if missing:
+            with span("rerank", pairs=len(missing)):
+                predicted = get_reranker().predict(
+                    [(query, unique[key].page_content) for key in missing],
+                    batch_size=self.batch_size, show_progress_bar=False,
+                )
+            with self._lock:
+                for key, value in zip(missing, predicted):
+                    self._scores[key] = scores[key] = float(value)
+                while len(self._scores) > self.max_entries:
+                    self._scores.popitem(last=False)
+        return [scores[key] for key in keys]
+
+    def rerank(self, query: str, docs, k: int = None):
+        """The `k` best chunks by cross-encoder score, as copies carrying metadata["rerank_score"]."""
+        if not docs:
+            return []
+        scores = self.score(query, docs)
+        ranked = sorted(zip(docs, scores), key=lambda pair: pair[1], reverse=True)[:k]
+        return [
+            Document(page_content=doc.page_content, metadata={**doc.metadata, "rerank_score": score})
+            for doc, score in ranked
+        ]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._scores),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+reranker = Reranker()
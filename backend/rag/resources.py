@@ -0,0 +1,179 @@
+import os
+import threading
+from typing import List
+from langchain_core.embeddings import Embeddings
+from graph.tracing import span
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+# "server" talks to the Qdrant server at QDRANT_URL, "local" runs Qdrant embedded
+# in this process with its storage in QDRANT_PATH, so no server is needed
+VECTOR_STORE_MODE = os.getenv("VECTOR_STORE_MODE", "server")
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_PATH = os.getenv("QDRANT_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "qdrant_data"))
+QDRANT_COLLECTION = "lms_collection"
+# course documents are ingested into when the upload names none; questions without
+# a course search every course
+DEFAULT_COURSE = os.getenv("DEFAULT_COURSE", "default")
+# "none" keeps the float32 vectors in RAM; "scalar" (int8, 4x smaller) and "binary"
+# (1 bit per dimension, 32x smaller) keep only the quantized vectors in RAM and the
+# originals on disk, which searches read to rescore the best quantized candidates
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() in ("1", "true", "yes")
+# quantized candidates fetched per result before rescoring, 0 uses the mode's default
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "0"))
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# "torch" runs the sentence-transformers model, "onnx" the int8 ONNX export made
+# by `python -m rag.onnx_encoder` (same vectors, no PyTorch import)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "all-MiniLM-L6-v2-onnx-int8"))
+# onnxruntime intra-op threads, 0 lets it pick
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# small CPU cross-encoder used to rerank retrieved chunks
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# results returned by one web search of the SearchAgent
+WEB_SEARCH_RESULTS = int(os.getenv("WEB_SEARCH_RESULTS", "3"))
+# text splitter settings used at ingest, in characters
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# local state kept next to the collection (ingest manifests, indexes, ...)
+DATA_DIR = os.getenv("LMS_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+
+# Shared resources are created once, on first use, and handed out to every agent
+# and to the ingest pipeline. set_resource() lets scripts and benchmarks inject
+# their own instances before anything asks for them.
+_resources = {}
+_lock = threading.RLock()
+
+def _get(name: str, factory):
+    resource = _resources.get(name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(name)
+            if resource is None:
+                resource = factory()
+                _resources[name] = resource
+    return resource
+
+def set_resource(name: str, instance):
+    """Overrides a shared resource ("encoder", "reranker", "qdrant_client", "embeddings", "vectorstore" or "search_backend")."""
+    with _lock:
+        _resources[name] = instance
+
+def _load_encoder():
+    if EMBEDDING_BACKEND == "onnx":
+        from rag.onnx_encoder import OnnxEncoder
+        return OnnxEncoder(ONNX_MODEL_DIR, threads=ONNX_THREADS)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+
+def _load_reranker():
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(RERANK_MODEL, device="cpu")
+
+def _load_search_backend():
+    from langchain_community.tools.tavily_search import TavilySearchResults
+    return TavilySearchResults(max_results=WEB_SEARCH_RESULTS)
+
+def _connect_qdrant():
+    from qdrant_client import QdrantClient
+    if VECTOR_STORE_MODE == "local":
+        client = QdrantClient(path=QDRANT_PATH)
+        # the embedded engine is not safe for concurrent use, so its calls are
+        # serialized; the storage directory can only be opened by one process
+        client._client = _SerializedCalls(client._client)
+        return client
+    return QdrantClient(url=QDRANT_URL, prefer_grpc=False)
+
+class _SerializedCalls:
+    """Proxy that runs every method call of `target` under one lock."""
+    def __init__(self, target):
+        self._target = target
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+        def call(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+        return call
+
+_DEFAULT_OVERSAMPLING = {"scalar": 2.0, "binary": 3.0}
+
+def quantization_config(mode: str = QDRANT_QUANTIZATION):
+    """Quantization settings of the collection for `mode`, None for plain float32 vectors."""
+    from qdrant_client import models
+    if mode == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if mode == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    if mode != "none":
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION '{mode}', use none, scalar or binary")
+    return None
+
+def vector_params(size: int, mode: str = QDRANT_QUANTIZATION):
+    from qdrant_client import models
+    # with quantization the originals are only read to rescore, so they can live on disk
+    return models.VectorParams(size=size, distance=models.Distance.COSINE, on_disk=mode != "none")
+
+def search_params(mode: str = QDRANT_QUANTIZATION, rescore: bool = QDRANT_RESCORE, oversampling: float = QDRANT_OVERSAMPLING):
+    """Search settings matching the collection's quantization, None when it has none."""
+    if mode == "none":
+        return None
+    from qdrant_client import models
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=rescore, oversampling=oversampling or _DEFAULT_OVERSAMPLING[mode],
+    ))
+
+def _create_vectorstore():
+    from langchain_community.vectorstores import Qdrant
+    return Qdrant(
+        client=get_qdrant_client(),
+        collection_name=QDRANT_COLLECTION,
+        embeddings=get_embeddings()
+    )
+
+class SharedEmbeddings(Embeddings):
+    """
+    LangChain embeddings backed by the shared encoder. The model is only loaded
+    the first time something is embedded, so building the agents stays cheap.
+    """
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embedding", texts=len(texts)):
+            vectors = get_encoder().encode(
+                texts, batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True, show_progress_bar=False
+            )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+def get_encoder():
+    """The single encoder (SentenceTransformer or OnnxEncoder) used for every embedding."""
+    return _get("encoder", _load_encoder)
+
+def get_reranker():
+    """The single CrossEncoder instance used to rerank retrieved chunks."""
+    return _get("reranker", _load_reranker)
+
+def get_qdrant_client():
+    """The single Qdrant client; its HTTP connection pool is shared by all callers."""
+    return _get("qdrant_client", _connect_qdrant)
+
+def get_search_backend():
+    """The web search tool the SearchAgent's cached search calls (Tavily)."""
+    return _get("search_backend", _load_search_backend)
+
+def get_embeddings() -> Embeddings:
+    return _get("embeddings", SharedEmbeddings)
+
+def get_vectorstore():
+    """LangChain vector store over QDRANT_COLLECTION, for building retrievers."""
+    return _get("vectorstore", _create_vectorstore)
@@ -0,0 +1,188 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from qdrant_client.models import Filter, FieldCondition, MatchValue, IsEmptyCondition, PayloadField
+from graph.tracing import span
+from rag.answer_cache import normalize_question
+from rag.lexical import get_bm25_index
+from rag.manifest import collection_version, course_documents
+from rag.resources import QDRANT_COLLECTION, DEFAULT_COURSE, get_qdrant_client, get_vectorstore, search_params
+
+# --- Configuration ---
+# "hybrid" fuses dense and BM25 results, "dense" uses Qdrant similarity search only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# candidates taken from each side before fusion, as a multiple of k
+HYBRID_FETCH_MULTIPLIER = int(os.getenv("HYBRID_FETCH_MULTIPLIER", "4"))
+# reciprocal-rank fusion constant, larger values flatten the rank weighting
+RRF_K = int(os.getenv("RRF_K", "60"))
+# chunks fetched once per question by the retrieve stage, the agents slice what they need
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "15"))
+# (query, k, course, collection version) entries kept by the retrieval cache
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "256"))
+
+def reciprocal_rank_fusion(*rankings, k: int = RRF_K):
+    """Fuses ranked lists of IDs into one list of (id, score), best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def course_filter(course_id: Optional[str]):
+    """
+    Qdrant filter restricting a search to the chunks of `course_id`, or None
+    for an unscoped search. Points ingested before chunks carried a course
+    belong to the default course.
+    """
+    if course_id is None:
+        return None
+    condition = FieldCondition(key="metadata.course_id", match=MatchValue(value=course_id))
+    if course_id == DEFAULT_COURSE:
+        return Filter(should=[condition, IsEmptyCondition(is_empty=PayloadField(key="metadata.course_id"))])
+    return Filter(must=[condition])
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Runs the Qdrant similarity search and the local BM25 index for the same
+    query and merges both rankings with reciprocal-rank fusion, so exact terms
+    (formula names, chapter numbers, proper nouns) are found even when their
+    embedding is not close to the question's. With a `course_id` both sides
+    only search that course's documents.
+    """
+    k: int = 3
+    course_id: Optional[str] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        fetch_k = self.k * HYBRID_FETCH_MULTIPLIER
+        documents = course_documents(self.course_id) if self.course_id is not None else None
+        with span("vector_search"):
+            dense = get_vectorstore().similarity_search_with_score(
+                query, k=fetch_k, filter=course_filter(self.course_id), search_params=search_params()
+            )
+        with span("bm25_search"):
+            lexical = get_bm25_index().search(query, fetch_k, documents=documents)
+
+        documents = {}
+        for doc, _ in dense:
+            documents[str(doc.metadata.get("_id"))] = doc
+        fused = reciprocal_rank_fusion(
+            [str(doc.metadata.get("_id")) for doc, _ in dense],
+            [point_id for point_id, _ in lexical],
+        )[:self.k]
+
+        # chunks only found by BM25 still need their text from Qdrant
+        missing = [point_id for point_id, _ in fused if point_id not in documents]
+        if missing:
+            with span("qdrant_fetch", points=len(missing)):
+                points = get_qdrant_client().retrieve(collection_name=QDRANT_COLLECTION, ids=missing, with_payload=True)
+            for point in points:
+                payload = point.payload or {}
+                documents[str(point.id)] = Document(
+                    page_content=payload.get("page_content", ""),
+                    metadata={**(payload.get("metadata") or {}), "_id": point.id, "_collection_name": QDRANT_COLLECTION},
+                )
+
+        results = []
+        for point_id, score in fused:
+            if point_id in documents:
+                doc = documents[point_id]
+                doc.metadata["rrf_score"] = score
+                results.append(doc)
+        return results
+
+
+class DenseRetriever(BaseRetriever):
+    """Plain Qdrant similarity search that keeps the similarity in metadata["score"]."""
+    k: int = 3
+    course_id: Optional[str] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        with span("vector_search"):
+            results = get_vectorstore().similarity_search_with_score(
+                query, k=self.k, filter=course_filter(self.course_id), search_params=search_params()
+            )
+        for doc, score in results:
+            doc.metadata["score"] = score
+        return [doc for doc, _ in results]
+
+
+def get_retriever(k: int, course_id: Optional[str] = None):
+    """The retriever the agents use, as configured by RETRIEVAL_MODE, scoped to `course_id` if given."""
+    if RETRIEVAL_MODE == "hybrid":
+        return HybridRetriever(k=k, course_id=course_id)
+    return DenseRetriever(k=k, course_id=course_id)
+
+
+class RetrievalCache:
+    """
+    LRU cache of retrieved documents keyed on (normalized query, k, course,
+    collection version). Ingest bumps the collection version, so entries for the old
+    content are simply never looked up again and age out.
+    """
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._retrievers = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, query: str, k: int, course_id):
+        return (normalize_question(query), k, course_id, collection_version())
+
+    def _get(self, key):
+        with self._lock:
+            docs = self._entries.get(key)
+            if docs is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(docs)
+
+    def _put(self, key, docs):
+        with self._lock:
+            self._entries[key] = list(docs)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _retriever(self, k: int, course_id):
+        if (k, course_id) not in self._retrievers:
+            self._retrievers[(k, course_id)] = get_retriever(k, course_id)
+        return self._retrievers[(k, course_id)]
+
+    def retrieve(self, query: str, k: int = RETRIEVAL_K, course_id: Optional[str] = None):
+        key = self._key(query, k, course_id)
+        docs = self._get(key)
+        if docs is None:
+            docs = self._retriever(k, course_id).invoke(query)
+            self._put(key, docs)
+        return docs
+
+    async def aretrieve(self, query: str, k: int = RETRIEVAL_K, course_id: Optional[str] = None):
+        key = self._key(query, k, course_id)
+        docs = self._get(key)
+        if docs is None:
+            docs = await self._retriever(k, course_id).ainvoke(query)
+            self._put(key, docs)
+        return docs
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+retrieval_cache = RetrievalCache()
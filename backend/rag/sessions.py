@@ -0,0 +1,161 @@
+import os
+import re
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from rag.context import count_tokens
+from rag.summaries import ExtractiveSummarizer
+
+# --- Configuration ---
+# prompt tokens of recent turns kept word for word
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "1000"))
+# prompt tokens of the running summary the older turns are rolled into
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "300"))
+# sessions idle for longer than this are forgotten
+SESSION_TTL = float(os.getenv("SESSION_TTL", "21600"))
+# least recently used sessions are evicted beyond this number
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+# characters of an answer kept when its turn is rolled into the summary
+SUMMARY_ANSWER_CHARS = 240
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _condense(question: str, answer: str) -> str:
+    """One summary line for a turn: the question and the opening of its answer."""
+    answer = re.sub(r"\s+", " ", answer).strip()
+    lead = SENTENCE_END.split(answer, maxsplit=1)[0][:SUMMARY_ANSWER_CHARS]
+    return f"The student asked: {' '.join(question.split())} - answered: {lead}"
+
+def messages_from_client(history):
+    """Converts the history the client used to send ({"role"/"sender", "content"/"text"} dicts) into messages."""
+    messages = []
+    for entry in history or []:
+        role = entry.get("role") or entry.get("sender")
+        content = entry.get("content") or entry.get("text") or ""
+        messages.append(HumanMessage(content) if role in ("user", "human") else AIMessage(content))
+    return messages
+
+
+class Session:
+    """
+    The conversation of one session: the most recent turns word for word, up to
+    `window_tokens`, and one line per older turn in a running summary of at most
+    `summary_tokens`. When the summary is over its budget it keeps the lines most
+    representative of the whole conversation, so its size stays constant too.
+    """
+    def __init__(self, window_tokens: int = SESSION_HISTORY_TOKENS, summary_tokens: int = SESSION_SUMMARY_TOKENS):
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        # (question, answer, tokens), oldest first
+        self.turns = []
+        self.summary = []
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, question: str, answer: str):
+        tokens = count_tokens(question) + count_tokens(answer)
+        with self._lock:
+            self.turns.append((question, answer, tokens))
+            self.updated_at = time.monotonic()
+            folded = []
+            while self.turns and sum(t[2] for t in self.turns) > self.window_tokens:
+                folded.append(self.turns.pop(0))
+            if folded:
+                self.summary.extend(_condense(q, a) for q, a, _ in folded)
+                self._compact()
+
+    def _compact(self):
+        tokens = count_tokens("\n".join(self.summary))
+        if tokens <= self.summary_tokens:
+            return
+        keep = max(1, len(self.summary) * self.summary_tokens // tokens)
+        self.summary = ExtractiveSummarizer().summarize(self.summary, keep)
+
+    def messages(self):
+        """The history passed to the agents' {history} placeholders."""
+        with self._lock:
+            messages = []
+            if self.summary:
+                messages.append(SystemMessage("Summary of the earlier conversation:\n" + "\n".join(self.summary)))
+            for question, answer, _ in self.turns:
+                messages.extend([HumanMessage(question), AIMessage(answer)])
+            return messages
+
+    @classmethod
+    def from_messages(cls, messages):
+        """A session continuing a transcript of alternating human and AI messages."""
+        session = cls()
+        question = None
+        for message in messages:
+            if isinstance(message, HumanMessage):
+                question = message.content
+            elif question is not None:
+                session.add(question, message.content)
+                question = None
+        return session
+
+
+class SessionStore:
+    """
+    Server-side conversation memory keyed by session ID, so the client only
+    sends the new question. Idle sessions expire after `ttl` seconds and the
+    least recently used are evicted beyond `max_sessions`.
+    """
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, session_id: str):
+        now = time.monotonic()
+        expired = [key for key, s in self._sessions.items() if now - s.updated_at > self.ttl]
+        for key in expired:
+            del self._sessions[key]
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _put(self, session_id: str, session: Session):
+        self._sessions[session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def start(self, messages=()) -> str:
+        """Opens a new session, optionally continuing a transcript, and returns its ID."""
+        session_id = uuid.uuid4().hex
+        session = Session.from_messages(messages)
+        with self._lock:
+            self._put(session_id, session)
+        return session_id
+
+    def history(self, session_id: str):
+        """Summary and recent turns of the session, empty for a new or expired one."""
+        with self._lock:
+            session = self._get(session_id)
+            return session.messages() if session else []
+
+    def append(self, session_id: str, question: str, answer: str):
+        with self._lock:
+            session = self._get(session_id)
+            if session is None:
+                # unknown or expired ID, the conversation starts over under it
+                session = Session()
+                self._put(session_id, session)
+        # rolling turns into the summary may embed them, so this happens outside the store lock
+        session.add(question, answer)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions)}
+
+
+session_store = SessionStore()
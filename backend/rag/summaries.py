@@ -0,0 +1,395 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+import numpy as np
+from qdrant_client.models import Filter, FieldCondition, MatchValue
+from rag.resources import DATA_DIR, QDRANT_COLLECTION, DEFAULT_COURSE, EMBED_BATCH_SIZE, get_encoder, get_qdrant_client
+from rag.manifest import collection_version, list_manifests, point_id
+from rag.context import count_tokens
+
+# --- Configuration ---
+SUMMARIES_ENABLED = os.getenv("SUMMARIES_ENABLED", "true").lower() in ("1", "true", "yes")
+# sentences kept in the summary at each level of the tree
+SUMMARY_SENTENCES = {
+    "section": int(os.getenv("SECTION_SUMMARY_SENTENCES", "2")),
+    "chapter": int(os.getenv("CHAPTER_SUMMARY_SENTENCES", "4")),
+    "document": int(os.getenv("DOCUMENT_SUMMARY_SENTENCES", "6")),
+}
+# pages per chapter when the document has no recognisable chapter headings
+SUMMARY_PAGES_PER_GROUP = int(os.getenv("SUMMARY_PAGES_PER_GROUP", "10"))
+# chunks read back from the collection per request while building a tree
+SUMMARY_READ_BATCH = 256
+# sentences (or chunks, sections) more similar than this to an already chosen one are skipped as repeats
+SUMMARY_REDUNDANCY = 0.9
+
+CHAPTER_HEADING = re.compile(r"^\s*(?:chapter|unit|part)\s+(\d+|[ivxlcdm]+)\b[\s:.\-]*(.*)$", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def _summaries_dir():
+    return os.path.join(DATA_DIR, "summaries", QDRANT_COLLECTION)
+
+def _body(text: str):
+    """The page text without the heading lines at its top (short lines with no closing punctuation)."""
+    lines = text.strip().splitlines()
+    while lines and len(lines[0].strip()) < 80 and not lines[0].strip().endswith((".", "!", "?")):
+        lines.pop(0)
+    return "\n".join(lines)
+
+def _chunk_sentences(text: str, page_start: bool):
+    """
+    Complete sentences of a chunk. Chunks are cut at arbitrary whitespace, so
+    a piece that does not start with a capital (except at the top of a page) or
+    does not end with closing punctuation is a fragment and dropped.
+    """
+    text = re.sub(r"\s+", " ", _body(text) if page_start else text).strip()
+    sentences = [s for s in SENTENCE_END.split(text) if len(s) >= 30]
+    if sentences and not page_start and not sentences[0][0].isupper():
+        sentences = sentences[1:]
+    if sentences and not sentences[-1].endswith((".", "!", "?")):
+        sentences = sentences[:-1]
+    return sentences
+
+def _chapter_heading(text: str):
+    for line in text.strip().splitlines()[:3]:
+        match = CHAPTER_HEADING.match(line)
+        if match:
+            return f"Chapter {match.group(1)}" + (f": {match.group(2).strip()}" if match.group(2).strip() else "")
+    return None
+
+
+class ExtractiveSummarizer:
+    """
+    Picks the sentences closest to the centroid of a text's sentence
+    embeddings, skipping near-duplicates, and returns them in reading order.
+    Every sentence is embedded once and reused for the higher levels.
+    """
+    def __init__(self):
+        self.vectors = {}
+
+    def embed(self, sentences):
+        missing = [s for s in dict.fromkeys(sentences) if s not in self.vectors]
+        if missing:
+            vectors = get_encoder().encode(
+                missing, batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+            self.vectors.update(zip(missing, vectors))
+
+    def summarize(self, sentences, n: int):
+        sentences = list(dict.fromkeys(sentences))
+        if len(sentences) <= n:
+            return sentences
+        self.embed(sentences)
+        matrix = np.vstack([self.vectors[s] for s in sentences])
+        centroid = matrix.mean(axis=0)
+        chosen = []
+        for i in np.argsort(-(matrix @ centroid)):
+            if all(float(matrix[i] @ matrix[j]) < SUMMARY_REDUNDANCY for j in chosen):
+                chosen.append(i)
+            if len(chosen) == n:
+                break
+        return [sentences[i] for i in sorted(chosen)]
+
+
+def _pick(units, centroid, n: int):
+    """
+    Extractive summary over units of text that already have an embedding:
+    (vector, sentences) pairs in reading order, e.g. the chunks of a page or
+    the sections of a chapter. Units are ranked by similarity to `centroid`,
+    near-duplicates skipped, and the chosen units give their sentences in
+    turn (leading sentences first) until there are `n`, in reading order.
+    """
+    units = [(vector, sentences) for vector, sentences in units if sentences]
+    chosen = []
+    for i in np.argsort([-float(vector @ centroid) for vector, _ in units]):
+        if all(float(units[i][0] @ units[j][0]) < SUMMARY_REDUNDANCY for j in chosen):
+            chosen.append(i)
+    picked, seen = set(), set()
+    for depth in range(max((len(units[i][1]) for i in chosen), default=0)):
+        for i in chosen:
+            if len(picked) == n:
+                break
+            if depth < len(units[i][1]) and units[i][1][depth] not in seen:
+                seen.add(units[i][1][depth])
+                picked.add((i, depth))
+    return [units[i][1][depth] for i, depth in sorted(picked)]
+
+def _unit(vector):
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+def _stored_pages(document_id: str, chunk_hashes):
+    """
+    Reads the document's chunks back from the collection, SUMMARY_READ_BATCH at
+    a time, and yields (page_number, [(text, vector)]) per page in document
+    order (`chunk_hashes` is the manifest's order).
+    """
+    client = get_qdrant_client()
+    page, chunks = None, []
+    for start in range(0, len(chunk_hashes), SUMMARY_READ_BATCH):
+        ids = [point_id(document_id, h) for h in chunk_hashes[start:start + SUMMARY_READ_BATCH]]
+        points = {str(p.id): p for p in client.retrieve(QDRANT_COLLECTION, ids=ids, with_payload=True, with_vectors=True)}
+        for pid in ids:
+            point = points.get(pid)
+            if point is None:
+                continue
+            number = (point.payload["metadata"].get("page") or 0) + 1
+            if chunks and number != page:
+                yield page, chunks
+                chunks = []
+            page = number
+            vector = np.asarray(point.vector, dtype=np.float32)
+            chunks.append((point.payload["page_content"], _unit(vector)))
+    if chunks:
+        yield page, chunks
+
+
+class SummaryTreeBuilder:
+    """
+    Builds the section (page) -> chapter -> document summary tree from pages
+    given in reading order, keeping only the summaries of finished pages and
+    chapters. It uses the chunk embeddings computed at ingest, so no text is
+    encoded again: sentences are scored by the vector of the chunk they come
+    from, sections by the centroid of their chunks and so on up the tree.
+
+    A page whose first lines look like "Chapter 3: Gravitation" starts a new
+    chapter; pages outside any chapter are grouped SUMMARY_PAGES_PER_GROUP at
+    a time.
+    """
+    def __init__(self):
+        self.chapters = []
+        # centroid of every section of the finished chapters, in reading order
+        self.section_vectors = []
+        # (centroid, summary sentences) of every finished chapter
+        self._chapter_units = []
+        self._chapter = None
+
+    def _close_chapter(self):
+        chapter, self._chapter = self._chapter, None
+        if chapter is None or not chapter["sections"]:
+            return
+        centroid = _unit(chapter["sum"])
+        summary = _pick(chapter["units"], centroid, SUMMARY_SENTENCES["chapter"])
+        pages = [chapter["sections"][0]["page"], chapter["sections"][-1]["page"]]
+        title = chapter["title"] or (f"Pages {pages[0]}-{pages[1]}" if pages[0] != pages[1] else f"Page {pages[0]}")
+        self.chapters.append({"title": title, "pages": pages, "summary": " ".join(summary), "sections": chapter["sections"]})
+        self._chapter_units.append((centroid, summary))
+        self.section_vectors.extend(vector for vector, _ in chapter["units"])
+
+    def add_page(self, number: int, chunks):
+        """`chunks` are the (text, unit vector) pairs of the page, in order."""
+        heading = _chapter_heading(chunks[0][0])
+        chapter = self._chapter
+        if (heading and (chapter is None or chapter["title"] != heading)) or chapter is None or (
+                chapter["title"] is None and chapter["pages"] >= SUMMARY_PAGES_PER_GROUP):
+            self._close_chapter()
+            self._chapter = chapter = {"title": heading, "pages": 0, "sections": [], "units": [], "sum": 0.0}
+        chapter["pages"] += 1
+
+        units = [(vector, _chunk_sentences(text, i == 0)) for i, (text, vector) in enumerate(chunks)]
+        if not any(sentences for _, sentences in units):
+            return
+        centroid = _unit(np.sum([vector for vector, _ in units], axis=0))
+        summary = _pick(units, centroid, SUMMARY_SENTENCES["section"])
+        chapter["sections"].append({"page": number, "summary": " ".join(summary)})
+        chapter["units"].append((centroid, summary))
+        # running sum of the section centroids, the direction of the chapter centroid
+        chapter["sum"] = chapter["sum"] + centroid
+
+    def tree(self):
+        self._close_chapter()
+        summary = []
+        if self._chapter_units:
+            centroid = _unit(np.sum([vector for vector, _ in self._chapter_units], axis=0))
+            summary = _pick(self._chapter_units, centroid, SUMMARY_SENTENCES["document"])
+        return {"summary": " ".join(summary), "chapters": self.chapters}
+
+    def vectors(self):
+        """Centroids of the sections and chapters of the tree, in reading order."""
+        dim = len(self.section_vectors[0]) if self.section_vectors else 0
+        return {
+            "sections": np.array(self.section_vectors, dtype=np.float32).reshape(-1, dim),
+            "chapters": np.array([vector for vector, _ in self._chapter_units], dtype=np.float32).reshape(-1, dim),
+        }
+
+
+def build_summary_tree(document_id: str, document_name: str, document_hash: str, chunk_hashes):
+    """
+    Builds the summary tree of an ingested document from its chunks and
+    embeddings in the collection (`chunk_hashes` in document order, as in the
+    manifest) and stores it next to the manifests, with the section and
+    chapter centroids the outline ranks entries by.
+    """
+    builder = SummaryTreeBuilder()
+    for number, chunks in _stored_pages(document_id, chunk_hashes):
+        builder.add_page(number, chunks)
+    tree = {
+        "document_id": document_id,
+        "document_name": document_name,
+        "document_hash": document_hash,
+        "created_at": time.time(),
+        **builder.tree(),
+    }
+    os.makedirs(_summaries_dir(), exist_ok=True)
+    path = os.path.join(_summaries_dir(), f"{document_id}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(tree, f)
+    vectors_path = os.path.join(_summaries_dir(), f"{document_id}.npz")
+    with open(f"{vectors_path}.tmp", "wb") as f:
+        np.savez(f, **builder.vectors())
+    os.replace(f"{vectors_path}.tmp", vectors_path)
+    os.replace(tmp_path, path)
+    return tree
+
+def load_summary_tree(document_id: str):
+    path = os.path.join(_summaries_dir(), f"{document_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def clear_summary_trees():
+    """Removes the summary trees of every document."""
+    shutil.rmtree(_summaries_dir(), ignore_errors=True)
+
+def _summary_vectors(tree):
+    """
+    Section and chapter centroids stored with the tree; trees without them are
+    ranked by an embedding of their summaries instead.
+    """
+    path = os.path.join(_summaries_dir(), f"{tree['document_id']}.npz")
+    sections = [section["summary"] for chapter in tree["chapters"] for section in chapter["sections"]]
+    if os.path.exists(path):
+        with np.load(path) as stored:
+            if len(stored["sections"]) == len(sections) and len(stored["chapters"]) == len(tree["chapters"]):
+                return stored["sections"], stored["chapters"]
+    encode = lambda texts: get_encoder().encode(
+        texts, batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False,
+    ).reshape(len(texts), -1)
+    return encode(sections), encode([chapter["summary"] for chapter in tree["chapters"]])
+
+def _live_trees(course_id: str = None):
+    """
+    Summary trees of the documents (of `course_id`, if given) that still have
+    points in the collection and whose tree matches the ingested version.
+    """
+    manifests = list_manifests()
+    if course_id is not None:
+        manifests = [m for m in manifests if m.get("course_id", DEFAULT_COURSE) == course_id]
+    trees = [(m, load_summary_tree(m["document_id"])) for m in manifests]
+    trees = [(m, tree) for m, tree in trees if tree and tree["document_hash"] == m["document_hash"]]
+    if not trees:
+        return []
+    client = get_qdrant_client()
+    if not client.collection_exists(QDRANT_COLLECTION):
+        return []
+    live = []
+    for manifest, tree in trees:
+        # a reset or deleted collection leaves manifests and trees behind
+        stored = client.count(
+            collection_name=QDRANT_COLLECTION,
+            count_filter=Filter(must=[FieldCondition(key="metadata.document_id", match=MatchValue(value=manifest["document_id"]))]),
+            exact=True,
+        ).count
+        if stored:
+            live.append(tree)
+    return live
+
+class _OutlineEntries:
+    """
+    The lines of the outline of a set of trees, each with its token count and
+    centroid: per document a header, per chapter a heading and summary, per
+    section one "- Page n" line. Keys are (document,), (document, chapter) and
+    (document, chapter, section), so an entry's key prefixes those under it.
+    """
+    def __init__(self, trees):
+        self.entries = []
+        for d, tree in enumerate(trees):
+            section_vectors, chapter_vectors = _summary_vectors(tree)
+            header = f"# {tree['document_name']}\n{tree['summary']}"
+            self._add((d,), header if d == 0 else f"\n{header}", None)
+            s = 0
+            for c, chapter in enumerate(tree["chapters"]):
+                pages = chapter["pages"]
+                self._add((d, c), f"\n## {chapter['title']} (pages {pages[0]}-{pages[1]})\n{chapter['summary']}",
+                          chapter_vectors[c])
+                for section in chapter["sections"]:
+                    self._add((d, c, s), f"- Page {section['page']}: {section['summary']}", section_vectors[s])
+                    s += 1
+
+    def _add(self, key, text, vector):
+        # one token for the newline joining it to the previous entry
+        self.entries.append({"key": key, "text": text, "vector": vector, "tokens": count_tokens(text) + 1})
+
+    def render(self, question: str, budget: int):
+        """
+        The outline in reading order within `budget` tokens. Whole entries are
+        dropped, least relevant to `question` first: sections, then chapters,
+        then documents (a document ranks as its most relevant chapter). Without
+        a question, entries are dropped from the end. None when not even one
+        document header fits.
+        """
+        order = list(range(len(self.entries)))
+        relevance = [-i for i in order]
+        if question:
+            query = get_encoder().encode([question], convert_to_numpy=True, normalize_embeddings=True)[0]
+            relevance = [float(e["vector"] @ query) if e["vector"] is not None else 0.0 for e in self.entries]
+            best_chapter = {}
+            for i, entry in enumerate(self.entries):
+                if len(entry["key"]) == 2:
+                    d = entry["key"][0]
+                    best_chapter[d] = max(best_chapter.get(d, -1.0), relevance[i])
+            for i, entry in enumerate(self.entries):
+                if len(entry["key"]) == 1:
+                    relevance[i] = best_chapter.get(entry["key"][0], -1.0)
+        # sections (3-part keys) go first, documents last
+        drop_order = sorted(order, key=lambda i: (-len(self.entries[i]["key"]), relevance[i]))
+
+        kept = set(order)
+        used = sum(entry["tokens"] for entry in self.entries)
+        outline = None
+        for i in [None] + drop_order:
+            if i is not None:
+                kept.discard(i)
+                used -= self.entries[i]["tokens"]
+                key = self.entries[i]["key"]
+                # a chapter or document goes with everything under it
+                for j in (list(kept) if len(key) < 3 else []):
+                    if self.entries[j]["key"][:len(key)] == key:
+                        kept.discard(j)
+                        used -= self.entries[j]["tokens"]
+            if not kept or used > budget:
+                continue
+            outline = "\n".join(self.entries[j]["text"] for j in sorted(kept))
+            if count_tokens(outline) <= budget:
+                return outline
+        return None
+
+_outline_cache = {}
+_outline_lock = threading.Lock()
+
+def collection_outline(budget: int, course_id: str = None, question: str = None):
+    """
+    Outline of the ingested documents (of `course_id`, if given) that are
+    still in the collection, from their stored summary trees, within `budget`
+    tokens: the sections, chapters and documents least relevant to `question`
+    are dropped until it fits. None when no document has a summary tree yet.
+    The outline entries are cached per collection version.
+    """
+    version = collection_version()
+    key = (version, course_id)
+    with _outline_lock:
+        entries = _outline_cache.get(key)
+    if entries is None:
+        entries = _OutlineEntries(_live_trees(course_id))
+        with _outline_lock:
+            for stale in [k for k in _outline_cache if k[0] != version]:
+                del _outline_cache[stale]
+            _outline_cache[key] = entries
+    if not entries.entries:
+        return None
+    return entries.render(question, budget)
@@ -1,12 +1,11 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
+from rag.resources import QDRANT_COLLECTION, QDRANT_QUANTIZATION, get_qdrant_client
+from rag.ingest import ensure_collection, clear_collection_state
 
 # Configuration
-QDRANT_URL = "http://localhost:6333"
-QDRANT_COLLECTION = "lms_collection"
 VECTOR_SIZE = 384 # size for all-MiniLM-L6-v2
 
-client = QdrantClient(url=QDRANT_URL)
+# server or embedded store, as configured by VECTOR_STORE_MODE
+client = get_qdrant_client()
 
 print(f"Attempting to reset collection: '{QDRANT_COLLECTION}'...")
 
@@ -19,14 +18,13 @@ try:
     else:
         print(f"Collection '{QDRANT_COLLECTION}' did not exist, so no need to delete.")
 
-    client.recreate_collection(
-        collection_name=QDRANT_COLLECTION,
-        vectors_config=models.VectorParams(
-            size=VECTOR_SIZE,
-            distance=models.Distance.COSINE
-        ),
-    )
-    print(f"Collection '{QDRANT_COLLECTION}' created again, ready for new data.")
+    # same vector and quantization settings (QDRANT_QUANTIZATION) as an ingest would use
+    ensure_collection(VECTOR_SIZE)
+    print(f"Collection '{QDRANT_COLLECTION}' created again (quantization: {QDRANT_QUANTIZATION}), ready for new data.")
+
+    # manifests, BM25 index and summaries describe the deleted points, drop them too
+    version = clear_collection_state()
+    print(f"Ingest state cleared, collection version is now {version}.")
     print("\nVector store has been reset. You can now ingest a new document.")
 
 except Exception as e:
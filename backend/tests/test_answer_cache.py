@@ -0,0 +1,34 @@
+import pytest
+from benchmarks.stubs import FakeEncoder
+from rag import manifest, resources
+from rag.answer_cache import SemanticAnswerCache
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, "DATA_DIR", str(tmp_path))
+    resources.set_resource("encoder", FakeEncoder())
+
+
+def test_answer_is_served_while_the_version_is_current():
+    cache = SemanticAnswerCache()
+    cache.store("What is inertia?", "Resistance to change in motion.")
+    assert cache.lookup("what is  inertia?")[0] == "Resistance to change in motion."
+
+
+def test_bumping_the_collection_version_retires_cached_answers():
+    cache = SemanticAnswerCache(threshold=0.0)
+    cache.store("What is inertia?", "Resistance to change in motion.")
+    manifest.bump_collection_version()
+    # neither the exact nor the similarity path may return the old answer
+    assert cache.lookup("What is inertia?")[0] is None
+    assert cache.lookup("Define inertia.")[0] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_answer_built_before_a_bump_is_not_stored_as_current():
+    cache = SemanticAnswerCache()
+    version = manifest.collection_version()
+    manifest.bump_collection_version()
+    cache.store("What is inertia?", "Resistance to change in motion.", version=version)
+    assert cache.lookup("What is inertia?")[0] is None
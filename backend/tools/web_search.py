@@ -1,5 +1,175 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
+import os
+import contextlib
+import time
+import asyncio
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Type
+from pydantic import BaseModel, Field
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
+from langchain_core.tools import BaseTool
+from graph.metrics import registry
+from graph.tracing import span
+from rag.answer_cache import normalize_question
+from rag.resources import get_search_backend
 from dotenv import load_dotenv
 
 load_dotenv()
-web_search_tool = TavilySearchResults(k=3, description="Search the web for up-to-date information on any topic.")
\ No newline at end of file
+
+# --- Configuration ---
+# seconds a search result is reused for the same (normalized) query
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", "900"))
+WEB_SEARCH_CACHE_SIZE = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "512"))
+# a search call still running after this many seconds is abandoned
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "8"))
+
+WEB_SEARCHES = registry.counter("lms_web_searches_total", "Web search tool calls, by outcome.", ["outcome"])
+
+# runs the blocking backend calls of the sync path, so they can be timed out
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="web-search")
+
+# backend calls in flight by normalized query, joined by identical searches that
+# arrive meanwhile: executor futures for the sync path, tasks per event loop for async
+_pending = {}
+_pending_lock = threading.Lock()
+_apending = weakref.WeakKeyDictionary()
+
+
+class SearchCache:
+    """
+    LRU cache of web search results keyed on the normalized query. Entries
+    expire `ttl` seconds after they were fetched; the least recently used ones
+    are evicted beyond `max_entries`.
+    """
+    def __init__(self, ttl: float = WEB_SEARCH_CACHE_TTL, max_entries: int = WEB_SEARCH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # normalized query -> (result, fetched_at), oldest first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str):
+        key = normalize_question(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, query: str, result):
+        key = normalize_question(query)
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+search_cache = SearchCache()
+
+
+class SearchInput(BaseModel):
+    query: str = Field(description="search query to look up on the web")
+
+
+class CachedWebSearch(BaseTool):
+    """
+    Web search for the SearchAgent, on top of the shared search backend. Results
+    are served from `search_cache` while fresh, and a backend call slower than
+    `timeout` seconds is abandoned: the agent gets a message saying so and can
+    answer with what it has instead of holding the request.
+    """
+    name: str = "web_search"
+    description: str = "Search the web for up-to-date information on any topic."
+    args_schema: Type[BaseModel] = SearchInput
+    timeout: float = WEB_SEARCH_TIMEOUT
+
+    def _timed_out(self, query: str):
+        WEB_SEARCHES.inc(outcome="timeout")
+        return f"The web search for '{query}' timed out after {self.timeout:g} seconds."
+
+    def _finished(self, query: str, call, pending: dict, lock=None):
+        """Done callback of a backend call: caches a result, then lets the next search start a new call."""
+        if not call.cancelled() and call.exception() is None:
+            result = call.result()
+            # the backend reports its own failures as a message string, those are not cached
+            WEB_SEARCHES.inc(outcome="error" if isinstance(result, str) else "miss")
+            if not isinstance(result, str):
+                search_cache.put(query, result)
+        key = normalize_question(query)
+        # the async tables are only touched from their own event loop, they need no lock
+        with lock or contextlib.nullcontext():
+            if pending.get(key) is call:
+                del pending[key]
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None):
+        cached = search_cache.get(query)
+        if cached is not None:
+            WEB_SEARCHES.inc(outcome="hit")
+            return cached
+        key = normalize_question(query)
+        with _pending_lock:
+            future = _pending.get(key)
+            leader = future is None
+            if leader:
+                future = _pending[key] = _executor.submit(get_search_backend().invoke, {"query": query})
+        if leader:
+            future.add_done_callback(lambda f: self._finished(query, f, _pending, _pending_lock))
+        else:
+            WEB_SEARCHES.inc(outcome="coalesced")
+        with span("web_search"):
+            try:
+                # every caller waits at most `timeout`, however long ago the call started
+                return future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                return self._timed_out(query)
+
+    async def _arun(self, query: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None):
+        cached = search_cache.get(query)
+        if cached is not None:
+            WEB_SEARCHES.inc(outcome="hit")
+            return cached
+        key = normalize_question(query)
+        loop = asyncio.get_running_loop()
+        pending = _apending.setdefault(loop, {})
+        task = pending.get(key)
+        if task is None:
+            # the call itself is bounded too, so an abandoned one does not hang around
+            task = pending[key] = loop.create_task(
+                asyncio.wait_for(get_search_backend().ainvoke({"query": query}), self.timeout)
+            )
+            task.add_done_callback(lambda t: self._finished(query, t, pending))
+        else:
+            WEB_SEARCHES.inc(outcome="coalesced")
+        with span("web_search"):
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+            except asyncio.TimeoutError:
+                return self._timed_out(query)
+
+
+web_search_tool = CachedWebSearch()
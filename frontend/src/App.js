@@ -14,6 +14,7 @@ function App() {
   const [prompt, setPrompt] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [isDarkMode, setIsDarkMode] = useState(true);
+  const [sessionId, setSessionId] = useState(null);
   const fileInputRef = useRef(null);
   const chatHistoryRef = useRef(null);
   const textareaRef = useRef(null);
@@ -58,8 +59,9 @@ function App() {
     try {
       const response = await axios.post('http://localhost:8000/ask', {
         question: prompt,
-        history: newMessages.slice(0, -1).map(msg => ({ role: msg.sender === 'user' ? 'user' : 'assistant', content: msg.text }))
+        session_id: sessionId // the backend keeps the conversation for this session
       });
+      setSessionId(response.data.session_id);
       const agentMessage = { sender: 'agent', text: response.data.answer };
       setMessages(prev => [...prev, agentMessage]);
     } catch (error) {
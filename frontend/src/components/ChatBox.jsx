@@ -5,6 +5,7 @@ const ChatBox = () => {
   const [prompt, setPrompt] = useState('');
   const [messages, setMessages] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
+  const [sessionId, setSessionId] = useState(null);
 
   const handleSubmit = async (event) => {
     event.preventDefault();
@@ -20,8 +21,9 @@ const ChatBox = () => {
     try {
       const response = await axios.post('http://127.0.0.1:8000/ask', {
         question: prompt,
-        history: newMessages.slice(0, -1) // Send previous messages as history
+        session_id: sessionId // The backend keeps the conversation for this session
       });
+      setSessionId(response.data.session_id);
 
       const agentMessage = { sender: 'agent', text: response.data.answer };
       setMessages(prev => [...prev, agentMessage]);